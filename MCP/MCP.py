@@ -1,5 +1,5 @@
 import adsk.core, adsk.fusion, traceback
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from http import HTTPStatus
 import threading
 import json
@@ -7,11 +7,38 @@ import time
 import queue
 from pathlib import Path
 import math
+import heapq
 import os
+import uuid
+from collections import OrderedDict, deque
+import datetime
+import itertools
+import logging
+import logging.handlers
 
 ModelParameterSnapshot = []
+# Parameter-Index: Name -> Eintrag, wird nur bei Timeline-/Parameteränderungen neu aufgebaut
+parameter_index = {}
+parameter_index_state = {"signature": None, "dirty": True, "built_at": 0.0}
+# Spätestens nach dieser Zeit (Sekunden) neu aufbauen, fängt Änderungen im Parameter-Dialog ab
+PARAMETER_INDEX_MAX_AGE = 30.0
+# Entity-Index: entityToken/Name -> Body, Sketch; Neuaufbau bei Timeline-/Anzahländerung und Parameteränderungen
+entity_index = {kind: {"token": {}, "name": {}} for kind in ("bodies", "sketches")}
+entity_index_state = {"signature": None, "dirty": True}
+# Face-Metadaten pro Body (LRU): entityToken -> {"revision", "faces", "adjacency"}
+face_metadata_cache = OrderedDict()
+FACE_CACHE_MAX = 16
+# Timeline-Index: Features mit Typ, Zustand und betroffenen Bodies; wächst nur um neue Timeline-Einträge
+timeline_index = {"features": [], "type_counts": {}, "body_counts": {}, "body_features": {}}
+timeline_index_state = {"count": 0, "marker": None, "dirty": True, "built_at": 0.0}
+TIMELINE_INDEX_MAX_AGE = 30.0
 httpd = None
-task_queue = queue.Queue()  # Queue für thread-safe Aktionen
+# Task-Queue mit Prioritäts-Lanes (LaneQueue, siehe ###Task Lanes###), Priorität absteigend
+TASK_LANES = ("interactive", "mutation", "bulk")
+TASK_LANE_LIMITS = {"interactive": 200, "mutation": 500, "bulk": 20}
+# Wartet der Kopf einer Lane länger (Sekunden), wird er vor höheren Lanes bedient (kein Verhungern);
+# Mutationen bleiben dabei Reihenfolge-Grenzen, siehe LaneQueue
+TASK_LANE_MAX_WAIT = 5.0
 
 # Global results cache for query operations
 query_results = {
@@ -44,6 +71,44 @@ stopFlag = None
 myCustomEvent = 'MCPTaskEvent'
 customEvent = None
 
+# Wakeup-Koaleszierung: ein gesetztes Flag bedeutet, dass bereits ein MCPTaskEvent
+# unterwegs ist. Ein Burst von POSTs erzeugt dadurch nur einen einzigen Wakeup.
+task_wakeup_pending = threading.Event()
+task_wakeup_lock = threading.Lock()
+# Fallback-Intervall (Sekunden) des TaskThread: hält den Parameter-Snapshot frisch
+# und fängt verlorene Events ab, weckt Fusion im Leerlauf aber nur selten.
+TASK_FALLBACK_INTERVAL = 2.0
+# Zeitbudget (Sekunden) pro notify-Aufruf: danach wird abgebrochen und ein neuer Wakeup
+# angefordert, damit Fusion zwischen den Ticks UI-Events verarbeiten kann
+TASK_TICK_BUDGET = 0.1
+# Metriken der letzten Ticks (Dauer, abgearbeitete Tasks, verbleibende Queue-Tiefe)
+TASK_TICK_HISTORY = 50
+task_tick_history = deque(maxlen=TASK_TICK_HISTORY)
+task_tick_totals = {"ticks": 0, "tasks": 0, "coalesced": 0, "budget_exhausted": 0, "max_duration_ms": 0.0}
+
+# Ergebnisse pro Request-ID (request_id -> Eintrag), begrenzt und mit TTL
+request_results = OrderedDict()
+request_results_lock = threading.RLock()
+REQUEST_RESULT_TTL = 300.0      # Sekunden, danach wird ein Eintrag verworfen
+REQUEST_RESULT_MAX = 1000       # maximale Anzahl gespeicherter Ergebnisse
+# Idempotency-Keys ((key, task) -> Eintrag), LRU: Wiederholungen werden nicht erneut ausgeführt
+idempotency_keys = OrderedDict()
+IDEMPOTENCY_MAX = 500
+REQUEST_WAIT_MAX = 60.0         # obere Grenze für X-Wait (Sekunden)
+# Keep-Alive: offene, untätige Verbindungen nach dieser Zeit (Sekunden) schließen
+KEEPALIVE_TIMEOUT = 15.0
+# Maximale Anzahl gleichzeitiger Verbindungs-Threads des HTTP-Servers
+HTTP_MAX_WORKERS = 16
+# Headless-Betrieb: keine modalen Dialoge auf dem Task-Pfad, Fehler landen im Ergebnis
+# und im Operation-Log (ein offener messageBox würde die Queue bis zum Klick blockieren)
+HEADLESS = os.environ.get("FUSION_MCP_HEADLESS", "").lower() in ("1", "true", "yes")
+# Nicht-modale Hinweise im Headless-Betrieb: "text_commands" (Textbefehle-Palette) oder "none"
+NOTIFY_MODE = os.environ.get("FUSION_MCP_NOTIFY", "text_commands")
+# Start-/Stopp-Meldungen in run()/stop(); im Headless-Betrieb standardmäßig aus
+SHOW_LIFECYCLE_MESSAGES = os.environ.get("FUSION_MCP_LIFECYCLE_MESSAGES", "0" if HEADLESS else "1").lower() in ("1", "true", "yes")
+# Befehle mit ui.selectEntity brauchen einen Benutzer und schlagen headless sofort fehl
+HEADLESS_SELECTION_ERROR = "interactive selection not available headless"
+
 #Event Handler Class
 class TaskEventHandler(adsk.core.CustomEventHandler):
     """
@@ -54,297 +119,609 @@ class TaskEventHandler(adsk.core.CustomEventHandler):
         super().__init__()
 
     def notify(self, args):
-        global task_queue, ModelParameterSnapshot, design, ui
+        global task_queue, design, ui
+        # Flag vor dem Abarbeiten zurücksetzen, damit ein POST während der
+        # Verarbeitung wieder einen neuen Wakeup auslöst
+        task_wakeup_pending.clear()
         try:
             if design:
-                # Parameter Snapshot aktualisieren
-                ModelParameterSnapshot = get_model_parameters(design)
-
-                # Task-Queue abarbeiten
+                # Task-Queue abarbeiten, höchstens TASK_TICK_BUDGET lang (mindestens eine Task)
+                tick_start = time.perf_counter()
+                deadline = tick_start + TASK_TICK_BUDGET
+                processed = 0
+                coalesced = 0
                 while not task_queue.empty():
+                    if processed and time.perf_counter() >= deadline:
+                        break
+                    request_ids = []
                     try:
-                        task = task_queue.get_nowait()
-                        self.process_task(task)
+                        # Gleiche Abfragen / überholte set_parameter-Writes werden zusammengefasst
+                        request_ids, task = task_queue.get_coalesced()
+                        processed += 1
+                        coalesced += len(request_ids) - 1
+                        result = self.process_task(task)
+                        for request_id in request_ids:
+                            complete_request(request_id, result)
                     except queue.Empty:
                         break
                     except Exception as e:
-                        if ui:
-                            ui.messageBox(f"Task-Fehler: {str(e)}")
+                        for request_id in request_ids:
+                            complete_request(request_id, error=str(e))
+                        show_message(f"Task-Fehler: {str(e)}")
                         continue
 
+                # Parameter-Index nur bei Änderungen neu aufbauen
+                refresh_parameter_index(design)
+
+                remaining = task_queue.qsize()
+                record_task_tick(tick_start, processed, remaining, coalesced)
+                if remaining:
+                    # Budget aufgebraucht: Rest im nächsten Tick, Fusion bleibt dazwischen bedienbar
+                    request_task_wakeup()
+
         except Exception as e:
 
             pass
 
     def process_task(self, task):
         """Verarbeitet eine einzelne Task und speichert Rückgabewerte für Abfragen"""
-        global design, ui, query_results
-
-        # Capture return values for query operations
-        result = None
-
-        if task[0] == 'set_parameter':
-            set_parameter(design, ui, task[1], task[2])
-        elif task[0] == 'draw_box':
-
-            draw_Box(design, ui, task[1], task[2], task[3], task[4], task[5], task[6], task[7])
-
-        elif task[0] == 'draw_witzenmann':
-            draw_Witzenmann(design, ui, task[1],task[2])
-        elif task[0] == 'export_stl':
-
-            export_as_STL(design, ui, task[1])
-        elif task[0] == 'fillet_edges':
-            result = fillet_edges(design, ui, task[1], task[2] if len(task) > 2 else None)
-            query_results['fillet_edges'] = result
-        elif task[0] == 'export_step':
-
-            export_as_STEP(design, ui, task[1])
-        elif task[0] == 'draw_cylinder':
-            draw_cylinder(design, ui, task[1], task[2], task[3], task[4], task[5],task[6])
-        elif task[0] == 'shell_body':
-            shell_existing_body(design, ui, task[1], task[2])
-        elif task[0] == 'undo':
-            undo(design, ui)
-        elif task[0] == 'draw_lines':
-            draw_lines(design, ui, task[1], task[2])
-        elif task[0] == 'extrude_last_sketch':
-            result = extrude_last_sketch(design, ui, task[1],task[2])
-            query_results['extrude'] = result
-        elif task[0] == 'revolve_profile':
-            # 'rootComp = design.rootComponent
-            # sketches = rootComp.sketches
-            # sketch = sketches.item(sketches.count - 1)  # Letzter Sketch
-            # axisLine = sketch.sketchCurves.sketchLines.item(0)  # Erste Linie als Achse'
-            revolve_profile(design, ui,  task[1])
-        elif task[0] == 'arc':
-            arc(design, ui, task[1], task[2], task[3], task[4],task[5])
-        elif task[0] == 'draw_one_line':
-            draw_one_line(design, ui, task[1], task[2], task[3], task[4], task[5], task[6], task[7])
-        elif task[0] == 'holes': #task format: ('holes', points, width, depth, through, faceindex)
-            # task[3]=depth, task[4]=through, task[5]=faceindex
-            holes(design, ui, task[1], task[2], task[3], task[4])
-        elif task[0] == 'circle':
-            draw_circle(design, ui, task[1], task[2], task[3], task[4],task[5])
-        elif task[0] == 'extrude_thin':
-            extrude_thin(design, ui, task[1],task[2])
-        elif task[0] == 'select_body':
-            result = select_body(design, ui, task[1])
-            query_results['select_body'] = result
-        elif task[0] == 'select_sketch':
-            result = select_sketch(design, ui, task[1])
-            query_results['select_sketch'] = result
-        elif task[0] == 'spline':
-            spline(design, ui, task[1], task[2])
-        elif task[0] == 'sweep':
-            sweep(design, ui)
-        elif task[0] == 'cut_extrude':
-            cut_extrude(design,ui,task[1])
-        elif task[0] == 'circular_pattern':
-            result = circular_pattern(design,ui,task[1],task[2],task[3])
-            query_results['circular_pattern'] = result
-        elif task[0] == 'offsetplane':
-            offsetplane(design,ui,task[1],task[2])
-        elif task[0] == 'loft':
-            loft(design, ui, task[1])
-        elif task[0] == 'ellipsis':
-            draw_ellipis(design,ui,task[1],task[2],task[3],task[4],task[5],task[6],task[7],task[8],task[9],task[10])
-        elif task[0] == 'draw_sphere':
-            create_sphere(design, ui, task[1], task[2], task[3], task[4])
-        elif task[0] == 'threaded':
-            create_thread(design, ui, task[1], task[2])
-        elif task[0] == 'delete_everything':
-            delete(design, ui)
-        elif task[0] == 'boolean_operation':
-            boolean_operation(design,ui,task[1])
-        elif task[0] == 'draw_2d_rectangle':
-            draw_2d_rect(design, ui, task[1], task[2], task[3], task[4], task[5], task[6], task[7])
-        elif task[0] == 'rectangular_pattern':
-            rect_pattern(design,ui,task[1],task[2],task[3],task[4],task[5],task[6],task[7])
-        elif task[0] == 'draw_text':
-            draw_text(design, ui, task[1], task[2], task[3], task[4], task[5], task[6], task[7], task[8], task[9],task[10])
-        elif task[0] == 'move_body':
-            move_last_body(design,ui,task[1],task[2],task[3])
-        elif task[0] == 'pocket_recess':
-            result = pocket_recess(design, ui, task[1], task[2] if len(task) > 2 else None,
-                         task[3] if len(task) > 3 else None, task[4] if len(task) > 4 else None)
-            query_results['pocket_recess'] = result
-        elif task[0] == 'sketch_on_face':
-            sketch_on_face(design, ui, task[1], task[2])
-        elif task[0] == 'create_work_plane':
-            create_work_plane(design, ui, task[1], task[2], task[3])
-        elif task[0] == 'project_edges':
-            project_edges(design, ui, task[1])
-        elif task[0] == 'draw_polygon':
-            draw_polygon(design, ui, task[1], task[2], task[3], task[4], task[5], task[6])
-        elif task[0] == 'offset_surface':
-            offset_surface(design, ui, task[1], task[2])
-        elif task[0] == 'mirror_feature':
-            mirror_feature(design, ui, task[1], task[2])
-        elif task[0] == 'list_bodies':
-            result = list_bodies(design, ui)
-            query_results['list_bodies'] = result
-        elif task[0] == 'get_active_body':
-            result = get_active_body(design, ui)
-            query_results['get_active_body'] = result
-        elif task[0] == 'rename_body':
-            result = rename_body(design, ui, task[1], task[2])
-            query_results['rename_body'] = result
-        elif task[0] == 'list_sketches':
-            result = list_sketches(design, ui)
-            query_results['list_sketches'] = result
-        elif task[0] == 'get_active_sketch':
-            result = get_active_sketch(design, ui)
-            query_results['get_active_sketch'] = result
-        elif task[0] == 'activate_sketch':
-            result = activate_sketch(design, ui, task[1])
-            query_results['activate_sketch'] = result
-        elif task[0] == 'close_sketch':
-            sketch_id = task[1] if len(task) > 1 else None
-            result = close_sketch(design, ui, sketch_id)
-            query_results['close_sketch'] = result
-        # CRITICAL 5 TOOLS
-        elif task[0] == 'select_body_by_id':
-            body_id = task[1] if len(task) > 1 else None
-            result = select_body_by_id(design, ui, body_id)
-            query_results['select_body_by_id'] = result
-        elif task[0] == 'list_faces_with_metadata':
-            body_id = task[1] if len(task) > 1 else None
-            result = list_faces_with_metadata(design, ui, body_id)
-            query_results['list_faces'] = result
-        elif task[0] == 'select_face_by_id':
-            body_id = task[1] if len(task) > 1 else None
-            face_id = task[2] if len(task) > 2 else None
-            result = select_face_by_id(design, ui, body_id, face_id)
-            query_results['select_face'] = result
-        elif task[0] == 'list_features_in_design':
-            body_id = task[1] if len(task) > 1 else None
-            result = list_features_in_design(design, ui, body_id)
-            query_results['list_features'] = result
-        elif task[0] == 'boolean_preview_operation':
-            target_id = task[1] if len(task) > 1 else None
-            tool_id = task[2] if len(task) > 2 else None
-            result = boolean_preview_operation(design, ui, target_id, tool_id)
-            query_results['boolean_preview'] = result
-        # NEW ENHANCED TOOLS
-        elif task[0] == 'get_sketch_status':
-            sketch_id = task[1] if len(task) > 1 else None
-            include_geometry = task[2] if len(task) > 2 else True
-            result = get_sketch_status(design, ui, sketch_id, include_geometry)
-            query_results['get_sketch_status'] = result
-        elif task[0] == 'list_faces':
-            result = list_faces(design, ui, task[1])
-            query_results['list_faces'] = result
-        elif task[0] == 'pocket_recess_safe':
-            result = pocket_recess_safe(design, ui, task[1], task[2], task[3],
-                                      task[4] if len(task) > 4 else "cut",
-                                      task[5] if len(task) > 5 else True,
-                                      task[6] if len(task) > 6 else True)
-            query_results['pocket_recess_safe'] = result
-        elif task[0] == 'get_feature_history':
-            result = get_feature_history(design, ui, task[1],
-                                        task[2] if len(task) > 2 else True,
-                                        task[3] if len(task) > 3 else True)
-            query_results['get_feature_history'] = result
-        elif task[0] == 'find_face_by_property':
-            result = find_face_by_property(design, ui, task[1],
-                                          task[2] if len(task) > 2 else None,
-                                          task[3] if len(task) > 3 else None,
-                                          task[4] if len(task) > 4 else None,
-                                          task[5] if len(task) > 5 else None,
-                                          task[6] if len(task) > 6 else False)
-            query_results['find_face_by_property'] = result
-        elif task[0] == 'draw_rectangles_batch':
-            result = draw_rectangles_batch(design, ui, task[1], task[2])
-            query_results['draw_rectangles_batch'] = result
-        elif task[0] == 'pocket_smart':
-            result = pocket_smart(design, ui, task[1], task[2], task[3], task[4],
-                                task[5] if len(task) > 5 else "sketch_plane",
-                                task[6] if len(task) > 6 else False,
-                                task[7] if len(task) > 7 else True)
-            query_results['pocket_smart'] = result
-        elif task[0] == 'begin_transaction':
-            result = begin_transaction(design, ui, task[1],
-                                      task[2] if len(task) > 2 else "",
-                                      task[3] if len(task) > 3 else True,
-                                      task[4] if len(task) > 4 else False)
-            query_results['begin_transaction'] = result
-        elif task[0] == 'commit_transaction':
-            result = commit_transaction(design, ui, task[1],
-                                       task[2] if len(task) > 2 else False)
-            query_results['commit_transaction'] = result
-        elif task[0] == 'rollback_transaction':
-            result = rollback_transaction(design, ui, task[1])
-            query_results['rollback_transaction'] = result
-        elif task[0] == 'get_operation_log':
-            result = get_operation_log(design, ui,
-                                      task[1] if len(task) > 1 else 20,
-                                      task[2] if len(task) > 2 else None,
-                                      task[3] if len(task) > 3 else None,
-                                      task[4] if len(task) > 4 else None)
-            query_results['get_operation_log'] = result
-        elif task[0] == 'create_sketch_on_body_plane':
-            result = create_sketch_on_body_plane(design, ui, task[1], task[2],
-                                                 task[3] if len(task) > 3 else 0,
-                                                 task[4] if len(task) > 4 else None)
-            query_results['create_sketch_on_body_plane'] = result
-        elif task[0] == 'validate_face_exists':
-            result = validate_face_exists(design, ui, task[1], task[2])
-            query_results['validate_face_exists'] = result
-        elif task[0] == 'select_faces_by_semantic':
-            result = select_faces_by_semantic(design, ui, task[1], task[2])
-            query_results['select_faces_by_semantic'] = result
-        elif task[0] == 'clear_sketch':
-            sketch_id = task[1] if len(task) > 1 else None
-            result = clear_sketch(design, ui, sketch_id)
-            query_results['clear_sketch'] = result
-        elif task[0] == 'extrude_safe':
-            result = extrude_safe(design, ui, task[1], task[2], task[3],
-                                task[4] if len(task) > 4 else "normal",
-                                task[5] if len(task) > 5 else True,
-                                task[6] if len(task) > 6 else True)
-            query_results['extrude_safe'] = result
-        elif task[0] == 'chamfer_edges':
-            distance = task[1]
-            edge_ids = task[2] if len(task) > 2 else None
-            angle = task[3] if len(task) > 3 else 45.0
-            result = chamfer_edges(design, ui, distance, edge_ids, angle)
-            query_results['chamfer_edges'] = result
-        elif task[0] == 'split_body':
-            body_id = task[1] if len(task) > 1 else None
-            split_tool = task[2] if len(task) > 2 else "XY"
-            keep_both = task[3] if len(task) > 3 else True
-            result = split_body(design, ui, body_id, split_tool, keep_both)
-            query_results['split_body'] = result
-        elif task[0] == 'scale_body':
-            body_id = task[1] if len(task) > 1 else None
-            scale_factor = task[2] if len(task) > 2 else 1.0
-            uniform = task[3] if len(task) > 3 else True
-            scale_x = task[4] if len(task) > 4 else 1.0
-            scale_y = task[5] if len(task) > 5 else 1.0
-            scale_z = task[6] if len(task) > 6 else 1.0
-            result = scale_body(design, ui, body_id, scale_factor, uniform, scale_x, scale_y, scale_z)
-            query_results['scale_body'] = result
+        return dispatch_task(task)
+
+
+def request_task_wakeup():
+    """
+    Fires MCPTaskEvent so the main thread drains the task queue right away.
+    Coalesced: while a wakeup is pending, further calls are no-ops.
+    """
+    if app is None:
+        return
+    with task_wakeup_lock:
+        if task_wakeup_pending.is_set():
+            return
+        task_wakeup_pending.set()
+    try:
+        app.fireCustomEvent(myCustomEvent, json.dumps({}))
+    except:
+        task_wakeup_pending.clear()
+
+
+def record_task_tick(tick_start, processed, remaining, coalesced=0):
+    """Stores duration, processed and coalesced tasks and remaining queue depth of one notify tick"""
+    duration_ms = (time.perf_counter() - tick_start) * 1000
+    exhausted = remaining > 0
+    task_tick_history.append({
+        "timestamp": time.time(),
+        "duration_ms": round(duration_ms, 2),
+        "tasks": processed,
+        "coalesced": coalesced,
+        "remaining": remaining,
+        "budget_exhausted": exhausted
+    })
+    task_tick_totals["ticks"] += 1
+    task_tick_totals["tasks"] += processed
+    task_tick_totals["coalesced"] += coalesced
+    task_tick_totals["budget_exhausted"] += int(exhausted)
+    task_tick_totals["max_duration_ms"] = max(task_tick_totals["max_duration_ms"], round(duration_ms, 2))
+
+
+def get_task_metrics():
+    """Per-tick metrics for GET /task_metrics (plain Python data, safe off the main thread)"""
+    ticks = list(task_tick_history)
+    last = ticks[-1] if ticks else None
+    return {
+        "tick_budget_ms": TASK_TICK_BUDGET * 1000,
+        "queue_depth": task_queue.qsize(),
+        "lane_depth": task_queue.depths(),
+        "lane_limits": dict(TASK_LANE_LIMITS),
+        "totals": dict(task_tick_totals),
+        "last_tick": last,
+        "avg_duration_ms": round(sum(t["duration_ms"] for t in ticks) / len(ticks), 2) if ticks else 0.0,
+        "recent_ticks": ticks
+    }
+
+
+###Task Lanes######
+
+class LaneQueue:
+    """
+    Task queue with priority lanes: interactive read-only queries before geometry
+    mutations before bulk jobs (exports). Each lane is FIFO and every task gets a
+    sequence number. Mutations are ordering barriers: a query or export never runs
+    before a mutation queued ahead of it, and a mutation never runs before a query
+    or export queued ahead of it. Priority only reorders the read-only tasks
+    between two mutations. Lanes are bounded; put() raises queue.Full when a lane
+    is full. Offers the parts of the queue.Queue interface the add-in uses.
+    """
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self.lanes = {lane: deque() for lane in TASK_LANES}
+        self.lock = threading.Lock()
+        self.sequence = itertools.count()
+
+    def put(self, item, lane="mutation"):
+        with self.lock:
+            items = self.lanes[lane]
+            if len(items) >= self.limits[lane]:
+                raise queue.Full(lane)
+            items.append((next(self.sequence), time.monotonic(), item))
+
+    def barrier(self):
+        """Sequence number of the oldest pending mutation (None if there is none). Caller holds the lock."""
+        mutations = self.lanes["mutation"]
+        return mutations[0][0] if mutations else None
+
+    def next_lane(self):
+        """Lane to serve next. Caller holds the lock; raises queue.Empty."""
+        barrier = self.barrier()
+        # Nur Lese-Tasks vor der ältesten Mutation dürfen umsortiert werden
+        heads = [(items[0][1], lane) for lane, items in self.lanes.items()
+                 if items and lane != "mutation" and (barrier is None or items[0][0] < barrier)]
+        if not heads:
+            if barrier is None:
+                raise queue.Empty
+            return "mutation"
+        # Zu lange wartende Lanes zuerst (älteste zuerst), sonst strikt nach Priorität
+        now = time.monotonic()
+        overdue = [head for head in heads if now - head[0] >= TASK_LANE_MAX_WAIT]
+        return min(overdue)[1] if overdue else heads[0][1]
+
+    def get_nowait(self):
+        with self.lock:
+            return self.lanes[self.next_lane()].popleft()[2]
+
+    def get_coalesced(self):
+        """
+        Like get_nowait(), but returns (request_ids, task) with redundant work merged:
+        identical pending tasks in the interactive (read-only) lane run once for all
+        their requests, and a run of set_parameter writes to the same name at the
+        head of the mutation lane collapses to the last value. Merging never crosses
+        a task the merged ones are ordered against.
+        """
+        with self.lock:
+            lane = self.next_lane()
+            items = self.lanes[lane]
+            request_id, task = items.popleft()[2]
+            request_ids = [request_id]
+            if lane == "interactive":
+                # Gleiche Queries nur bis zur nächsten Mutation zusammenfassen
+                barrier = self.barrier()
+                remaining = deque()
+                for entry in items:
+                    if entry[2][1] == task and (barrier is None or entry[0] < barrier):
+                        request_ids.append(entry[2][0])
+                    else:
+                        remaining.append(entry)
+                self.lanes[lane] = remaining
+            elif task[0] == "set_parameter":
+                # Nur direkt aufeinanderfolgende Writes: weder andere Mutationen noch
+                # dazwischen eingereihte Lese-Tasks dürfen übersprungen werden
+                while items and items[0][2][1][0] == "set_parameter" and items[0][2][1][1] == task[1]:
+                    if any(other and other[0][0] < items[0][0]
+                           for name, other in self.lanes.items() if name != "mutation"):
+                        break
+                    request_id, task = items.popleft()[2]
+                    request_ids.append(request_id)
+            return request_ids, task
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def qsize(self, lane=None):
+        with self.lock:
+            if lane is not None:
+                return len(self.lanes[lane])
+            return sum(len(items) for items in self.lanes.values())
+
+    def full(self, lane):
+        with self.lock:
+            return len(self.lanes[lane]) >= self.limits[lane]
+
+    def depths(self):
+        with self.lock:
+            return {lane: len(items) for lane, items in self.lanes.items()}
+
+
+task_queue = LaneQueue(TASK_LANE_LIMITS)  # Queue für thread-safe Aktionen
+
+
+def task_lane(task):
+    """Lane of a task from its registry entry (unknown tasks count as mutations)"""
+    spec = COMMANDS.get(task[0])
+    return spec["lane"] if spec else "mutation"
+
+
+def enqueue_task(task, request_id=None):
+    """
+    Legt eine Task in ihre Lane und weckt den Main-Thread (koalesziert).
+    Raises queue.Full if the lane is at its limit.
+    """
+    task_queue.put((request_id, task), task_lane(task))
+    request_task_wakeup()
 
 
+###Request Results######
+
+def evict_request_results(now=None):
+    """Drops entries older than REQUEST_RESULT_TTL and the oldest beyond REQUEST_RESULT_MAX. Caller holds the lock."""
+    now = now or time.time()
+    while request_results:
+        request_id, entry = next(iter(request_results.items()))
+        if len(request_results) > REQUEST_RESULT_MAX or now - entry["created"] > REQUEST_RESULT_TTL:
+            request_results.popitem(last=False)
+        else:
+            break
+
+
+def register_request(request_id, task_name):
+    """Creates the pending entry (the future-like handle) for a queued task"""
+    entry = {
+        "request_id": request_id,
+        "task": task_name,
+        "status": "pending",
+        "result": None,
+        "error": None,
+        "created": time.time(),
+        "finished": None,
+        "done": threading.Event()
+    }
+    with request_results_lock:
+        request_results.pop(request_id, None)
+        request_results[request_id] = entry
+        evict_request_results(entry["created"])
+    return entry
+
+
+def claim_idempotency_key(idempotency_key, request_id, task_name):
+    """
+    Returns (entry, created). A key seen before (for the same task) returns the
+    stored entry with created=False, so the caller must not queue the task again.
+    """
+    key = (idempotency_key, task_name)
+    with request_results_lock:
+        entry = idempotency_keys.get(key)
+        if entry is not None:
+            idempotency_keys.move_to_end(key)
+            return entry, False
+        entry = register_request(request_id, task_name)
+        idempotency_keys[key] = entry
+        while len(idempotency_keys) > IDEMPOTENCY_MAX:
+            idempotency_keys.popitem(last=False)
+        return entry, True
+
+
+def release_request(request_id, idempotency_key=None, task_name=None):
+    """Drops the handle of a task that could not be queued (lane full), so a retry starts fresh"""
+    with request_results_lock:
+        request_results.pop(request_id, None)
+        if idempotency_key:
+            idempotency_keys.pop((idempotency_key, task_name), None)
+
+
+def complete_request(request_id, result=None, error=None):
+    """Stores the outcome of a task (main thread) and wakes any waiting HTTP handler"""
+    if request_id is None:
+        return
+    with request_results_lock:
+        entry = request_results.get(request_id)
+    if entry is None:
+        return  # bereits verworfen (TTL)
+    entry["result"] = result
+    entry["error"] = error
+    entry["status"] = "error" if error is not None else "done"
+    entry["finished"] = time.time()
+    entry["done"].set()
+
+
+def get_request_result(request_id, wait=0.0):
+    """
+    Returns the public view of a request, optionally blocking up to `wait`
+    seconds for it to finish. Returns None for unknown or expired IDs.
+    """
+    with request_results_lock:
+        entry = request_results.get(request_id)
+    if entry is None:
+        return None
+    return describe_request(entry, wait)
+
+
+def describe_request(entry, wait=0.0):
+    """Public view of a request entry (see get_request_result)"""
+    if wait and wait > 0:
+        entry["done"].wait(min(wait, REQUEST_WAIT_MAX))
+    response = {
+        "request_id": entry["request_id"],
+        "task": entry["task"],
+        "status": entry["status"]
+    }
+    if entry["status"] == "pending":
+        response["result_url"] = f"/result/{entry['request_id']}"
+    else:
+        response["result"] = entry["result"]
+        if entry["error"] is not None:
+            response["error"] = entry["error"]
+        response["execution_time_ms"] = round((entry["finished"] - entry["created"]) * 1000, 2)
+    return response
+
 
 class TaskThread(threading.Thread):
-    def __init__(self, event):
+    """
+    Fallback ticker. Tasks are woken up by enqueue_task(); this thread only
+    refreshes the parameter snapshot and catches lost wakeups.
+    """
+    def __init__(self, event, interval=TASK_FALLBACK_INTERVAL):
         threading.Thread.__init__(self)
         self.stopped = event
+        self.interval = interval
 
     def run(self):
-        # Alle 200ms Custom Event feuern für Task-Verarbeitung
-        while not self.stopped.wait(0.2):
+        while not self.stopped.wait(self.interval):
             try:
-                app.fireCustomEvent(myCustomEvent, json.dumps({}))
+                if not task_queue.empty():
+                    # Event verloren gegangen: Flag zurücksetzen und neu feuern
+                    task_wakeup_pending.clear()
+                request_task_wakeup()
             except:
                 break
 
 
 
+###Command Registry######
+# Jede Operation wird einmal mit @command registriert. Daraus entstehen der
+# HTTP-Router (POST/GET), die Task-Dispatch-Tabelle und die Tool-Liste (GET /commands).
+COMMANDS = {}       # Task-Name -> Spezifikation
+POST_ROUTES = {}    # POST-Pfad -> Task-Name
+GET_ROUTES = {}     # GET-Pfad -> query_results-Key
+ARG_TYPE_NAMES = {None: "any", float: "float", int: "int", str: "str", bool: "bool", list: "list", dict: "dict"}
+
+
+def arg(key, type=None, default=None, required=False):
+    """
+    Argument schema entry: JSON key, target type (None = pass through), default
+    and whether the request must provide it (None, "" and [] count as missing).
+    """
+    return {"key": key, "type": type, "default": default, "required": required}
+
+
+def command(name, path=None, args=(), result_key=None, message=None, query=False, parse=None, lane="mutation"):
+    """
+    Registers a Fusion operation.
+
+    The task tuple is (name, *args) in schema order and the handler is called as
+    handler(design, ui, *args). `path` exposes it as POST route, `result_key`
+    stores the return value in query_results (served via GET on the same path),
+    `query` adds the "results available via GET" note to the acknowledgement,
+    `parse` replaces the schema-based body parsing and `lane` picks the task
+    queue lane ("interactive" for read-only queries, "mutation", "bulk").
+    """
+    def decorator(handler):
+        if name in COMMANDS or (path and path in POST_ROUTES):
+            raise ValueError(f"Command registered twice: {name} {path}")
+        COMMANDS[name] = {
+            "name": name,
+            "handler": handler,
+            "path": path,
+            "args": list(args),
+            "result_key": result_key,
+            "message": message or f"{name} requested",
+            "query": query,
+            "parse": parse,
+            "lane": lane
+        }
+        if path:
+            POST_ROUTES[path] = name
+            if result_key:
+                GET_ROUTES[path] = result_key
+        return handler
+    return decorator
+
+
+def coerce_arg(schema, value):
+    """Converts a JSON value to the schema type; None falls back to the default"""
+    if value is None:
+        default = schema["default"]
+        return list(default) if isinstance(default, list) else default
+    arg_type = schema["type"]
+    if arg_type is None:
+        return value
+    if arg_type in (list, dict):
+        return value if isinstance(value, arg_type) else coerce_arg(schema, None)
+    return arg_type(value)
+
+
+def parse_command_args(spec, data):
+    """Builds the task tuple from a JSON body. Raises ValueError for missing or invalid arguments."""
+    if spec["parse"]:
+        return spec["parse"](data)
+    missing = [schema["key"] for schema in spec["args"]
+               if schema["required"] and data.get(schema["key"]) in (None, "", [])]
+    if missing:
+        raise ValueError("Missing " + ", ".join(missing))
+    return tuple([spec["name"]] + [coerce_arg(schema, data.get(schema["key"])) for schema in spec["args"]])
+
+
+def command_ack(spec, task):
+    """Acknowledgement for a queued command (the request handle is merged in by send_json)"""
+    values = {schema["key"]: value for schema, value in zip(spec["args"], task[1:])}
+    ack = {"message": spec["message"].format(**values)}
+    if spec["query"] and spec["path"] in GET_ROUTES:
+        ack["note"] = f"Results will be available via GET {spec['path']} after processing"
+    return ack
+
+
+class TaskUI:
+    """
+    Stand-in for ui on the task path in headless mode. Everything is forwarded to the
+    real UserInterface except messageBox, which collects the text instead of blocking.
+    """
+    def __init__(self, target):
+        self._target = target
+        self.messages = []
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def messageBox(self, text, *args, **kwargs):
+        self.messages.append(str(text))
+        notify_non_modal(text)
+        return 0  # DialogResults.DialogOK
+
+    def selectEntity(self, *args, **kwargs):
+        # selectEntity wartet auf einen Klick im Viewport - headless würde die Queue hängen
+        if HEADLESS:
+            raise RuntimeError(HEADLESS_SELECTION_ERROR)
+        return self._target.selectEntity(*args, **kwargs)
+
+
+def notify_non_modal(text):
+    """Writes a line to the Text Commands palette (never modal, never raises)"""
+    if NOTIFY_MODE != "text_commands" or ui is None:
+        return
+    try:
+        palette = ui.palettes.itemById('TextCommands')
+        if palette:
+            palette.writeText(f"[Fusion MCP] {text}")
+    except Exception:
+        pass
+
+
+def show_message(text):
+    """messageBox outside of tasks; non-modal in headless mode"""
+    if HEADLESS:
+        notify_non_modal(text)
+    elif ui:
+        ui.messageBox(text)
+
+
+def attach_ui_messages(name, result, messages):
+    """Puts messages a handler tried to show into its result and the operation log"""
+    if result is None:
+        # Handler ohne Rückgabewert: die Meldung ist der einzige Hinweis auf den Fehler.
+        # Bei "Failed:\n<traceback>" steht die eigentliche Exception in der letzten Zeile.
+        lines = [line.strip() for line in messages[-1].splitlines() if line.strip()]
+        result = {"success": False, "error": lines[-1] if lines else name}
+    if isinstance(result, dict):
+        result.setdefault("messages", messages)
+        failed = result.get("success") is False
+    else:
+        failed = False
+    log_operation(name, {}, "failed" if failed else "message", result, error_message=messages[-1])
+    return result
+
+
+def dispatch_task(task, captured=None):
+    """
+    Runs a task on the main thread through the registry and stores query results.
+    With a `captured` list the handler gets the TaskUI proxy in every mode and the
+    messages it tried to show are appended to the list (used by /batch).
+    """
+    spec = COMMANDS.get(task[0])
+    if spec is None:
+        raise ValueError(f"Unknown task: {task[0]}")
+    args = list(task[1:])
+    # Fehlende Argumente (z.B. aus /batch) mit den Defaults des Schemas auffüllen
+    for schema in spec["args"][len(args):]:
+        args.append(coerce_arg(schema, None))
+    task_ui = TaskUI(ui) if (HEADLESS or captured is not None) and ui is not None else ui
+    result = spec["handler"](design, task_ui, *args)
+    if task_ui is not ui and task_ui.messages:
+        result = attach_ui_messages(task[0], result, task_ui.messages)
+        if captured is not None:
+            captured.extend(task_ui.messages)
+    if spec["result_key"]:
+        query_results[spec["result_key"]] = result
+    return result
+
+
+def export_commands():
+    """Registry as JSON (GET /commands): names, routes and typed argument schemas"""
+    exported = []
+    for spec in COMMANDS.values():
+        doc = (spec["handler"].__doc__ or "").strip()
+        exported.append({
+            "name": spec["name"],
+            "path": spec["path"],
+            "result_path": spec["path"] if spec["path"] in GET_ROUTES else None,
+            "description": doc.splitlines()[0] if doc else "",
+            "args": [{
+                "key": schema["key"],
+                "type": ARG_TYPE_NAMES.get(schema["type"], getattr(schema["type"], "__name__", "any")),
+                "default": schema["default"],
+                "required": schema["required"]
+            } for schema in spec["args"]]
+        })
+    return exported
+
+
+def parse_batch(data):
+    """
+    /batch body: {"operations": [{"op": name, "args": [...] or {...}}], "stop_on_error": bool}.
+    List args are positional in schema order, dict args are parsed like the command's own route.
+    """
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list")
+    tasks = []
+    for op in operations:
+        name = op.get('op') if isinstance(op, dict) else None
+        args = op.get('args', []) if isinstance(op, dict) else None
+        if name not in COMMANDS or name == 'batch':
+            raise ValueError(f"Invalid operation: {op}")
+        if isinstance(args, list):
+            # Positionsargumente in Schema-Reihenfolge, danach dieselben Pflicht- und Typprüfungen
+            schemas = COMMANDS[name]["args"]
+            if len(args) > len(schemas):
+                raise ValueError(f"Too many arguments for {name}: {op}")
+            args = {schema["key"]: value for schema, value in zip(schemas, args)}
+        if not isinstance(args, dict):
+            raise ValueError(f"Invalid operation: {op}")
+        tasks.append(parse_command_args(COMMANDS[name], args))
+    return ('batch', tasks, bool(data.get('stop_on_error', True)))
+
+
+@command('batch', path='/batch', result_key='batch', query=True, parse=parse_batch,
+         message="Batch requested", args=[arg('operations', list, []), arg('stop_on_error', bool, True)])
+def run_batch(design, ui, tasks, stop_on_error=True):
+    """
+    Runs several tasks back to back inside the current notify call.
+    A task fails if it raises, returns {"success": False} or tries to show a
+    message box (captured instead of shown, also outside headless mode).
+    """
+    start_time = time.time()
+    results = []
+    failed = 0
+    for index, task in enumerate(tasks):
+        try:
+            messages = []
+            result = dispatch_task(task, captured=messages)
+            success = not messages and not (isinstance(result, dict) and result.get("success") is False)
+            entry = {"index": index, "op": task[0], "success": success, "result": result}
+        except Exception as e:
+            success = False
+            entry = {"index": index, "op": task[0], "success": False, "error": str(e)}
+        results.append(entry)
+        if not success:
+            failed += 1
+            if stop_on_error:
+                break
+
+    return {
+        "success": failed == 0,
+        "total": len(tasks),
+        "executed": len(results),
+        "failed": failed,
+        "stopped_early": len(results) < len(tasks),
+        "results": results,
+        "execution_time_ms": round((time.time() - start_time) * 1000, 2)
+    }
+
+
 ###Geometry Functions######
 
+@command('draw_text', path='/draw_text', message="Text wird erstellt", args=[
+    arg('text', str, "Hello"), arg('thickness', float, 0.5),
+    arg('x_1', float, 0), arg('y_1', float, 0), arg('z_1', float, 0),
+    arg('x_2', float, 10), arg('y_2', float, 4), arg('z_2', float, 0),
+    arg('extrusion_value', float, 1.0), arg('plane', str, 'XY')])
 def draw_text(design, ui, text, thickness,
               x_1, y_1, z_1, x_2, y_2, z_2, extrusion_value,plane="XY"):
 
@@ -380,6 +757,8 @@ def draw_text(design, ui, text, thickness,
     except:
         if ui:
             ui.messageBox('Failed draw_text:\n{}'.format(traceback.format_exc()))
+@command('draw_sphere', path='/sphere', message="Sphere wird erstellt", args=[
+    arg('radius', float, 5.0), arg('x', float, 0), arg('y', float, 0), arg('z', float, 0)])
 def create_sphere(design, ui, radius, x, y, z):
     try:
         rootComp = design.rootComponent
@@ -419,6 +798,10 @@ def create_sphere(design, ui, radius, x, y, z):
 
 
 
+@command('draw_box', path='/Box', message="Box wird erstellt", args=[
+    arg('height', float, 5), arg('width', float, 5), arg('depth', float, 5),
+    arg('x', float, 0), arg('y', float, 0), arg('z', float, 0),
+    arg('plane')])  # 'XY', 'XZ', 'YZ' or None
 def draw_Box(design, ui, height, width, depth,x,y,z, plane=None):
     """
     Draws Box with given dimensions height, width, depth at position (x,y,z)
@@ -463,6 +846,11 @@ def draw_Box(design, ui, height, width, depth,x,y,z, plane=None):
         if ui:
             ui.messageBox('Failed draw_Box:\n{}'.format(traceback.format_exc()))
 
+@command('ellipsis', path='/ellipsis', message="Ellipsis wird erstellt", args=[
+    arg('x_center', float, 0), arg('y_center', float, 0), arg('z_center', float, 0),
+    arg('x_major', float, 10), arg('y_major', float, 0), arg('z_major', float, 0),
+    arg('x_through', float, 5), arg('y_through', float, 4), arg('z_through', float, 0),
+    arg('plane', str, 'XY')])
 def draw_ellipis(design,ui,x_center,y_center,z_center,
                  x_major, y_major,z_major,x_through,y_through,z_through,plane ="XY"):
     """
@@ -488,6 +876,10 @@ def draw_ellipis(design,ui,x_center,y_center,z_center,
         if ui:
             ui.messageBox('Failed to draw ellipsis:\n{}'.format(traceback.format_exc()))
 
+@command('draw_2d_rectangle', path='/draw_2d_rectangle', message="2D Rechteck wird erstellt", args=[
+    arg('x_1', float, 0), arg('y_1', float, 0), arg('z_1', float, 0),
+    arg('x_2', float, 1), arg('y_2', float, 1), arg('z_2', float, 0),
+    arg('plane', None, 'XY')])
 def draw_2d_rect(design, ui, x_1, y_1, z_1, x_2, y_2, z_2, plane="XY"):
     rootComp = design.rootComponent
     sketches = rootComp.sketches
@@ -531,6 +923,9 @@ def draw_2d_rect(design, ui, x_1, y_1, z_1, x_2, y_2, z_2, plane="XY"):
 
 
 
+@command('circle', path='/create_circle', message="Circle wird erstellt", args=[
+    arg('radius', float, 1.0), arg('x', float, 0), arg('y', float, 0), arg('z', float, 0),
+    arg('plane', None, 'XY')])
 def draw_circle(design, ui, radius, x, y, z, plane="XY"):
 
     """
@@ -601,6 +996,8 @@ def draw_sphere(design, ui, radius, x, y, z):
 #USELESS
 
 
+@command('draw_witzenmann', path='/Witzenmann', message="Witzenmann-Logo wird erstellt", args=[
+    arg('scale', None, 1.0), arg('z', float, 0)])
 def draw_Witzenmann(design, ui,scaling,z):
     """
     Draws Witzenmannlogo
@@ -653,6 +1050,8 @@ def draw_Witzenmann(design, ui,scaling,z):
 ###2D Geometry Functions######
 
 
+@command('move_body', path='/move_body', message="Body wird verschoben", args=[
+    arg('x', float, 0), arg('y', float, 0), arg('z', float, 0)])
 def move_last_body(design,ui,x,y,z):
 
     try:
@@ -687,6 +1086,8 @@ def move_last_body(design,ui,x,y,z):
             ui.messageBox('Failed to move the body:\n{}'.format(traceback.format_exc()))
 
 
+@command('pocket_recess', path='/pocket_recess', result_key='pocket_recess', message="Pocket/Recess wird erstellt", args=[
+    arg('depth', float, 1.0), arg('face_index', int), arg('body_id'), arg('sketch_id')])
 def pocket_recess(design, ui, depth, face_index=None, body_id=None, sketch_id=None):
     """
     Creates a pocket/recess by cutting a sketch into a body.
@@ -715,28 +1116,12 @@ def pocket_recess(design, ui, depth, face_index=None, body_id=None, sketch_id=No
         # Get the target body
         target_body = None
         if body_id is not None:
-            if isinstance(body_id, int):
-                if 0 <= body_id < bodies.count:
-                    target_body = bodies.item(body_id)
-            else:
-                # Try to find by entity token
-                for i in range(bodies.count):
-                    if bodies.item(i).entityToken == body_id:
-                        target_body = bodies.item(i)
-                        break
+            target_body = find_body(design, body_id)
 
         # Get the sketch to use
         target_sketch = None
         if sketch_id is not None:
-            if isinstance(sketch_id, int):
-                if 0 <= sketch_id < sketches.count:
-                    target_sketch = sketches.item(sketch_id)
-            else:
-                # Try to find by entity token
-                for i in range(sketches.count):
-                    if sketches.item(i).entityToken == sketch_id:
-                        target_sketch = sketches.item(i)
-                        break
+            target_sketch = find_sketch(design, sketch_id)
         else:
             # Use the last sketch if not specified
             if sketches.count == 0:
@@ -789,6 +1174,8 @@ def pocket_recess(design, ui, depth, face_index=None, body_id=None, sketch_id=No
         return {"success": False, "error": str(e)}
 
 
+@command('sketch_on_face', path='/sketch_on_face', message="Sketch auf Face wird erstellt", args=[
+    arg('body_index', int, -1), arg('face_index', int, 0)])
 def sketch_on_face(design, ui, body_index, face_index):
     """
     Creates a new sketch on a specific face of a body.
@@ -833,6 +1220,8 @@ def sketch_on_face(design, ui, body_index, face_index):
             ui.messageBox('Failed sketch_on_face:\n{}'.format(traceback.format_exc()))
 
 
+@command('create_work_plane', path='/create_work_plane', message="Work Plane wird erstellt", args=[
+    arg('plane_type', str, 'offset_xy'), arg('offset_distance', float, 0.0), arg('reference_index', int, 0)])
 def create_work_plane(design, ui, plane_type, offset_distance, reference_index=0):
     """
     Creates a construction/work plane for advanced sketching.
@@ -881,6 +1270,8 @@ def create_work_plane(design, ui, plane_type, offset_distance, reference_index=0
             ui.messageBox('Failed create_work_plane:\n{}'.format(traceback.format_exc()))
 
 
+@command('project_edges', path='/project_edges', message="Edges werden projiziert", args=[
+    arg('body_index', int)])
 def project_edges(design, ui, body_index=None):
     """
     Projects edges from a body onto the current sketch plane.
@@ -927,6 +1318,9 @@ def project_edges(design, ui, body_index=None):
             ui.messageBox('Failed project_edges:\n{}'.format(traceback.format_exc()))
 
 
+@command('draw_polygon', path='/draw_polygon', message="Polygon wird erstellt", args=[
+    arg('sides', int, 6), arg('radius', float, 5.0),
+    arg('x', float, 0), arg('y', float, 0), arg('z', float, 0), arg('plane', str, 'XY')])
 def draw_polygon(design, ui, sides, radius, x, y, z, plane="XY"):
     """
     Draws a regular polygon with the specified number of sides.
@@ -1004,6 +1398,8 @@ def draw_polygon(design, ui, sides, radius, x, y, z, plane="XY"):
             ui.messageBox('Failed draw_polygon:\n{}'.format(traceback.format_exc()))
 
 
+@command('offset_surface', path='/offset_surface', message="Surface Offset wird erstellt", args=[
+    arg('distance', float, 1.0), arg('face_index', int, 0)])
 def offset_surface(design, ui, distance, face_index=0):
     """
     Creates an offset surface by offsetting faces of a body.
@@ -1048,6 +1444,8 @@ def offset_surface(design, ui, distance, face_index=0):
             ui.messageBox('Failed offset_surface:\n{}'.format(traceback.format_exc()))
 
 
+@command('mirror_feature', path='/mirror_feature', message="Mirror Feature wird erstellt", args=[
+    arg('mirror_plane', str, 'XY'), arg('body_index', int)])
 def mirror_feature(design, ui, mirror_plane, body_index=None):
     """
     Mirrors the latest body or specified body across a plane.
@@ -1094,6 +1492,8 @@ def mirror_feature(design, ui, mirror_plane, body_index=None):
             ui.messageBox('Failed mirror_feature:\n{}'.format(traceback.format_exc()))
 
 
+@command('offsetplane', path='/offsetplane', message="Offset Plane wird erstellt", args=[
+    arg('offset', float, 0.0), arg('plane', str, 'XY')])
 def offsetplane(design, ui, offset, plane="XY"):
     """
     Creates a new offset construction plane which can be selected.
@@ -1124,6 +1524,8 @@ def offsetplane(design, ui, offset, plane="XY"):
 
 
 
+@command('threaded', path='/threaded', message="Threaded Feature wird erstellt", args=[
+    arg('inside', bool, True), arg('allsizes', int, 30)])
 def create_thread(design, ui,inside,sizes):
     """
 
@@ -1132,6 +1534,8 @@ def create_thread(design, ui,inside,sizes):
     lengt: length of the thread
     sizes : index of the size in the allsizes list
     """
+    if HEADLESS:
+        return {"success": False, "error": HEADLESS_SELECTION_ERROR}
     try:
         rootComp = design.rootComponent
         sketches = rootComp.sketches
@@ -1191,6 +1595,8 @@ def create_thread(design, ui,inside,sizes):
 
 
 
+@command('spline', path='/spline', message="Spline wird erstellt", args=[
+    arg('points', list, []), arg('plane', None, 'XY')])
 def spline(design, ui, points, plane="XY"):
     """
     Draws a spline through the given points on the specified plane
@@ -1221,6 +1627,9 @@ def spline(design, ui, points, plane="XY"):
 
 
 
+@command('arc', path='/arc', message="Arc wird erstellt", args=[
+    arg('point1', None, [0, 0]), arg('point2', None, [1, 1]), arg('point3', None, [2, 0]),
+    arg('plane', None, 'XY'), arg('connect', bool, False)])
 def arc(design,ui,point1,point2,points3,plane = "XY",connect = False):
     """
     This creates arc between two points on the specified plane
@@ -1258,6 +1667,8 @@ def arc(design,ui,point1,point2,points3,plane = "XY",connect = False):
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
 
+@command('draw_lines', path='/draw_lines', message="Lines werden erstellt", args=[
+    arg('points', list, []), arg('plane', None, 'XY')])
 def draw_lines(design,ui, points,Plane = "XY"):
     """
     User input: points = [(x1,y1), (x2,y2), ...]
@@ -1290,6 +1701,10 @@ def draw_lines(design,ui, points,Plane = "XY"):
         if ui :
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
+@command('draw_one_line', path='/draw_one_line', message="Line wird erstellt", args=[
+    arg('x1', float, 0), arg('y1', float, 0), arg('z1', float, 0),
+    arg('x2', float, 1), arg('y2', float, 1), arg('z2', float, 0),
+    arg('plane', None, 'XY')])
 def draw_one_line(design, ui, x1, y1, z1, x2, y2, z2, plane="XY"):
     """
     Draws a single line between two points (x1, y1, z1) and (x2, y2, z2) on the specified plane
@@ -1326,6 +1741,7 @@ def draw_one_line(design, ui, x1, y1, z1, x2, y2, z2, plane="XY"):
 
 
 ###3D Geometry Functions######
+@command('loft', path='/loft', message="Loft wird erstellt", args=[arg('sketchcount', int, 2)])
 def loft(design, ui, sketchcount):
     """
     Creates a loft between the last 'sketchcount' sketches
@@ -1370,6 +1786,8 @@ def loft(design, ui, sketchcount):
 
 
 
+@command('boolean_operation', path='/boolean_operation', message="Boolean Operation wird ausgeführt", args=[
+    arg('operation', None, 'join')])  # 'join', 'cut', 'intersect'
 def boolean_operation(design,ui,op):
     """
     This function performs boolean operations (cut, intersect, join)
@@ -1380,7 +1798,6 @@ def boolean_operation(design,ui,op):
         app = adsk.core.Application.get()
         product = app.activeProduct
         design = adsk.fusion.Design.cast(product)
-        ui  = app.userInterface
 
         # Get the root component of the active design.
         rootComp = design.rootComponent
@@ -1414,6 +1831,7 @@ def boolean_operation(design,ui,op):
 
 
 
+@command('sweep', path='/sweep', message="Sweep wird erstellt")
 def sweep(design,ui):
     try:
         rootComp = design.rootComponent
@@ -1458,6 +1876,8 @@ def sweep(design,ui):
 
 
 
+@command('extrude_last_sketch', path='/extrude_last_sketch', result_key='extrude', message="Letzter Sketch wird extrudiert", args=[
+    arg('value', float, 1.0), arg('taperangle', float, 0.0)])
 def extrude_last_sketch(design, ui, value,taperangle):
     """
     Extrudes the last sketch by the given value and returns the body ID
@@ -1516,6 +1936,8 @@ def extrude_last_sketch(design, ui, value,taperangle):
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
         return {"success": False, "error": str(e)}
 
+@command('shell_body', path='/shell_body', message="Shell body wird erstellt", args=[
+    arg('thickness', float, 0.5), arg('faceindex', int, 0)])
 def shell_existing_body(design, ui, thickness=0.5, faceindex=0):
     """
     Shells the body on a specified face index with given thickness
@@ -1526,14 +1948,8 @@ def shell_existing_body(design, ui, thickness=0.5, faceindex=0):
         features = rootComp.features
         body = rootComp.bRepBodies.item(0)
 
-        # Check if body has already been shelled by examining timeline
-        timeline = design.timeline
-        shell_count = 0
-        for i in range(timeline.count):
-            timeline_obj = timeline.item(i)
-            entity = timeline_obj.entity
-            if entity and entity.objectType == adsk.fusion.ShellFeature.classType():
-                shell_count += 1
+        # Check if body has already been shelled (timeline index, no full timeline scan)
+        shell_count = get_body_feature_counts(design, body).get("Shell", 0)
 
         if shell_count > 0:
             error_msg = (f"Body has already been shelled ({shell_count} shell operation(s) detected). "
@@ -1618,14 +2034,84 @@ def shell_existing_body(design, ui, thickness=0.5, faceindex=0):
         return {"success": False, "error": "unknown_error", "message": error_msg}
 
 
-def fillet_edges(design, ui, radius=0.3, edge_ids=None):
+def add_edge_feature_bisect(design, features, build_input, edges):
+    """
+    Legt ein Feature über alle Kanten an; schlägt das fehl, wird die Kantenmenge
+    halbiert und jede Hälfte erneut versucht, bis die nicht bearbeitbaren Kanten
+    isoliert sind. Statt einem Feature pro Kante entstehen so nur wenige Features.
+
+    Nach jedem erfolgreichen Feature ändert sich die Topologie: die restlichen
+    Kanten werden dann über ihren entityToken neu aufgelöst statt die alten
+    BRepEdge-Objekte weiterzuverwenden.
+
+    :param features: FilletFeatures / ChamferFeatures collection
+    :param build_input: Callable(ObjectCollection) -> feature input
+    :param edges: List of (label, BRepEdge) tuples, see collect_body_edges
+    :return: (feature_count, edges_applied, skipped) - skipped are the labels plus "reason"
+    """
+    feature_count = 0
+    applied = 0
+    skipped = []
+    pending = [edges]
+    while pending:
+        group = pending.pop()
+        if feature_count:
+            # Topologie hat sich geändert: Kanten frisch holen, verschwundene überspringen
+            resolved = []
+            for label, _ in group:
+                found = design.findEntityByToken(label["token"])
+                edge = found[0] if found else None
+                if edge is None or not edge.isValid:
+                    skipped.append(dict(label, reason="edge no longer exists after an earlier feature"))
+                else:
+                    resolved.append((label, edge))
+            group = resolved
+            if not group:
+                continue
+        edgeCollection = adsk.core.ObjectCollection.create()
+        for _, edge in group:
+            edgeCollection.add(edge)
+        try:
+            features.add(build_input(edgeCollection))
+            feature_count += 1
+            applied += len(group)
+        except Exception:
+            if len(group) == 1:
+                skipped.append(dict(group[0][0], reason="feature failed on this edge"))
+                continue
+            middle = len(group) // 2
+            # Zweite Hälfte zuerst auf den Stack, damit die Reihenfolge erhalten bleibt
+            pending.append(group[middle:])
+            pending.append(group[:middle])
+    return feature_count, applied, skipped
+
+
+def collect_body_edges(bodies):
+    """
+    All edges of all bodies as (label, edge) tuples, label = {"body": i, "edge": j, "token"}.
+    Body and edge indices are the numbering before any feature was added.
+    """
+    edges = []
+    for body_idx in range(bodies.count):
+        body = bodies.item(body_idx)
+        for edge_idx in range(body.edges.count):
+            edge = body.edges.item(edge_idx)
+            edges.append(({"body": body_idx, "edge": edge_idx, "token": edge.entityToken}, edge))
+    return edges
+
+
+@command('fillet_edges', path='/fillet_edges', result_key='fillet_edges', message="Fillet edges started", args=[
+    arg('radius', float, 0.3), arg('edges', list), arg('batch', bool, True)])
+def fillet_edges(design, ui, radius=0.3, edge_ids=None, batch=True):
     """
     Fillets edges with specified radius.
     If edge_ids is provided, only those edges are filleted (edge-selective).
-    If edge_ids is None, attempts to fillet all edges (legacy behavior).
+    If edge_ids is None, attempts to fillet all edges: with batch=True as one
+    fillet feature (bisected on failure), otherwise one feature per edge.
 
     :param radius: Fillet radius in cm
     :param edge_ids: List of edge indices or None for all edges
+    :param batch: Combine all edges into as few fillet features as possible
     """
     try:
         rootComp = design.rootComponent
@@ -1637,6 +2123,8 @@ def fillet_edges(design, ui, radius=0.3, edge_ids=None):
 
         successful_fillets = 0
         failed_edges = 0
+        feature_count = None
+        skipped_edges = None
 
         # If specific edge IDs provided, only fillet those
         if edge_ids is not None and len(edge_ids) > 0:
@@ -1668,8 +2156,21 @@ def fillet_edges(design, ui, radius=0.3, edge_ids=None):
                     "success": False,
                     "error": f"Failed to fillet specified edges: {str(e)}"
                 }
+        elif batch:
+            # Ein Feature über alle Kanten, bei Fehlern per Bisektion aufteilen
+            def build_input(edgeCollection):
+                radiusInput = adsk.core.ValueInput.createByReal(radius)
+                filletInput = fillets.createInput()
+                filletInput.isRollingBallCorner = True
+                edgeSetInput = filletInput.edgeSetInputs.addConstantRadiusEdgeSet(edgeCollection, radiusInput, True)
+                edgeSetInput.continuity = adsk.fusion.SurfaceContinuityTypes.TangentSurfaceContinuityType
+                return filletInput
+
+            feature_count, successful_fillets, skipped_edges = add_edge_feature_bisect(
+                design, fillets, build_input, collect_body_edges(bodies))
+            failed_edges = len(skipped_edges)
         else:
-            # Legacy behavior: try to fillet all edges
+            # Legacy behavior: one fillet feature per edge
             for body_idx in range(bodies.count):
                 body = bodies.item(body_idx)
 
@@ -1696,7 +2197,7 @@ def fillet_edges(design, ui, radius=0.3, edge_ids=None):
                         continue
 
         # Return detailed results
-        return {
+        result = {
             "success": True,
             "successful_fillets": successful_fillets,
             "failed_edges": failed_edges,
@@ -1704,13 +2205,19 @@ def fillet_edges(design, ui, radius=0.3, edge_ids=None):
             "message": f"Successfully filleted {successful_fillets} edge(s)" +
                       (f", {failed_edges} edge(s) skipped" if failed_edges > 0 else "")
         }
+        if feature_count is not None:
+            result["feature_count"] = feature_count
+            result["skipped_edges"] = skipped_edges
+        return result
 
     except Exception as e:
         if ui:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
         return {"success": False, "error": str(e)}
 
-def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
+@command('chamfer_edges', path='/chamfer_edges', result_key='chamfer_edges', message="Chamfer edges started", args=[
+    arg('distance', float, 0.5), arg('edges', list), arg('angle', float, 45.0), arg('batch', bool, True)])
+def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0, batch=True):
     """
     Creates angled beveled edges (chamfers) on specified edges.
     Unlike fillets (rounded), chamfers create flat angled surfaces.
@@ -1718,6 +2225,7 @@ def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
     :param distance: Chamfer distance in cm (how far from edge the bevel extends)
     :param edge_ids: List of edge indices or None for all edges
     :param angle: Chamfer angle in degrees (default 45°)
+    :param batch: Without edge_ids, chamfer all edges as one feature (bisected on failure)
     :return: Result with success status and chamfer details
     """
     try:
@@ -1730,6 +2238,8 @@ def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
 
         successful_chamfers = 0
         failed_edges = 0
+        feature_count = None
+        skipped_edges = None
 
         # If specific edge IDs provided, only chamfer those
         if edge_ids is not None and len(edge_ids) > 0:
@@ -1761,8 +2271,20 @@ def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
                     "success": False,
                     "error": f"Failed to chamfer specified edges: {str(e)}"
                 }
+        elif batch:
+            def build_input(edgeCollection):
+                distanceInput = adsk.core.ValueInput.createByReal(distance)
+                chamferInput = chamfers.createInput2()
+                chamferInput.chamferEdgeSets.addEqualDistanceChamferEdgeSet(
+                    edgeCollection, distanceInput, True
+                )
+                return chamferInput
+
+            feature_count, successful_chamfers, skipped_edges = add_edge_feature_bisect(
+                design, chamfers, build_input, collect_body_edges(bodies))
+            failed_edges = len(skipped_edges)
         else:
-            # Try to chamfer all edges
+            # One chamfer feature per edge
             for body_idx in range(bodies.count):
                 body = bodies.item(body_idx)
 
@@ -1783,7 +2305,7 @@ def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
                         failed_edges += 1
                         continue
 
-        return {
+        result = {
             "success": True,
             "successful_chamfers": successful_chamfers,
             "failed_edges": failed_edges,
@@ -1792,12 +2314,18 @@ def chamfer_edges(design, ui, distance=0.5, edge_ids=None, angle=45.0):
             "message": f"Successfully chamfered {successful_chamfers} edge(s)" +
                       (f", {failed_edges} edge(s) skipped" if failed_edges > 0 else "")
         }
+        if feature_count is not None:
+            result["feature_count"] = feature_count
+            result["skipped_edges"] = skipped_edges
+        return result
 
     except Exception as e:
         if ui:
             ui.messageBox('Chamfer failed:\n{}'.format(traceback.format_exc()))
         return {"success": False, "error": str(e)}
 
+@command('split_body', path='/split_body', result_key='split_body', message="Split body started", args=[
+    arg('body_id'), arg('split_tool', None, 'XY'), arg('keep_both', bool, True)])
 def split_body(design, ui, body_id=None, split_tool="sketch_plane", keep_both=True):
     """
     Splits a body using a sketch plane or construction plane.
@@ -1817,12 +2345,10 @@ def split_body(design, ui, body_id=None, split_tool="sketch_plane", keep_both=Tr
 
         # Get target body
         if body_id is not None and isinstance(body_id, str):
-            target_body = None
-            for i in range(bodies.count):
-                body = bodies.item(i)
-                if body.name == body_id or f"body_{i}" == body_id:
-                    target_body = body
-                    break
+            target_body = find_body(design, body_id, by_name=True)
+            if target_body is None and body_id.startswith("body_") and body_id[5:].isdigit():
+                # Positions-Alias "body_<index>"
+                target_body = find_body(design, int(body_id[5:]))
             if target_body is None:
                 return {"success": False, "error": f"Body {body_id} not found"}
         else:
@@ -1864,6 +2390,9 @@ def split_body(design, ui, body_id=None, split_tool="sketch_plane", keep_both=Tr
             ui.messageBox('Split body failed:\n{}'.format(traceback.format_exc()))
         return {"success": False, "error": str(e)}
 
+@command('scale_body', path='/scale_body', result_key='scale_body', message="Scale body started", args=[
+    arg('body_id'), arg('scale_factor', float, 1.0), arg('uniform', bool, True),
+    arg('scale_x', float, 1.0), arg('scale_y', float, 1.0), arg('scale_z', float, 1.0)])
 def scale_body(design, ui, body_id=None, scale_factor=1.0, uniform=True,
               scale_x=1.0, scale_y=1.0, scale_z=1.0):
     """
@@ -1887,12 +2416,10 @@ def scale_body(design, ui, body_id=None, scale_factor=1.0, uniform=True,
 
         # Get target body
         if body_id is not None and isinstance(body_id, str):
-            target_body = None
-            for i in range(bodies.count):
-                body = bodies.item(i)
-                if body.name == body_id or f"body_{i}" == body_id:
-                    target_body = body
-                    break
+            target_body = find_body(design, body_id, by_name=True)
+            if target_body is None and body_id.startswith("body_") and body_id[5:].isdigit():
+                # Positions-Alias "body_<index>"
+                target_body = find_body(design, int(body_id[5:]))
             if target_body is None:
                 return {"success": False, "error": f"Body {body_id} not found"}
         else:
@@ -1949,11 +2476,14 @@ def scale_body(design, ui, body_id=None, scale_factor=1.0, uniform=True,
             ui.messageBox('Scale body failed:\n{}'.format(traceback.format_exc()))
         return {"success": False, "error": str(e)}
 
+@command('revolve_profile', path='/revolve', message="Profil wird revolviert", args=[arg('angle', float, 360)])
 def revolve_profile(design, ui,  angle=360):
     """
     This function revolves already existing sketch with drawn lines from the function draw_lines
     around the given axisLine by the specified angle (default is 360 degrees).
     """
+    if HEADLESS:
+        return {"success": False, "error": HEADLESS_SELECTION_ERROR}
     try:
         rootComp = design.rootComponent
         ui.messageBox('Select a profile to revolve.')
@@ -1975,6 +2505,10 @@ def revolve_profile(design, ui,  angle=360):
 ##############################################################################################
 
 ###Selection Functions######
+@command('rectangular_pattern', path='/rectangular_pattern', message="Rectangular Pattern wird erstellt", args=[
+    arg('axis_one', str, "X"), arg('axis_two', str, "Y"),
+    arg('quantity_one', float, 2), arg('quantity_two', float, 2),
+    arg('distance_one', float, 5), arg('distance_two', float, 5), arg('plane', str, 'XY')])
 def rect_pattern(design,ui,axis_one ,axis_two ,quantity_one,quantity_two,distance_one,distance_two,plane="XY"):
     """
     Creates a rectangular pattern of the last body along the specified axis and plane
@@ -2036,6 +2570,8 @@ def rect_pattern(design,ui,axis_one ,axis_two ,quantity_one,quantity_two,distanc
 
 
 
+@command('circular_pattern', path='/circular_pattern', result_key='circular_pattern', message="Circular Pattern wird erstellt", args=[
+    arg('quantity', float, 6.0), arg('axis', str, "X"), arg('plane', str, 'XY')])
 def circular_pattern(design, ui, quantity, axis, plane):
     """
     Creates a circular pattern and returns detailed confirmation.
@@ -2105,19 +2641,21 @@ def circular_pattern(design, ui, quantity, axis, plane):
 
 
 
+@command('undo', path='/undo', message="Undo wird ausgeführt")
 def undo(design, ui):
     try:
-        app = adsk.core.Application.get()
-        ui  = app.userInterface
-
+        # ui ist im Headless-Betrieb der TaskUI-Proxy, commandDefinitions wird durchgereicht
         cmd = ui.commandDefinitions.itemById('UndoCommand')
         cmd.execute()
+        invalidate_timeline_index()
+        invalidate_entity_index()
 
     except:
         if ui:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
 
+@command('delete_everything', path='/delete_everything', message="Alle Bodies werden gelöscht")
 def delete(design,ui):
     """
     Remove every body and sketch from the design so nothing is left
@@ -2140,6 +2678,7 @@ def delete(design,ui):
 
 
 
+@command('export_step', path='/Export_STEP', lane='bulk', message="STEP Export gestartet", args=[arg('name', str, 'Test.step')])
 def export_as_STEP(design, ui,Name):
     try:
 
@@ -2162,6 +2701,7 @@ def export_as_STEP(design, ui,Name):
         if ui:
             ui.messageBox('Failed export_as_STEP:\n{}'.format(traceback.format_exc()))
 
+@command('cut_extrude', path='/cut_extrude', message="Cut Extrude wird erstellt", args=[arg('depth', float, 1.0)])
 def cut_extrude(design,ui,depth):
     """
     Creates a cut extrude by cutting the last sketch into a body.
@@ -2224,6 +2764,8 @@ def cut_extrude(design,ui,depth):
             ui.messageBox('Failed cut_extrude:\n{}'.format(traceback.format_exc()))
 
 
+@command('extrude_thin', path='/extrude_thin', message="Thin Extrude wird erstellt", args=[
+    arg('thickness', float, 0.5), arg('distance', float, 1.0)])
 def extrude_thin(design, ui, thickness,distance):
     try:
         rootComp = design.rootComponent
@@ -2260,6 +2802,9 @@ def extrude_thin(design, ui, thickness,distance):
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
 
+@command('draw_cylinder', path='/draw_cylinder', message="Cylinder wird erstellt", args=[
+    arg('radius', float, 1.0), arg('height', float, 1.0),
+    arg('x', float, 0), arg('y', float, 0), arg('z', float, 0), arg('plane', None, 'XY')])
 def draw_cylinder(design, ui, radius, height, x,y,z,plane = "XY"):
     """
     Draws a cylinder with given radius and height at position (x,y,z)
@@ -2291,6 +2836,7 @@ def draw_cylinder(design, ui, radius, height, x,y,z,plane = "XY"):
 
 
 
+@command('export_stl', path='/Export_STL', lane='bulk', message="STL Export gestartet", args=[arg('Name', str, 'Test.stl')])
 def export_as_STL(design, ui,Name):
     """
     No idea whats happening here
@@ -2350,9 +2896,10 @@ def export_as_STL(design, ui,Name):
 
 def get_model_parameters(design):
     model_params = []
-    user_params = design.userParameters
+    # Namen sind im Design eindeutig: ein Set-Lookup statt Vergleich mit jedem User-Parameter
+    user_param_names = {param.name for param in design.userParameters}
     for param in design.allParameters:
-        if all(user_params.item(i) != param for i in range(user_params.count)):
+        if param.name not in user_param_names:
             try:
                 wert = str(param.value)
             except Exception:
@@ -2365,18 +2912,371 @@ def get_model_parameters(design):
             })
     return model_params
 
+def get_parameter_signature(design):
+    """Cheap fingerprint of the timeline and parameter collections (no per-parameter work)"""
+    try:
+        timeline = design.timeline
+        timeline_state = (timeline.count, timeline.markerPosition)
+    except Exception:
+        # Direct modeling designs have no timeline
+        timeline_state = None
+    return (timeline_state, design.allParameters.count, design.userParameters.count)
+
+
+def invalidate_parameter_index():
+    """Forces a rebuild on the next refresh, e.g. after an expression changed"""
+    parameter_index_state["dirty"] = True
+
+
+def refresh_parameter_index(design, force=False):
+    """
+    Rebuilds the model-parameter index keyed by name if the timeline or the
+    parameters changed. Must run on the main thread; the HTTP thread only reads
+    parameter_index / ModelParameterSnapshot.
+
+    Returns True if the index was rebuilt.
+    """
+    global parameter_index, ModelParameterSnapshot
+    signature = get_parameter_signature(design)
+    state = parameter_index_state
+    if (not force and not state["dirty"] and signature == state["signature"]
+            and time.time() - state["built_at"] < PARAMETER_INDEX_MAX_AGE):
+        return False
+
+    snapshot = get_model_parameters(design)
+    # Neue Objekte zuweisen statt in-place ändern, damit Leser nie einen halben Stand sehen
+    parameter_index = {entry["Name"]: entry for entry in snapshot}
+    ModelParameterSnapshot = snapshot
+    state["signature"] = signature
+    state["dirty"] = False
+    state["built_at"] = time.time()
+    return True
+
+
+def get_entity_signature(design):
+    """Timeline marker plus entity counts; changes whenever bodies or sketches are added or removed"""
+    rootComp = design.rootComponent
+    try:
+        timeline = design.timeline
+        timeline_state = (timeline.count, timeline.markerPosition)
+    except Exception:
+        timeline_state = None
+    return (timeline_state, rootComp.bRepBodies.count, rootComp.sketches.count)
+
+
+def invalidate_entity_index():
+    """Forces a rebuild on the next lookup: after a rename, undo or parameter change (recompute replaces the proxies)"""
+    entity_index_state["dirty"] = True
+
+
+def refresh_entity_index(design, force=False):
+    """
+    Rebuilds the token and name maps if the timeline or the entity counts changed.
+    Main thread only. Returns True if the index was rebuilt.
+    """
+    global entity_index
+    signature = get_entity_signature(design)
+    state = entity_index_state
+    if not force and not state["dirty"] and signature == state["signature"]:
+        return False
+
+    rootComp = design.rootComponent
+    index = {}
+    for kind, collection in (("bodies", rootComp.bRepBodies),
+                             ("sketches", rootComp.sketches)):
+        by_token = {}
+        by_name = {}
+        for i in range(collection.count):
+            entity = collection.item(i)
+            by_token[entity.entityToken] = entity
+            # Bei doppelten Namen gewinnt das erste Objekt, wie bei itemByName
+            by_name.setdefault(entity.name, entity)
+        index[kind] = {"token": by_token, "name": by_name}
+    entity_index = index
+    state["signature"] = signature
+    state["dirty"] = False
+    return True
+
+
+def find_entity(design, kind, key, by_name=False):
+    """
+    Resolves a body or sketch ("bodies", "sketches") by entity token, optionally
+    also by name. Returns None if nothing matches.
+
+    A miss, a renamed or an invalidated entity triggers one forced rebuild, so
+    renames in the UI, recomputes and tokens Fusion re-issued are still handled.
+    """
+    if key is None:
+        return None
+    rebuilt = refresh_entity_index(design)
+    for attempt in range(2):
+        tables = entity_index[kind]
+        entity = tables["token"].get(key)
+        if entity is None and by_name:
+            entity = tables["name"].get(key)
+            if entity is not None and entity.name != key:
+                entity = None
+        if entity is not None and not entity.isValid:
+            # Proxy aus der Zeit vor einem Recompute
+            entity = None
+        if entity is not None or rebuilt:
+            return entity
+        rebuilt = refresh_entity_index(design, force=True)
+    return None
+
+
+def find_body(design, body_id, by_name=False):
+    """Body by index (int), entity token or, with by_name, name"""
+    if isinstance(body_id, int):
+        bodies = design.rootComponent.bRepBodies
+        return bodies.item(body_id) if 0 <= body_id < bodies.count else None
+    return find_entity(design, "bodies", body_id, by_name)
+
+
+def find_sketch(design, sketch_id, by_name=False):
+    """Sketch by index (int), entity token or, with by_name, name"""
+    if isinstance(sketch_id, int):
+        sketches = design.rootComponent.sketches
+        return sketches.item(sketch_id) if 0 <= sketch_id < sketches.count else None
+    return find_entity(design, "sketches", sketch_id, by_name)
+
+
+def feature_type_name(entity):
+    """'adsk::fusion::ExtrudeFeature' -> 'Extrude', 'adsk::fusion::Sketch' -> 'Sketch'"""
+    name = entity.objectType.split("::")[-1]
+    return name[:-len("Feature")] if name.endswith("Feature") and name != "Feature" else name
+
+
+def index_timeline_item(position, entity):
+    """Index entry for one timeline entity: type, health and the bodies it affects"""
+    entry = {
+        "sequence": position,
+        "type": feature_type_name(entity),
+        "feature_id": entity.entityToken,
+        "name": entity.name if hasattr(entity, 'name') else f"Feature{position}",
+        "status": "unknown",
+        "error_message": None,
+        "operation": None,
+        "body_ids": []
+    }
+    if hasattr(entity, 'healthState'):
+        health = entity.healthState
+        if health == adsk.fusion.FeatureHealthStates.HealthyFeatureHealthState:
+            entry["status"] = "valid"
+        elif health == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
+            entry["status"] = "failed"
+        elif health == adsk.fusion.FeatureHealthStates.WarningFeatureHealthState:
+            entry["status"] = "warning"
+        if entry["status"] in ("failed", "warning") and hasattr(entity, 'errorOrWarningMessage'):
+            entry["error_message"] = entity.errorOrWarningMessage
+    if entry["type"] == "Extrude":
+        operation = adsk.fusion.ExtrudeFeature.cast(entity).operation
+        entry["operation"] = ("new" if operation == adsk.fusion.FeatureOperations.NewBodyFeatureOperation
+                              else "cut" if operation == adsk.fusion.FeatureOperations.CutFeatureOperation
+                              else "join")
+    bodies = getattr(entity, 'bodies', None)
+    if bodies is not None:
+        entry["body_ids"] = [bodies.item(k).entityToken for k in range(bodies.count)]
+    return entry
+
+
+def invalidate_timeline_index():
+    """Forces a full rebuild on the next refresh (undo, parameter edits can change earlier features)"""
+    timeline_index_state["dirty"] = True
+
+
+def refresh_timeline_index(design):
+    """
+    Brings timeline_index up to date. Only timeline items added since the last
+    call are read; a shorter timeline, a rolled-back marker, invalidation or
+    TIMELINE_INDEX_MAX_AGE cause a full rebuild. Main thread only.
+    Returns the number of timeline items read.
+    """
+    global timeline_index
+    state = timeline_index_state
+    try:
+        timeline = design.timeline
+        count = timeline.count
+        marker = timeline.markerPosition
+    except Exception:
+        # Direct modeling: keine Timeline
+        return 0
+
+    rebuild = (state["dirty"] or count < state["count"] or marker < count
+               or state["marker"] != state["count"]
+               or time.time() - state["built_at"] > TIMELINE_INDEX_MAX_AGE)
+    if rebuild:
+        index = {"features": [], "type_counts": {}, "body_counts": {}, "body_features": {}}
+        start = 0
+        state["built_at"] = time.time()
+    elif count == state["count"]:
+        return 0
+    else:
+        index = timeline_index
+        start = state["count"]
+
+    for position in range(start, count):
+        entity = timeline.item(position).entity
+        if entity is None:
+            continue
+        entry = index_timeline_item(position, entity)
+        index["features"].append(entry)
+        index["type_counts"][entry["type"]] = index["type_counts"].get(entry["type"], 0) + 1
+        for body_token in entry["body_ids"]:
+            counts = index["body_counts"].setdefault(body_token, {})
+            counts[entry["type"]] = counts.get(entry["type"], 0) + 1
+            index["body_features"].setdefault(body_token, []).append(entry)
+
+    timeline_index = index
+    state["count"] = count
+    state["marker"] = marker
+    state["dirty"] = False
+    return count - start
+
+
+def get_body_feature_counts(design, body):
+    """Feature counts by type for one body, from the timeline index"""
+    refresh_timeline_index(design)
+    return dict(timeline_index["body_counts"].get(body.entityToken, {}))
+
+
+@command('set_parameter', path='/set_parameter', message="Parameter {name} wird gesetzt", args=[
+    arg('name', required=True), arg('value', required=True)])
 def set_parameter(design, ui, name, value):
     try:
         param = design.allParameters.itemByName(name)
         param.expression = value
+        invalidate_parameter_index()
+        invalidate_timeline_index()
+        invalidate_entity_index()
     except:
         if ui:
             ui.messageBox('Failed set_parameter:\n{}'.format(traceback.format_exc()))
 
+
+# Schweregrad des Feature-Zustands, für den Vorher/Nachher-Vergleich in set_parameters
+HEALTH_RANK = {"valid": 0, "unknown": 0, "warning": 1, "failed": 2}
+
+
+def get_feature_health(design):
+    """feature_id -> index entry for every timeline feature (fresh timeline index)"""
+    refresh_timeline_index(design)
+    return {entry["feature_id"]: entry for entry in timeline_index["features"]}
+
+
+@command('set_parameters', path='/set_parameters', result_key='set_parameters', query=True,
+         message="Parameter-Update gestartet", args=[arg('parameters', dict, {}, required=True)])
+def set_parameters(design, ui, parameters):
+    """
+    Sets several parameter expressions ({name: expression}) with a single recompute.
+    Returns the new values, the model-parameter snapshot and features whose health got worse.
+    """
+    start_time = time.time()
+    try:
+        allParameters = design.allParameters
+        targets = []
+        failed = []
+        for name, expression in parameters.items():
+            param = allParameters.itemByName(name)
+            if param is None:
+                failed.append({"name": name, "error": "Parameter not found"})
+            else:
+                targets.append((param, str(expression)))
+
+        if not targets:
+            return {"success": False, "error": "No known parameters given", "failed": failed}
+
+        health_before = get_feature_health(design)
+
+        if hasattr(design, 'modifyParameters'):
+            # Alle Werte in einem Aufruf, Fusion rechnet danach genau einmal neu
+            design.modifyParameters([param for param, _ in targets],
+                                    [adsk.core.ValueInput.createByString(expression) for _, expression in targets])
+            method = "modifyParameters"
+        else:
+            # Ältere API: Timeline-Marker an den Anfang, damit die Writes nichts neu berechnen,
+            # danach zurück ans Ende -> ein einziger Recompute
+            timeline = design.timeline
+            marker = timeline.markerPosition
+            timeline.moveToBeginning()
+            try:
+                for param, expression in targets:
+                    try:
+                        param.expression = expression
+                    except Exception as e:
+                        failed.append({"name": param.name, "error": str(e)})
+            finally:
+                timeline.markerPosition = marker
+            method = "timeline_rollback"
+
+        invalidate_parameter_index()
+        invalidate_timeline_index()
+        invalidate_entity_index()
+        refresh_parameter_index(design, force=True)
+        health_after = get_feature_health(design)
+
+        failed_names = {entry["name"] for entry in failed}
+        updated = {}
+        for param, expression in targets:
+            if param.name in failed_names:
+                continue
+            updated[param.name] = {
+                "expression": param.expression,
+                "value": param.value,
+                "unit": param.unit
+            }
+
+        regressions = []
+        for feature_id, after in health_after.items():
+            before = health_before.get(feature_id)
+            before_status = before["status"] if before else "valid"
+            if HEALTH_RANK.get(after["status"], 0) > HEALTH_RANK.get(before_status, 0):
+                regressions.append({
+                    "feature_id": feature_id,
+                    "name": after["name"],
+                    "type": after["type"],
+                    "before": before_status,
+                    "after": after["status"],
+                    "error_message": after["error_message"]
+                })
+
+        execution_time = int((time.time() - start_time) * 1000)
+        result = {
+            "success": not failed,
+            "healthy": not regressions,
+            "updated": updated,
+            "failed": failed,
+            "method": method,
+            "recomputes": 1,
+            "health_regressions": regressions,
+            "model_parameters": ModelParameterSnapshot,
+            "message": f"{len(updated)} parameter(s) updated with one recompute" +
+                       (f", {len(failed)} failed" if failed else "") +
+                       (f", {len(regressions)} feature(s) regressed" if regressions else "")
+        }
+
+        log_operation("set_parameters",
+                      {"parameters": dict(parameters)},
+                      "success" if result["success"] else "failed", result,
+                      execution_time_ms=execution_time)
+
+        return result
+
+    except Exception as e:
+        if ui:
+            ui.messageBox('Failed set_parameters:\n{}'.format(traceback.format_exc()))
+        return {"success": False, "error": str(e)}
+
+@command('holes', path='/holes', message="Loch wird erstellt", args=[
+    arg('points', None, [[0, 0]]), arg('width', float, 1.0), arg('depth', float), arg('faceindex', int, 0)])
 def holes(design, ui, points, width=1.0,distance = 1.0,faceindex=0):
     """
     Create one or more holes on a selected face.
+    All points go into one sketch and are drilled by a single hole feature.
     """
+    # Vor sketches.add prüfen, sonst bleibt eine leere Skizze in der Timeline
+    if not points:
+        return {"success": False, "error": "No hole points given"}
 
     try:
         rootComp = design.rootComponent
@@ -2396,26 +3296,35 @@ def holes(design, ui, points, width=1.0,distance = 1.0,faceindex=0):
         entities.add(latest_body.faces.item(faceindex))
         sk = sketches.add(latest_body.faces.item(faceindex))# create sketch on faceindex face
 
-        tipangle = 90.0
-        for i in range(len(points)):
-            holePoint = sk.sketchPoints.add(adsk.core.Point3D.create(points[i][0], points[i][1], 0))
-            tipangle = adsk.core.ValueInput.createByString('180 deg')
-            holedistance = adsk.core.ValueInput.createByReal(distance)
+        # Eingabewerte nur einmal anlegen, alle Punkte in eine Skizze
+        tipangle = adsk.core.ValueInput.createByString('180 deg')
+        holedistance = adsk.core.ValueInput.createByReal(distance)
+        holeDiam = adsk.core.ValueInput.createByReal(width)
 
-            holeDiam = adsk.core.ValueInput.createByReal(width)
-            holeInput = holes.createSimpleInput(holeDiam)
-            holeInput.tipAngle = tipangle
-            holeInput.setPositionBySketchPoint(holePoint)
-            holeInput.setDistanceExtent(holedistance)
-
-        # Add the hole
-            holes.add(holeInput)
-    except Exception:
+        holePoints = adsk.core.ObjectCollection.create()
+        sk.isComputeDeferred = True
+        try:
+            for point in points:
+                holePoints.add(sk.sketchPoints.add(adsk.core.Point3D.create(point[0], point[1], 0)))
+        finally:
+            sk.isComputeDeferred = False
+
+        # Ein HoleFeature für alle Punkte statt einem pro Punkt
+        holeInput = holes.createSimpleInput(holeDiam)
+        holeInput.tipAngle = tipangle
+        holeInput.setPositionBySketchPoints(holePoints)
+        holeInput.setDistanceExtent(holedistance)
+        holes.add(holeInput)
+        return {"success": True, "hole_count": holePoints.count, "feature_count": 1}
+    except Exception as e:
         if ui:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+        return {"success": False, "error": str(e)}
 
 
 
+@command('select_body', path='/select_body', result_key='select_body', query=True, lane='interactive',
+         message="Body selection requested", args=[arg('name', str, '')])
 def select_body(design,ui,Bodyname):
     """
     Selects a body by name and returns information about it.
@@ -2452,6 +3361,8 @@ def select_body(design,ui,Bodyname):
             "body_name": Bodyname
         }
 
+@command('select_sketch', path='/select_sketch', result_key='select_sketch', query=True, lane='interactive',
+         message="Sketch selection requested", args=[arg('name', str, '')])
 def select_sketch(design,ui,Sketchname):
     """
     Selects a sketch by name and returns information about it.
@@ -2490,6 +3401,8 @@ def select_sketch(design,ui,Sketchname):
         }
 
 
+@command('select_body_by_id', path='/select_body_by_id', result_key='select_body_by_id', query=True, lane='interactive',
+         message="Body selection by ID requested", args=[arg('body_id', str, '')])
 def select_body_by_id(design, ui, body_id):
     """
     Selects a body by its entity ID and sets it as active.
@@ -2501,11 +3414,7 @@ def select_body_by_id(design, ui, body_id):
         bodies = rootComp.bRepBodies
 
         # Find body by entity token
-        target_body = None
-        for i in range(bodies.count):
-            if bodies.item(i).entityToken == body_id:
-                target_body = bodies.item(i)
-                break
+        target_body = find_body(design, body_id)
 
         if target_body is None:
             error_msg = f"Body with ID '{body_id}' not found."
@@ -2531,6 +3440,8 @@ def select_body_by_id(design, ui, body_id):
         }
 
 
+@command('list_faces_with_metadata', path='/list_faces', result_key='list_faces', query=True, lane='interactive',
+         message="Face list requested", args=[arg('body_id', str, '')])
 def list_faces_with_metadata(design, ui, body_id):
     """
     Lists all faces of a body with metadata (normal, area, position).
@@ -2542,11 +3453,7 @@ def list_faces_with_metadata(design, ui, body_id):
         bodies = rootComp.bRepBodies
 
         # Find body by ID
-        target_body = None
-        for i in range(bodies.count):
-            if bodies.item(i).entityToken == body_id:
-                target_body = bodies.item(i)
-                break
+        target_body = find_body(design, body_id)
 
         if target_body is None:
             return {
@@ -2599,6 +3506,8 @@ def list_faces_with_metadata(design, ui, body_id):
         return {"success": False, "error": str(e)}
 
 
+@command('select_face_by_id', path='/select_face', result_key='select_face', query=True, lane='interactive',
+         message="Face selection requested", args=[arg('body_id', str, ''), arg('face_id', str, '')])
 def select_face_by_id(design, ui, body_id, face_id):
     """
     Selects a specific face by ID for operations like sketch placement.
@@ -2610,11 +3519,7 @@ def select_face_by_id(design, ui, body_id, face_id):
         bodies = rootComp.bRepBodies
 
         # Find body
-        target_body = None
-        for i in range(bodies.count):
-            if bodies.item(i).entityToken == body_id:
-                target_body = bodies.item(i)
-                break
+        target_body = find_body(design, body_id)
 
         if target_body is None:
             return {
@@ -2653,6 +3558,8 @@ def select_face_by_id(design, ui, body_id, face_id):
         return {"success": False, "error": str(e)}
 
 
+@command('list_features_in_design', path='/list_features', result_key='list_features', query=True, lane='interactive',
+         message="Feature list requested", args=[arg('body_id', str)])
 def list_features_in_design(design, ui, body_id=None):
     """
     Lists all features in the design with their IDs, types, and bodies.
@@ -2667,11 +3574,7 @@ def list_features_in_design(design, ui, body_id=None):
         if body_id:
             # List features for specific body
             bodies = rootComp.bRepBodies
-            target_body = None
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id:
-                    target_body = bodies.item(i)
-                    break
+            target_body = find_body(design, body_id)
 
             if target_body is None:
                 return {
@@ -2719,6 +3622,8 @@ def list_features_in_design(design, ui, body_id=None):
         return {"success": False, "error": str(e)}
 
 
+@command('boolean_preview_operation', path='/boolean_preview', result_key='boolean_preview', query=True, lane='interactive',
+         message="Boolean preview requested", args=[arg('target_body_id', str, ''), arg('tool_body_id', str, '')])
 def boolean_preview_operation(design, ui, target_body_id, tool_body_id):
     """
     Preview a boolean operation without committing it.
@@ -2730,11 +3635,7 @@ def boolean_preview_operation(design, ui, target_body_id, tool_body_id):
         bodies = rootComp.bRepBodies
 
         # Find target body
-        target_body = None
-        for i in range(bodies.count):
-            if bodies.item(i).entityToken == target_body_id:
-                target_body = bodies.item(i)
-                break
+        target_body = find_body(design, target_body_id)
 
         if target_body is None:
             return {
@@ -2743,11 +3644,7 @@ def boolean_preview_operation(design, ui, target_body_id, tool_body_id):
             }
 
         # Find tool body
-        tool_body = None
-        for i in range(bodies.count):
-            if bodies.item(i).entityToken == tool_body_id:
-                tool_body = bodies.item(i)
-                break
+        tool_body = find_body(design, tool_body_id)
 
         if tool_body is None:
             return {
@@ -2777,7 +3674,8 @@ def boolean_preview_operation(design, ui, target_body_id, tool_body_id):
         return {"success": False, "error": str(e)}
 
 
-
+@command('list_bodies', path='/list_bodies', result_key='list_bodies', query=True, lane='interactive', message="Body list requested")
+def list_bodies(design, ui):
     """
     Lists all bodies in the current design with their IDs and names.
     Returns a list of body information dictionaries.
@@ -2808,6 +3706,7 @@ def boolean_preview_operation(design, ui, target_body_id, tool_body_id):
         return {"success": False, "error": str(e)}
 
 
+@command('get_active_body', path='/get_active_body', result_key='get_active_body', query=True, lane='interactive', message="Active body requested")
 def get_active_body(design, ui):
     """
     Gets the currently active or last created body.
@@ -2835,6 +3734,8 @@ def get_active_body(design, ui):
         return {"success": False, "error": str(e)}
 
 
+@command('rename_body', path='/rename_body', result_key='rename_body', message="Renaming body", args=[
+    arg('body_id', required=True), arg('new_name', str, '', required=True)])
 def rename_body(design, ui, body_id_or_index, new_name):
     """
     Renames a body by its ID or index.
@@ -2847,22 +3748,14 @@ def rename_body(design, ui, body_id_or_index, new_name):
             return {"success": False, "error": "No bodies in design"}
 
         # Try to find body by index first (if it's an integer)
-        body = None
-        if isinstance(body_id_or_index, int):
-            if 0 <= body_id_or_index < bodies.count:
-                body = bodies.item(body_id_or_index)
-        else:
-            # Try to find by entity token
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id_or_index:
-                    body = bodies.item(i)
-                    break
+        body = find_body(design, body_id_or_index)
 
         if body is None:
             return {"success": False, "error": f"Body not found: {body_id_or_index}"}
 
         old_name = body.name
         body.name = new_name
+        invalidate_entity_index()
 
         return {
             "success": True,
@@ -2876,6 +3769,7 @@ def rename_body(design, ui, body_id_or_index, new_name):
         return {"success": False, "error": str(e)}
 
 
+@command('list_sketches', path='/list_sketches', result_key='list_sketches', query=True, lane='interactive', message="Sketch list requested")
 def list_sketches(design, ui):
     """
     Lists all sketches in the current design.
@@ -2907,6 +3801,7 @@ def list_sketches(design, ui):
         return {"success": False, "error": str(e)}
 
 
+@command('get_active_sketch', path='/get_active_sketch', result_key='get_active_sketch', query=True, lane='interactive', message="Active sketch requested")
 def get_active_sketch(design, ui):
     """
     Gets the currently active or last created sketch.
@@ -2935,6 +3830,8 @@ def get_active_sketch(design, ui):
         return {"success": False, "error": str(e)}
 
 
+@command('activate_sketch', path='/activate_sketch', result_key='activate_sketch', message="Activating sketch", args=[
+    arg('sketch_id', required=True)])
 def activate_sketch(design, ui, sketch_id_or_index):
     """
     Activates a sketch for editing by its ID or index.
@@ -2949,16 +3846,7 @@ def activate_sketch(design, ui, sketch_id_or_index):
             return {"success": False, "error": "No sketches in design"}
 
         # Try to find sketch by index first
-        sketch = None
-        if isinstance(sketch_id_or_index, int):
-            if 0 <= sketch_id_or_index < sketches.count:
-                sketch = sketches.item(sketch_id_or_index)
-        else:
-            # Try to find by entity token
-            for i in range(sketches.count):
-                if sketches.item(i).entityToken == sketch_id_or_index:
-                    sketch = sketches.item(i)
-                    break
+        sketch = find_sketch(design, sketch_id_or_index)
 
         if sketch is None:
             return {"success": False, "error": f"Sketch not found: {sketch_id_or_index}"}
@@ -2979,6 +3867,7 @@ def activate_sketch(design, ui, sketch_id_or_index):
         return {"success": False, "error": str(e)}
 
 
+@command('close_sketch', path='/close_sketch', result_key='close_sketch', message="Closing sketch", args=[arg('sketch_id')])
 def close_sketch(design, ui, sketch_id=None):
     """
     Closes/deactivates a sketch.
@@ -2998,15 +3887,7 @@ def close_sketch(design, ui, sketch_id=None):
             sketch = sketches.item(sketches.count - 1)
         else:
             # Find the specified sketch
-            sketch = None
-            if isinstance(sketch_id, int):
-                if 0 <= sketch_id < sketches.count:
-                    sketch = sketches.item(sketch_id)
-            else:
-                for i in range(sketches.count):
-                    if sketches.item(i).entityToken == sketch_id:
-                        sketch = sketches.item(i)
-                        break
+            sketch = find_sketch(design, sketch_id)
 
         if sketch is None:
             return {"success": False, "error": f"Sketch not found: {sketch_id}"}
@@ -3026,32 +3907,94 @@ def close_sketch(design, ui, sketch_id=None):
 ### NEW ENHANCED TOOLS - Phase 1-4 (Comprehensive CAD Reliability Enhancement) ###
 #########################################################################################
 
-# Global operation log storage
-operation_log = []
+# Global operation log storage: ring buffer of compact entries (oldest drop out in O(1))
+OPERATION_LOG_MAX = 100
+operation_log = deque(maxlen=OPERATION_LOG_MAX)
+operation_sequence = itertools.count()
 transaction_stack = []
 
-def log_operation(operation, parameters, status, result, error_message=None, body_state_before=None, body_state_after=None, execution_time_ms=0):
-    """Helper function to log all operations for audit trail"""
-    global operation_log
-    import datetime
+# Optional: Einträge zusätzlich als JSONL-Datei (rotierend) schreiben, z.B.
+# OPERATION_LOG_FILE = str(Path(__file__).parent / "operation_log.jsonl") oder per Umgebungsvariable
+OPERATION_LOG_FILE = os.environ.get("FUSION_MCP_OPERATION_LOG")
+OPERATION_LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+OPERATION_LOG_FILE_BACKUPS = 3
+operation_log_writer = None
+operation_logger = logging.getLogger("fusion_mcp.operations")
+operation_logger.propagate = False
+operation_logger.setLevel(logging.INFO)
+
+# Strings länger als das werden in der Zusammenfassung gekürzt
+LOG_SUMMARY_MAX_STRING = 200
+
+
+def summarize_value(value, depth=0):
+    """Compact form of a result value: scalars kept, lists reduced to their length"""
+    if isinstance(value, str):
+        return value if len(value) <= LOG_SUMMARY_MAX_STRING else value[:LOG_SUMMARY_MAX_STRING] + "..."
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return {"count": len(value)}
+    if isinstance(value, dict) and depth < 1:
+        return {key: summarize_value(item, depth + 1) for key, item in value.items()}
+    return type(value).__name__
+
+
+def start_operation_log_writer(path=None):
+    """
+    Appends every log entry to a rotating JSONL file. Writing happens on a
+    background thread (QueueListener), log_operation only enqueues the entry.
+    """
+    global operation_log_writer
+    path = path or OPERATION_LOG_FILE
+    if not path or operation_log_writer is not None:
+        return False
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=OPERATION_LOG_FILE_MAX_BYTES, backupCount=OPERATION_LOG_FILE_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    log_queue = queue.Queue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    operation_logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    operation_log_writer = (listener, queue_handler, file_handler)
+    return True
+
+
+def stop_operation_log_writer():
+    """Flushes pending entries and closes the JSONL file"""
+    global operation_log_writer
+    if operation_log_writer is None:
+        return
+    listener, queue_handler, file_handler = operation_log_writer
+    operation_logger.removeHandler(queue_handler)
+    listener.stop()
+    file_handler.close()
+    operation_log_writer = None
 
+
+def log_operation(operation, parameters, status, result, error_message=None, body_state_before=None, body_state_after=None, execution_time_ms=0):
+    """Helper function to log all operations for audit trail (keeps a result summary, not the payload)"""
+    parameters = parameters or {}
+    body_token = result.get("body_id") if isinstance(result, dict) else None
     log_entry = {
-        "sequence": len(operation_log),
+        "sequence": next(operation_sequence),
         "timestamp": datetime.datetime.now().isoformat(),
         "operation": operation,
         "parameters": parameters,
+        "body_id": parameters.get("body_id"),
+        "body_token": body_token if isinstance(body_token, str) else None,
         "status": status,
         "error_message": error_message,
-        "result": result,
+        "result": summarize_value(result),
         "body_state_before": body_state_before,
         "body_state_after": body_state_after,
         "execution_time_ms": execution_time_ms
     }
     operation_log.append(log_entry)
 
-    # Keep only last 100 operations to prevent memory issues
-    if len(operation_log) > 100:
-        operation_log.pop(0)
+    if operation_log_writer is not None:
+        operation_logger.info(json.dumps(log_entry, default=str))
 
 
 def get_body_state(design):
@@ -3075,6 +4018,8 @@ def get_body_state(design):
 
 ### PHASE 1: CRITICAL TOOLS ###
 
+@command('get_sketch_status', path='/get_sketch_status', result_key='get_sketch_status', query=True, lane='interactive',
+         message="Sketch status requested", args=[arg('sketch_id'), arg('include_geometry', None, True)])
 def get_sketch_status(design, ui, sketch_id=None, include_geometry=True):
     """
     Validates sketch state and content before closing it.
@@ -3099,14 +4044,7 @@ def get_sketch_status(design, ui, sketch_id=None, include_geometry=True):
         if sketch_id is None:
             sketch = sketches.item(sketches.count - 1)
         else:
-            if isinstance(sketch_id, int):
-                if 0 <= sketch_id < sketches.count:
-                    sketch = sketches.item(sketch_id)
-            else:
-                for i in range(sketches.count):
-                    if sketches.item(i).entityToken == sketch_id:
-                        sketch = sketches.item(i)
-                        break
+            sketch = find_sketch(design, sketch_id)
 
         if sketch is None:
             return {"success": False, "error": f"Sketch not found: {sketch_id}"}
@@ -3186,10 +4124,325 @@ def get_sketch_status(design, ui, sketch_id=None, include_geometry=True):
         return {"success": False, "error": str(e), "is_valid": False}
 
 
-def list_faces(design, ui, body_id):
+def get_face_adjacency(body):
+    """
+    Adjacent face indices for every face of a body, in one pass over faces and edges.
+    Faces are keyed by tempId (unique within the body), so no face list is rescanned.
+    """
+    faces = body.faces
+    face_indices = {faces.item(i).tempId: i for i in range(faces.count)}
+    adjacency = [set() for _ in range(faces.count)]
+    edges = body.edges
+    for e in range(edges.count):
+        edge_faces = edges.item(e).faces
+        indices = [face_indices.get(edge_faces.item(k).tempId) for k in range(edge_faces.count)]
+        indices = [index for index in indices if index is not None]
+        for a in indices:
+            for b in indices:
+                if a != b:
+                    adjacency[a].add(b)
+    return [sorted(neighbours) for neighbours in adjacency]
+
+
+def get_body_revision(design, body):
+    """
+    Cheap geometry revision of a body: timeline state, face count, volume and
+    bounding box (the latter catches moves in direct modeling, which has no timeline)
+    """
+    try:
+        timeline = design.timeline
+        timeline_state = (timeline.count, timeline.markerPosition)
+    except Exception:
+        timeline_state = None
+    bbox = body.boundingBox
+    bounds = tuple(round(value, 9) for point in (bbox.minPoint, bbox.maxPoint) for value in (point.x, point.y, point.z))
+    return (timeline_state, body.faces.count, round(body.volume, 9), bounds)
+
+
+def analyze_faces(body):
+    """Type, area, normal, center, bounds and orientation of every face (no adjacency)"""
+    faces_list = []
+    faces = body.faces
+    for i in range(faces.count):
+        face = faces.item(i)
+
+        # Get face type
+        face_type = "unknown"
+        is_planar = False
+        normal = [0, 0, 0]
+
+        geometry = face.geometry
+        surface_type = geometry.surfaceType
+        if surface_type == adsk.core.SurfaceTypes.PlaneSurfaceType:
+            face_type = "planar"
+            is_planar = True
+            plane = adsk.core.Plane.cast(geometry)
+            if plane:
+                normal = [plane.normal.x, plane.normal.y, plane.normal.z]
+        elif surface_type == adsk.core.SurfaceTypes.CylinderSurfaceType:
+            face_type = "cylindrical"
+        elif surface_type == adsk.core.SurfaceTypes.ConeSurfaceType:
+            face_type = "conical"
+        elif surface_type == adsk.core.SurfaceTypes.SphereSurfaceType:
+            face_type = "spherical"
+        elif surface_type == adsk.core.SurfaceTypes.TorusSurfaceType:
+            face_type = "toroidal"
+
+        # Calculate face center
+        centroid = face.centroid
+        position_center = [centroid.x, centroid.y, centroid.z]
+
+        # Calculate bounds
+        bbox = face.boundingBox
+        bounds = {
+            "min": [bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z],
+            "max": [bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z]
+        }
+
+        # Determine orientation for planar faces
+        orientation = "unknown"
+        if is_planar and normal != [0, 0, 0]:
+            # Normalize and identify orientation
+            if abs(normal[2]) > 0.9:
+                orientation = "top" if normal[2] > 0 else "bottom"
+            elif abs(normal[1]) > 0.9:
+                orientation = "front" if normal[1] > 0 else "back"
+            elif abs(normal[0]) > 0.9:
+                orientation = "right" if normal[0] > 0 else "left"
+            else:
+                orientation = "angled"
+
+        faces_list.append({
+            "index": i,
+            "type": face_type,
+            "area": face.area,
+            "normal": normal,
+            "position_center": position_center,
+            "bounds": bounds,
+            "orientation": orientation,
+            "is_planar": is_planar
+        })
+
+    return faces_list
+
+
+def get_face_metadata(design, body, include_adjacency=False):
+    """
+    Face list of a body from face_metadata_cache, analysed at most once per body revision.
+    Adjacency is computed on first request and kept with the entry. Returns a new
+    dict per face, so callers can add keys without touching the cache.
+    """
+    key = body.entityToken
+    revision = get_body_revision(design, body)
+    entry = face_metadata_cache.get(key)
+    if entry is None or entry["revision"] != revision:
+        entry = {"revision": revision, "faces": analyze_faces(body), "adjacency": None}
+        face_metadata_cache[key] = entry
+        while len(face_metadata_cache) > FACE_CACHE_MAX:
+            face_metadata_cache.popitem(last=False)
+    face_metadata_cache.move_to_end(key)
+
+    if include_adjacency and entry["adjacency"] is None:
+        entry["adjacency"] = get_face_adjacency(body)
+
+    faces_list = []
+    for face in entry["faces"]:
+        face_info = dict(face)
+        if include_adjacency:
+            face_info["adjacent_face_indices"] = list(entry["adjacency"][face["index"]])
+        faces_list.append(face_info)
+    return faces_list
+
+
+def build_kdtree(points, depth=0):
+    """
+    k-d tree over (point, index) pairs, split at the median of the cycling axis.
+    Node: (point, index, axis, left, right); None for an empty subtree.
+    """
+    if not points:
+        return None
+    axis = depth % 3
+    points = sorted(points, key=lambda item: item[0][axis])
+    median = len(points) // 2
+    point, index = points[median]
+    return (point, index, axis,
+            build_kdtree(points[:median], depth + 1),
+            build_kdtree(points[median + 1:], depth + 1))
+
+
+def kdtree_nearest(node, target, k=1):
+    """k nearest (distance, index) pairs, closest first"""
+    best = []  # Max-Heap über negative Distanzen
+
+    def visit(node):
+        if node is None:
+            return
+        point, index, axis, left, right = node
+        distance = math.dist(point, target)
+        if len(best) < k:
+            heapq.heappush(best, (-distance, index))
+        elif distance < -best[0][0]:
+            heapq.heapreplace(best, (-distance, index))
+        delta = target[axis] - point[axis]
+        near, far = (left, right) if delta < 0 else (right, left)
+        visit(near)
+        # Andere Seite nur, wenn die Splitebene näher als der k-te Treffer liegt
+        if len(best) < k or abs(delta) < -best[0][0]:
+            visit(far)
+
+    visit(node)
+    return sorted((-negative, index) for negative, index in best)
+
+
+def kdtree_radius(node, target, radius):
+    """All (distance, index) pairs within radius, closest first"""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        point, index, axis, left, right = node
+        distance = math.dist(point, target)
+        if distance <= radius:
+            found.append((distance, index))
+        delta = target[axis] - point[axis]
+        if delta - radius <= 0:
+            stack.append(left)
+        if delta + radius >= 0:
+            stack.append(right)
+    return sorted(found)
+
+
+BVH_LEAF_SIZE = 4
+
+
+def build_bvh(boxes):
+    """
+    Bounding volume hierarchy over (min, max, index) boxes, split at the median
+    centroid of the longest axis. Node: {"min", "max", "left", "right", "boxes"}.
+    """
+    box_min = [min(box[0][axis] for box in boxes) for axis in range(3)]
+    box_max = [max(box[1][axis] for box in boxes) for axis in range(3)]
+    if len(boxes) <= BVH_LEAF_SIZE:
+        return {"min": box_min, "max": box_max, "left": None, "right": None, "boxes": boxes}
+    axis = max(range(3), key=lambda a: box_max[a] - box_min[a])
+    boxes = sorted(boxes, key=lambda box: box[0][axis] + box[1][axis])
+    median = len(boxes) // 2
+    return {"min": box_min, "max": box_max, "boxes": None,
+            "left": build_bvh(boxes[:median]), "right": build_bvh(boxes[median:])}
+
+
+def boxes_overlap(min_a, max_a, min_b, max_b):
+    return all(min_a[axis] <= max_b[axis] and min_b[axis] <= max_a[axis] for axis in range(3))
+
+
+def ray_box_entry(origin, direction, box_min, box_max):
+    """Ray parameter t >= 0 where the ray enters the box (slab test), None if it misses"""
+    t_near, t_far = 0.0, math.inf
+    for axis in range(3):
+        if abs(direction[axis]) < 1e-12:
+            if not box_min[axis] <= origin[axis] <= box_max[axis]:
+                return None
+            continue
+        t1 = (box_min[axis] - origin[axis]) / direction[axis]
+        t2 = (box_max[axis] - origin[axis]) / direction[axis]
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_near, t_far = max(t_near, t1), min(t_far, t2)
+        if t_near > t_far:
+            return None
+    return t_near
+
+
+def bvh_box_query(node, query_min, query_max):
+    """Indices of all boxes overlapping the query box"""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None or not boxes_overlap(node["min"], node["max"], query_min, query_max):
+            continue
+        if node["boxes"] is not None:
+            found.extend(index for box_min, box_max, index in node["boxes"]
+                         if boxes_overlap(box_min, box_max, query_min, query_max))
+        else:
+            stack.extend((node["left"], node["right"]))
+    return sorted(found)
+
+
+def bvh_ray_query(node, origin, direction):
+    """(t, index) for every box the ray passes through, nearest first"""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None or ray_box_entry(origin, direction, node["min"], node["max"]) is None:
+            continue
+        if node["boxes"] is not None:
+            for box_min, box_max, index in node["boxes"]:
+                t = ray_box_entry(origin, direction, box_min, box_max)
+                if t is not None:
+                    found.append((t, index))
+        else:
+            stack.extend((node["left"], node["right"]))
+    return sorted(found)
+
+
+def get_face_spatial_index(design, body):
+    """
+    k-d tree over face centroids and BVH over face bounding boxes for a body,
+    built from the cached face metadata and kept with the cache entry.
+    """
+    get_face_metadata(design, body)
+    entry = face_metadata_cache[body.entityToken]
+    if entry.get("spatial") is None:
+        faces = entry["faces"]
+        entry["spatial"] = {
+            "kdtree": build_kdtree([(tuple(f["position_center"]), f["index"]) for f in faces]),
+            "bvh": build_bvh([(f["bounds"]["min"], f["bounds"]["max"], f["index"]) for f in faces]) if faces else None
+        }
+    return entry["spatial"]
+
+
+def run_spatial_query(spatial, query):
+    """
+    One spatial face query:
+      {"type": "nearest", "point": [x,y,z], "k": 1}
+      {"type": "radius", "point": [x,y,z], "radius": r}
+      {"type": "ray", "origin": [x,y,z], "direction": [dx,dy,dz]}
+      {"type": "box", "min": [x,y,z], "max": [x,y,z]}
+    Returns [{"face_index", "distance"}] (ray: distance along the ray to the face's bounding box).
+    """
+    query_type = query.get("type", "nearest")
+    if query_type == "nearest":
+        k = int(query.get("k", 1))
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        hits = kdtree_nearest(spatial["kdtree"], [float(v) for v in query["point"]], k)
+    elif query_type == "radius":
+        hits = kdtree_radius(spatial["kdtree"], [float(v) for v in query["point"]], float(query.get("radius", 0.1)))
+    elif query_type == "ray":
+        if spatial["bvh"] is None:
+            return []
+        hits = bvh_ray_query(spatial["bvh"], [float(v) for v in query["origin"]], [float(v) for v in query["direction"]])
+    elif query_type == "box":
+        if spatial["bvh"] is None:
+            return []
+        return [{"face_index": index} for index in
+                bvh_box_query(spatial["bvh"], [float(v) for v in query["min"]], [float(v) for v in query["max"]])]
+    else:
+        raise ValueError(f"Unknown query type: {query_type}")
+    return [{"face_index": index, "distance": distance} for distance, index in hits]
+
+
+@command('list_faces', result_key='list_faces', query=True, lane='interactive', message="Face list requested", args=[
+    arg('body_id', required=True), arg('include_adjacency', bool, True)])
+def list_faces(design, ui, body_id, include_adjacency=True):
     """
     Query all faces of a body with geometric properties (not just indices).
     Face indices change after boolean operations - this provides semantic understanding.
+    include_adjacency=False skips the edge walk for callers that only need normals and areas.
     """
     import time
     start_time = time.time()
@@ -3202,93 +4455,12 @@ def list_faces(design, ui, body_id):
             return {"success": False, "error": "No bodies in design"}
 
         # Find target body
-        target_body = None
-        if isinstance(body_id, int):
-            if 0 <= body_id < bodies.count:
-                target_body = bodies.item(body_id)
-        else:
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id or bodies.item(i).name == body_id:
-                    target_body = bodies.item(i)
-                    break
+        target_body = find_body(design, body_id, by_name=True)
 
         if target_body is None:
             return {"success": False, "error": f"Body not found: {body_id}"}
 
-        # Analyze all faces
-        faces_list = []
-        for i in range(target_body.faces.count):
-            face = target_body.faces.item(i)
-
-            # Get face type
-            face_type = "unknown"
-            is_planar = False
-            normal = [0, 0, 0]
-
-            if face.geometry.surfaceType == adsk.core.SurfaceTypes.PlaneSurfaceType:
-                face_type = "planar"
-                is_planar = True
-                plane = adsk.core.Plane.cast(face.geometry)
-                if plane:
-                    normal = [plane.normal.x, plane.normal.y, plane.normal.z]
-            elif face.geometry.surfaceType == adsk.core.SurfaceTypes.CylinderSurfaceType:
-                face_type = "cylindrical"
-            elif face.geometry.surfaceType == adsk.core.SurfaceTypes.ConeSurfaceType:
-                face_type = "conical"
-            elif face.geometry.surfaceType == adsk.core.SurfaceTypes.SphereSurfaceType:
-                face_type = "spherical"
-            elif face.geometry.surfaceType == adsk.core.SurfaceTypes.TorusSurfaceType:
-                face_type = "toroidal"
-
-            # Calculate face center
-            centroid = face.centroid
-            position_center = [centroid.x, centroid.y, centroid.z]
-
-            # Calculate bounds
-            bbox = face.boundingBox
-            bounds = {
-                "min": [bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z],
-                "max": [bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z]
-            }
-
-            # Determine orientation for planar faces
-            orientation = "unknown"
-            if is_planar and normal != [0, 0, 0]:
-                # Normalize and identify orientation
-                if abs(normal[2]) > 0.9:
-                    orientation = "top" if normal[2] > 0 else "bottom"
-                elif abs(normal[1]) > 0.9:
-                    orientation = "front" if normal[1] > 0 else "back"
-                elif abs(normal[0]) > 0.9:
-                    orientation = "right" if normal[0] > 0 else "left"
-                else:
-                    orientation = "angled"
-
-            # Get adjacent faces
-            adjacent_face_indices = []
-            for j in range(face.edges.count):
-                edge = face.edges.item(j)
-                for k in range(edge.faces.count):
-                    adj_face = edge.faces.item(k)
-                    if adj_face != face:
-                        # Find index of adjacent face
-                        for m in range(target_body.faces.count):
-                            if target_body.faces.item(m) == adj_face:
-                                if m not in adjacent_face_indices:
-                                    adjacent_face_indices.append(m)
-                                break
-
-            faces_list.append({
-                "index": i,
-                "type": face_type,
-                "area": face.area,
-                "normal": normal,
-                "position_center": position_center,
-                "bounds": bounds,
-                "orientation": orientation,
-                "is_planar": is_planar,
-                "adjacent_face_indices": adjacent_face_indices
-            })
+        faces_list = get_face_metadata(design, target_body, include_adjacency)
 
         execution_time = int((time.time() - start_time) * 1000)
 
@@ -3300,7 +4472,8 @@ def list_faces(design, ui, body_id):
             "faces": faces_list
         }
 
-        log_operation("list_faces", {"body_id": body_id}, "success", result, execution_time_ms=execution_time)
+        log_operation("list_faces", {"body_id": body_id, "include_adjacency": include_adjacency},
+                      "success", result, execution_time_ms=execution_time)
         return result
 
     except Exception as e:
@@ -3309,10 +4482,18 @@ def list_faces(design, ui, body_id):
         return {"success": False, "error": str(e)}
 
 
-def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", validate_before=True, validate_after=True):
+@command('pocket_recess_safe', path='/pocket_recess_safe', result_key='pocket_recess_safe', query=True,
+         message="Pocket recess safe requested", args=[
+    arg('body_id', required=True), arg('sketch_id'), arg('depth', float, 0.5),
+    arg('operation', None, 'cut'), arg('validate_before', None, True), arg('validate_after', None, True),
+    arg('sketch_ids', list)])
+def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", validate_before=True, validate_after=True,
+                       sketch_ids=None):
     """
     Create pocket with complete validation and result confirmation.
     Returns success=true/false with actual volume changes.
+    With sketch_ids, every profile of every listed sketch is pocketed in this one call
+    (one extrude per sketch, e.g. the groups of draw_rectangles_batch).
     """
     import time
     start_time = time.time()
@@ -3328,42 +4509,28 @@ def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", v
             geometry_before = get_body_state(design)
 
         # Find target body
-        target_body = None
-        if isinstance(body_id, int):
-            if 0 <= body_id < bodies.count:
-                target_body = bodies.item(body_id)
-        else:
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id or bodies.item(i).name == body_id:
-                    target_body = bodies.item(i)
-                    break
+        target_body = find_body(design, body_id, by_name=True)
 
         if target_body is None:
             return {"success": False, "error": f"Body not found: {body_id}"}
 
-        # Find target sketch
-        target_sketch = None
-        if isinstance(sketch_id, int):
-            if 0 <= sketch_id < sketches.count:
-                target_sketch = sketches.item(sketch_id)
-        else:
-            for i in range(sketches.count):
-                if sketches.item(i).entityToken == sketch_id:
-                    target_sketch = sketches.item(i)
-                    break
+        # Find target sketch(es)
+        target_sketches = []
+        for key in (sketch_ids or [sketch_id]):
+            target_sketch = find_sketch(design, key)
 
-        if target_sketch is None:
-            return {"success": False, "error": f"Sketch not found: {sketch_id}"}
+            if target_sketch is None:
+                return {"success": False, "error": f"Sketch not found: {key}"}
 
-        # Validate sketch has profiles
-        if validate_before and target_sketch.profiles.count == 0:
-            return {"success": False, "error": "Sketch has no closed profiles"}
+            # Validate sketch has profiles
+            if validate_before and target_sketch.profiles.count == 0:
+                return {"success": False, "error": f"Sketch has no closed profiles: {target_sketch.name}"}
+            target_sketches.append(target_sketch)
 
         volume_before = target_body.volume
         face_count_before = target_body.faces.count
 
         # Create pocket
-        prof = target_sketch.profiles.item(0)
         extrudes = rootComp.features.extrudeFeatures
 
         # Determine operation type
@@ -3373,21 +4540,35 @@ def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", v
         elif operation == "intersect":
             op_type = adsk.fusion.FeatureOperations.IntersectFeatureOperation
 
-        extrudeInput = extrudes.createInput(prof, op_type)
-        distance = adsk.core.ValueInput.createByReal(abs(depth))
-        extrudeInput.setDistanceExtent(False, distance)
+        # Ein Extrude pro Skizze (Profile verschiedener Ebenen lassen sich nicht kombinieren)
+        pocket_ids = []
+        for target_sketch in target_sketches:
+            if sketch_ids:
+                # Alle Profile der Skizze, z.B. mehrere Rechtecke einer Offset-Gruppe
+                prof = adsk.core.ObjectCollection.create()
+                for i in range(target_sketch.profiles.count):
+                    prof.add(target_sketch.profiles.item(i))
+            else:
+                prof = target_sketch.profiles.item(0)
 
-        # Set target body
-        participantBodies = adsk.core.ObjectCollection.create()
-        participantBodies.add(target_body)
-        extrudeInput.participantBodies = participantBodies
+            extrudeInput = extrudes.createInput(prof, op_type)
+            distance = adsk.core.ValueInput.createByReal(abs(depth))
+            extrudeInput.setDistanceExtent(False, distance)
 
-        # Execute operation
-        try:
-            extrude_feature = extrudes.add(extrudeInput)
-            pocket_id = extrude_feature.entityToken
-        except RuntimeError as e:
-            return {"success": False, "error": f"Failed to create pocket: {str(e)}"}
+            # Set target body
+            participantBodies = adsk.core.ObjectCollection.create()
+            participantBodies.add(target_body)
+            extrudeInput.participantBodies = participantBodies
+
+            # Execute operation
+            try:
+                extrude_feature = extrudes.add(extrudeInput)
+                pocket_ids.append(extrude_feature.entityToken)
+            except RuntimeError as e:
+                return {"success": False, "error": f"Failed to create pocket on {target_sketch.name}: {str(e)}",
+                        "pocket_ids": pocket_ids}
+        pocket_id = pocket_ids[0]
+        target_sketch = target_sketches[0]
 
         # Get body state after
         volume_after = target_body.volume
@@ -3434,9 +4615,13 @@ def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", v
             "message": f"Pocket created: {volume_removed:.2f} cm³ removed, geometry valid",
             "error": None
         }
+        if sketch_ids:
+            result["sketch_ids"] = [sketch.entityToken for sketch in target_sketches]
+            result["pocket_ids"] = pocket_ids
+            result["message"] = f"{len(pocket_ids)} pockets created: {volume_removed:.2f} cm³ removed, geometry valid"
 
         log_operation("pocket_recess_safe",
-                     {"body_id": body_id, "sketch_id": sketch_id, "depth": depth},
+                     {"body_id": body_id, "sketch_id": sketch_id, "sketch_ids": sketch_ids, "depth": depth},
                      "success", result,
                      body_state_before=geometry_before,
                      body_state_after=geometry_after,
@@ -3450,10 +4635,17 @@ def pocket_recess_safe(design, ui, body_id, sketch_id, depth, operation="cut", v
         return {"success": False, "error": str(e)}
 
 
+# Typnamen, die get_feature_history ausgibt; alle anderen Features erscheinen als "Unknown"
+HISTORY_TYPE_NAMES = ("Extrude", "Fillet", "Chamfer", "Hole", "Shell", "Pattern", "Mirror")
+
+
+@command('get_feature_history', path='/get_feature_history', result_key='get_feature_history', query=True, lane='interactive',
+         message="Feature history requested", args=[
+    arg('body_id', required=True), arg('include_parameters', None, True), arg('include_errors', None, True)])
 def get_feature_history(design, ui, body_id, include_parameters=True, include_errors=True):
     """
     List all features (extrudes, pockets, fillets, etc.) applied to a body.
-    Provides audit trail for multi-step builds.
+    Provides audit trail for multi-step builds. Served from the incremental timeline index.
     """
     import time
     start_time = time.time()
@@ -3463,77 +4655,28 @@ def get_feature_history(design, ui, body_id, include_parameters=True, include_er
         bodies = rootComp.bRepBodies
 
         # Find target body
-        target_body = None
-        if isinstance(body_id, int):
-            if 0 <= body_id < bodies.count:
-                target_body = bodies.item(body_id)
-        else:
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id or bodies.item(i).name == body_id:
-                    target_body = bodies.item(i)
-                    break
+        target_body = find_body(design, body_id, by_name=True)
 
         if target_body is None:
             return {"success": False, "error": f"Body not found: {body_id}"}
 
+        # Alle Timeline-Features wie bisher, aus dem Timeline-Index (liest nur neue Timeline-Einträge)
+        refresh_timeline_index(design)
         features_list = []
-        feature_index = 0
-
-        # Get all features from timeline
-        timeline = design.timeline
-        for i in range(timeline.count):
-            timeline_obj = timeline.item(i)
-            entity = timeline_obj.entity
-
-            if entity is None:
-                continue
-
+        for feature_index, entry in enumerate(timeline_index["features"]):
             feature_info = {
                 "index": feature_index,
-                "type": "Unknown",
-                "feature_id": entity.entityToken if entity else "unknown",
-                "name": entity.name if entity and hasattr(entity, 'name') else f"Feature{i}",
-                "status": "valid" if (entity and hasattr(entity, 'healthState') and entity.healthState == adsk.fusion.FeatureHealthStates.HealthyFeatureHealthState) else "unknown",
-                "sequence": i,
-                "result_valid": True,
-                "error_message": None
+                "type": entry["type"] if entry["type"] in HISTORY_TYPE_NAMES else "Unknown",
+                "feature_id": entry["feature_id"],
+                "name": entry["name"],
+                "status": entry["status"],
+                "sequence": entry["sequence"],
+                "result_valid": entry["status"] != "failed",
+                "error_message": entry["error_message"] if include_errors else None
             }
-
-            # Identify feature type
-            if entity.objectType == adsk.fusion.ExtrudeFeature.classType():
-                feature_info["type"] = "Extrude"
-                if include_parameters:
-                    extrude = adsk.fusion.ExtrudeFeature.cast(entity)
-                    feature_info["parameters"] = {
-                        "operation": "new" if extrude.operation == adsk.fusion.FeatureOperations.NewBodyFeatureOperation else "cut" if extrude.operation == adsk.fusion.FeatureOperations.CutFeatureOperation else "join"
-                    }
-            elif entity.objectType == adsk.fusion.FilletFeature.classType():
-                feature_info["type"] = "Fillet"
-            elif entity.objectType == adsk.fusion.ChamferFeature.classType():
-                feature_info["type"] = "Chamfer"
-            elif entity.objectType == adsk.fusion.HoleFeature.classType():
-                feature_info["type"] = "Hole"
-            elif entity.objectType == adsk.fusion.ShellFeature.classType():
-                feature_info["type"] = "Shell"
-            elif entity.objectType == adsk.fusion.PatternFeature.classType():
-                feature_info["type"] = "Pattern"
-            elif entity.objectType == adsk.fusion.MirrorFeature.classType():
-                feature_info["type"] = "Mirror"
-
-            # Check if feature failed
-            if hasattr(entity, 'healthState'):
-                if entity.healthState == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
-                    feature_info["status"] = "failed"
-                    feature_info["result_valid"] = False
-                    if include_errors and hasattr(entity, 'errorOrWarningMessage'):
-                        feature_info["error_message"] = entity.errorOrWarningMessage
-                elif entity.healthState == adsk.fusion.FeatureHealthStates.WarningFeatureHealthState:
-                    feature_info["status"] = "warning"
-                    if include_errors and hasattr(entity, 'errorOrWarningMessage'):
-                        feature_info["error_message"] = entity.errorOrWarningMessage
-
+            if include_parameters and entry["operation"] is not None:
+                feature_info["parameters"] = {"operation": entry["operation"]}
             features_list.append(feature_info)
-            feature_index += 1
 
         execution_time = int((time.time() - start_time) * 1000)
 
@@ -3554,8 +4697,51 @@ def get_feature_history(design, ui, body_id, include_parameters=True, include_er
         return {"success": False, "error": str(e)}
 
 
+@command('get_feature_counts', path='/feature_counts', result_key='feature_counts', query=True, lane='interactive',
+         message="Feature counts requested", args=[arg('body_id'), arg('feature_type', str)])
+def get_feature_counts(design, ui, body_id=None, feature_type=None):
+    """
+    Feature counts by type for one body (whole design without body_id), from the timeline index.
+    With feature_type the matching features are listed as well.
+    """
+    try:
+        refresh_timeline_index(design)
+        if body_id is None:
+            counts = timeline_index["type_counts"]
+            features = timeline_index["features"]
+            body_token = None
+        else:
+            target_body = find_body(design, body_id, by_name=True)
+            if target_body is None:
+                return {"success": False, "error": f"Body not found: {body_id}"}
+            body_token = target_body.entityToken
+            counts = timeline_index["body_counts"].get(body_token, {})
+            features = timeline_index["body_features"].get(body_token, [])
+
+        result = {
+            "success": True,
+            "body_id": body_token,
+            "counts": dict(counts),
+            "total": sum(counts.values()),
+            "timeline_count": timeline_index_state["count"]
+        }
+        if feature_type:
+            result["features"] = [{"name": entry["name"], "status": entry["status"], "sequence": entry["sequence"]}
+                                  for entry in features if entry["type"] == feature_type]
+        return result
+
+    except Exception as e:
+        if ui:
+            ui.messageBox('Failed get_feature_counts:\n{}'.format(traceback.format_exc()))
+        return {"success": False, "error": str(e)}
+
+
 ### PHASE 2: HIGH PRIORITY TOOLS ###
 
+@command('find_face_by_property', path='/find_face_by_property', result_key='find_face_by_property', query=True, lane='interactive',
+         message="Find face by property requested", args=[
+    arg('body_id', required=True), arg('selector'), arg('normal'), arg('area_range'), arg('position'),
+    arg('return_all_matches', None, False)])
 def find_face_by_property(design, ui, body_id, selector=None, normal=None, area_range=None, position=None, return_all_matches=False):
     """
     Locate face(s) by geometric criteria instead of fragile indices.
@@ -3566,7 +4752,7 @@ def find_face_by_property(design, ui, body_id, selector=None, normal=None, area_
 
     try:
         # First get all faces
-        faces_result = list_faces(design, ui, body_id)
+        faces_result = list_faces(design, ui, body_id, include_adjacency=False)
         if not faces_result["success"]:
             return faces_result
 
@@ -3609,18 +4795,13 @@ def find_face_by_property(design, ui, body_id, selector=None, normal=None, area_
                            if area_range.get("min", 0) <= f["area"] <= area_range.get("max", float('inf'))]
             matches = area_matches
 
-        # Apply position filter
+        # Apply position filter (radius query on the body's k-d tree)
         if position and "point" in position:
-            pos_matches = []
             tolerance = position.get("tolerance", 0.1)
-            target_point = position["point"]
-
-            for f in (matches if matches else faces):
-                center = f["position_center"]
-                distance = sum((a - b) ** 2 for a, b in zip(center, target_point)) ** 0.5
-                if distance <= tolerance:
-                    pos_matches.append(f)
-            matches = pos_matches
+            target_point = [float(v) for v in position["point"]]
+            spatial = get_face_spatial_index(design, find_body(design, body_id, by_name=True))
+            in_range = {index for distance, index in kdtree_radius(spatial["kdtree"], target_point, tolerance)}
+            matches = [f for f in (matches if matches else faces) if f["index"] in in_range]
 
         # Return results
         if not matches:
@@ -3653,10 +4834,61 @@ def find_face_by_property(design, ui, body_id, selector=None, normal=None, area_
         return {"success": False, "error": str(e)}
 
 
+@command('query_faces_spatial', path='/query_faces_spatial', result_key='query_faces_spatial', query=True, lane='interactive',
+         message="Spatial face query requested", args=[
+    arg('body_id', required=True), arg('queries', list, [], required=True)])
+def query_faces_spatial(design, ui, body_id, queries):
+    """
+    Nearest, radius, ray and box face lookups on a body's spatial index.
+    Any number of queries run in one call; the index is built once per body revision.
+    """
+    start_time = time.time()
+
+    try:
+        target_body = find_body(design, body_id, by_name=True)
+        if target_body is None:
+            return {"success": False, "error": f"Body not found: {body_id}"}
+
+        spatial = get_face_spatial_index(design, target_body)
+        results = []
+        for query in queries:
+            try:
+                results.append({"query": query, "success": True, "faces": run_spatial_query(spatial, query)})
+            except KeyError as e:
+                results.append({"query": query, "success": False, "error": f"Missing {e.args[0]}"})
+            except (TypeError, ValueError, AttributeError) as e:
+                results.append({"query": query, "success": False, "error": str(e)})
+
+        execution_time = int((time.time() - start_time) * 1000)
+
+        result = {
+            "success": True,
+            "body_id": target_body.entityToken,
+            "query_count": len(results),
+            "results": results
+        }
+
+        log_operation("query_faces_spatial",
+                     {"body_id": body_id, "queries": len(queries)},
+                     "success", result,
+                     execution_time_ms=execution_time)
+
+        return result
+
+    except Exception as e:
+        if ui:
+            ui.messageBox('Failed query_faces_spatial:\n{}'.format(traceback.format_exc()))
+        return {"success": False, "error": str(e)}
+
+
+@command('draw_rectangles_batch', path='/draw_rectangles_batch', result_key='draw_rectangles_batch', query=True,
+         message="Draw rectangles batch requested", args=[
+    arg('plane', None, 'XY'), arg('rectangles', list, [], required=True)])
 def draw_rectangles_batch(design, ui, plane, rectangles):
     """
-    Draw multiple rectangles in a single sketch in one operation.
-    Reduces error accumulation from sequential calls.
+    Draw multiple rectangles in one operation.
+    Rectangles sharing a z_center offset share one construction plane and one sketch;
+    the result lists the sketch per offset group.
     """
     import time
     start_time = time.time()
@@ -3674,40 +4906,52 @@ def draw_rectangles_batch(design, ui, plane, rectangles):
         else:
             basePlane = rootComp.xYConstructionPlane
 
-        # Create sketch
-        sketch = sketches.add(basePlane)
+        # Rechtecke nach Ebenen-Offset gruppieren: pro Offset eine Ebene und eine Skizze
+        groups = {}
+        for rect in rectangles:
+            groups.setdefault(rect.get("z_center", 0), []).append(rect)
 
         rectangles_drawn = 0
         rectangles_failed = 0
+        sketch_groups = []
+        sketch = None
 
-        # Draw all rectangles
-        for rect in rectangles:
-            try:
-                x_min = rect.get("x_min", 0)
-                x_max = rect.get("x_max", 1)
-                y_min = rect.get("y_min", 0)
-                y_max = rect.get("y_max", 1)
-                z_center = rect.get("z_center", 0)
-
-                # Create offset plane if needed
-                if z_center != 0:
-                    planeInput = planes_obj.createInput()
-                    offsetValue = adsk.core.ValueInput.createByReal(z_center)
-                    planeInput.setByOffset(basePlane, offsetValue)
-                    offsetPlane = planes_obj.add(planeInput)
-                    sketch = sketches.add(offsetPlane)
-
-                # Draw rectangle
-                point1 = adsk.core.Point3D.create(x_min, y_min, 0 if plane == "XY" else z_center)
-                point2 = adsk.core.Point3D.create(x_max, y_max, 0 if plane == "XY" else z_center)
-
-                rectangles = sketch.sketchCurves.sketchLines
-                rectangles.addTwoPointRectangle(point1, point2)
+        for z_center, group in groups.items():
+            if z_center != 0:
+                planeInput = planes_obj.createInput()
+                offsetValue = adsk.core.ValueInput.createByReal(z_center)
+                planeInput.setByOffset(basePlane, offsetValue)
+                sketch = sketches.add(planes_obj.add(planeInput))
+            else:
+                sketch = sketches.add(basePlane)
 
-                rectangles_drawn += 1
+            group_drawn = 0
+            lines = sketch.sketchCurves.sketchLines
+            sketch.isComputeDeferred = True
+            try:
+                for rect in group:
+                    try:
+                        # Punkte liegen in Skizzenkoordinaten, der Offset steckt in der Ebene
+                        point1 = adsk.core.Point3D.create(rect.get("x_min", 0), rect.get("y_min", 0), 0)
+                        point2 = adsk.core.Point3D.create(rect.get("x_max", 1), rect.get("y_max", 1), 0)
+                        lines.addTwoPointRectangle(point1, point2)
+                        group_drawn += 1
+                    except:
+                        rectangles_failed += 1
+            finally:
+                sketch.isComputeDeferred = False
+
+            rectangles_drawn += group_drawn
+            sketch_groups.append({
+                "z_center": z_center,
+                "sketch_id": sketch.entityToken,
+                "sketch_name": sketch.name,
+                "rectangle_count": len(group),
+                "rectangles_drawn": group_drawn
+            })
 
-            except:
-                rectangles_failed += 1
+        if sketch is None:
+            return {"success": False, "error": "No rectangles given"}
 
         total_segments = rectangles_drawn * 4  # Each rectangle has 4 segments
         geometry_valid = rectangles_drawn > 0
@@ -3718,17 +4962,19 @@ def draw_rectangles_batch(design, ui, plane, rectangles):
             "success": True,
             "sketch_id": sketch.entityToken,
             "sketch_name": sketch.name,
+            "sketch_ids": [entry["sketch_id"] for entry in sketch_groups],
+            "groups": sketch_groups,
             "plane": plane,
             "rectangle_count": len(rectangles),
             "rectangles_drawn": rectangles_drawn,
             "rectangles_failed": rectangles_failed,
             "total_segments": total_segments,
             "geometry_valid": geometry_valid,
-            "message": f"{rectangles_drawn} rectangles drawn successfully" + (f", {rectangles_failed} failed" if rectangles_failed > 0 else "")
+            "message": f"{rectangles_drawn} rectangles drawn successfully in {len(sketch_groups)} sketch(es)" + (f", {rectangles_failed} failed" if rectangles_failed > 0 else "")
         }
 
         log_operation("draw_rectangles_batch",
-                     {"plane": plane, "rectangle_count": len(rectangles)},
+                     {"plane": plane, "rectangle_count": len(rectangles), "sketch_count": len(sketch_groups)},
                      "success", result,
                      execution_time_ms=execution_time)
 
@@ -3740,10 +4986,153 @@ def draw_rectangles_batch(design, ui, plane, rectangles):
         return {"success": False, "error": str(e)}
 
 
-def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_face="sketch_plane", snap_to_geometry=False, validate_after=True):
+@command('build_sketch', path='/build_sketch', result_key='build_sketch', query=True,
+         message="Build sketch requested", args=[
+    arg('plane', None, 'XY'), arg('entities', list, [], required=True), arg('offset', float, 0), arg('name')])
+def build_sketch(design, ui, plane, entities, offset=0, name=None):
+    """
+    Build one sketch from a mixed list of entities with sketch compute deferred.
+    Types: line, polyline, rectangle, arc, circle, ellipse, polygon, spline.
+    The sketch is solved once at the end; returns curve and profile counts.
+    """
+    start_time = time.time()
+
+    def to_point(p):
+        return adsk.core.Point3D.create(float(p[0]), float(p[1]), float(p[2]) if len(p) > 2 else 0.0)
+
+    try:
+        rootComp = design.rootComponent
+        sketches = rootComp.sketches
+        planes_obj = rootComp.constructionPlanes
+
+        # Select base plane
+        if plane == "XZ":
+            basePlane = rootComp.xZConstructionPlane
+        elif plane == "YZ":
+            basePlane = rootComp.yZConstructionPlane
+        else:
+            basePlane = rootComp.xYConstructionPlane
+
+        if offset != 0:
+            planeInput = planes_obj.createInput()
+            planeInput.setByOffset(basePlane, adsk.core.ValueInput.createByReal(offset))
+            sketch = sketches.add(planes_obj.add(planeInput))
+        else:
+            sketch = sketches.add(basePlane)
+
+        if name:
+            sketch.name = name
+
+        curves = sketch.sketchCurves
+        lines = curves.sketchLines
+        entities_drawn = 0
+        failed_entities = []
+
+        # Während des Einfügens nicht lösen - erst am Ende einmal
+        sketch.isComputeDeferred = True
+        try:
+            for index, entity in enumerate(entities):
+                kind = entity.get("type", "")
+                try:
+                    if kind == "line":
+                        lines.addByTwoPoints(to_point(entity["start"]), to_point(entity["end"]))
+
+                    elif kind in ("polyline", "polygon"):
+                        if kind == "polygon":
+                            sides = int(entity.get("sides", 6))
+                            radius = float(entity.get("radius", 1.0))
+                            cx, cy = entity.get("center", [0, 0])[:2]
+                            start_angle = math.radians(float(entity.get("start_angle", 0)))
+                            points = [[cx + radius * math.cos(start_angle + i * 2 * math.pi / sides),
+                                       cy + radius * math.sin(start_angle + i * 2 * math.pi / sides)]
+                                      for i in range(sides)]
+                            closed = True
+                        else:
+                            points = entity["points"]
+                            closed = entity.get("closed", False)
+                        if len(points) < 2:
+                            raise ValueError("At least two points required")
+                        # Segmente über gemeinsame Skizzenpunkte verbinden, damit Profile entstehen
+                        first = lines.addByTwoPoints(to_point(points[0]), to_point(points[1]))
+                        last = first
+                        for point in points[2:]:
+                            last = lines.addByTwoPoints(last.endSketchPoint, to_point(point))
+                        if closed and len(points) > 2:
+                            lines.addByTwoPoints(last.endSketchPoint, first.startSketchPoint)
+
+                    elif kind == "rectangle":
+                        lines.addTwoPointRectangle(to_point(entity["corner1"]), to_point(entity["corner2"]))
+
+                    elif kind == "arc":
+                        p1, p2, p3 = entity["points"][:3]
+                        curves.sketchArcs.addByThreePoints(to_point(p1), to_point(p2), to_point(p3))
+
+                    elif kind == "circle":
+                        curves.sketchCircles.addByCenterRadius(to_point(entity.get("center", [0, 0])),
+                                                               float(entity["radius"]))
+
+                    elif kind == "ellipse":
+                        curves.sketchEllipses.add(to_point(entity.get("center", [0, 0])),
+                                                  to_point(entity["major"]), to_point(entity["through"]))
+
+                    elif kind == "spline":
+                        splinePoints = adsk.core.ObjectCollection.create()
+                        for point in entity["points"]:
+                            splinePoints.add(to_point(point))
+                        spline_curve = curves.sketchFittedSplines.add(splinePoints)
+                        if entity.get("closed", False):
+                            spline_curve.isClosed = True
+
+                    else:
+                        raise ValueError(f"Unknown entity type: {kind}")
+
+                    entities_drawn += 1
+                except Exception as e:
+                    failed_entities.append({"index": index, "type": kind, "error": str(e)})
+        finally:
+            sketch.isComputeDeferred = False
+
+        execution_time = int((time.time() - start_time) * 1000)
+
+        result = {
+            "success": entities_drawn > 0 or not entities,
+            "sketch_id": sketch.entityToken,
+            "sketch_name": sketch.name,
+            "plane": plane,
+            "offset": offset,
+            "entity_count": len(entities),
+            "entities_drawn": entities_drawn,
+            "failed_entities": failed_entities,
+            "curve_count": curves.count,
+            "profile_count": sketch.profiles.count,
+            "message": f"{entities_drawn} entities drawn, {sketch.profiles.count} profile(s)" +
+                       (f", {len(failed_entities)} failed" if failed_entities else "")
+        }
+
+        log_operation("build_sketch",
+                      {"plane": plane, "offset": offset, "entity_count": len(entities)},
+                      "success" if result["success"] else "failed", result,
+                      execution_time_ms=execution_time)
+
+        return result
+
+    except Exception as e:
+        if ui:
+            ui.messageBox('Failed build_sketch:\n{}'.format(traceback.format_exc()))
+        return {"success": False, "error": str(e)}
+
+
+@command('pocket_smart', path='/pocket_smart', result_key='pocket_smart', query=True,
+         message="Pocket smart requested", args=[
+    arg('body_id', required=True), arg('sketch_id'), arg('depth_mode', None, 'absolute'),
+    arg('depth_value', float, 0.5), arg('from_face', None, 'sketch_plane'),
+    arg('snap_to_geometry', None, False), arg('validate_after', None, True), arg('sketch_ids', list)])
+def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_face="sketch_plane", snap_to_geometry=False, validate_after=True,
+                 sketch_ids=None):
     """
     Create pocket with intelligent depth calculation.
     Modes: absolute, through, wall_thickness, percentage.
+    sketch_ids pockets several sketches with the same depth in one call.
     """
     import time
     start_time = time.time()
@@ -3753,15 +5142,7 @@ def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_f
         bodies = rootComp.bRepBodies
 
         # Find target body
-        target_body = None
-        if isinstance(body_id, int):
-            if 0 <= body_id < bodies.count:
-                target_body = bodies.item(body_id)
-        else:
-            for i in range(bodies.count):
-                if bodies.item(i).entityToken == body_id or bodies.item(i).name == body_id:
-                    target_body = bodies.item(i)
-                    break
+        target_body = find_body(design, body_id, by_name=True)
 
         if target_body is None:
             return {"success": False, "error": f"Body not found: {body_id}"}
@@ -3800,7 +5181,8 @@ def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_f
 
         # Create pocket using calculated depth
         result = pocket_recess_safe(design, ui, body_id, sketch_id, calculated_depth,
-                                   operation="cut", validate_before=True, validate_after=validate_after)
+                                   operation="cut", validate_before=True, validate_after=validate_after,
+                                   sketch_ids=sketch_ids)
 
         if result["success"]:
             result["depth_mode"] = depth_mode
@@ -3816,7 +5198,7 @@ def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_f
 
         execution_time = int((time.time() - start_time) * 1000)
         log_operation("pocket_smart",
-                     {"body_id": body_id, "sketch_id": sketch_id, "depth_mode": depth_mode, "depth_value": depth_value},
+                     {"body_id": body_id, "sketch_id": sketch_id, "sketch_ids": sketch_ids, "depth_mode": depth_mode, "depth_value": depth_value},
                      "success" if result["success"] else "failed", result,
                      execution_time_ms=execution_time)
 
@@ -3830,6 +5212,10 @@ def pocket_smart(design, ui, body_id, sketch_id, depth_mode, depth_value, from_f
 
 ### PHASE 3: MEDIUM PRIORITY TOOLS ###
 
+@command('begin_transaction', path='/begin_transaction', result_key='begin_transaction', query=True,
+         message="Begin transaction requested", args=[
+    arg('transaction_id', required=True), arg('description', None, ''),
+    arg('auto_validate', None, True), arg('auto_rollback_on_error', None, False)])
 def begin_transaction(design, ui, transaction_id, description="", auto_validate=True, auto_rollback_on_error=False):
     """
     Begin a transaction to group multiple operations with atomic commit/rollback.
@@ -3856,6 +5242,8 @@ def begin_transaction(design, ui, transaction_id, description="", auto_validate=
     }
 
 
+@command('commit_transaction', path='/commit_transaction', result_key='commit_transaction', query=True,
+         message="Commit transaction requested", args=[arg('transaction_id', required=True), arg('force', None, False)])
 def commit_transaction(design, ui, transaction_id, force=False):
     """
     Commit a transaction atomically.
@@ -3903,6 +5291,8 @@ def commit_transaction(design, ui, transaction_id, force=False):
     return result
 
 
+@command('rollback_transaction', path='/rollback_transaction', result_key='rollback_transaction', query=True,
+         message="Rollback transaction requested", args=[arg('transaction_id', required=True)])
 def rollback_transaction(design, ui, transaction_id):
     """
     Rollback a transaction (undo all operations).
@@ -3925,6 +5315,8 @@ def rollback_transaction(design, ui, transaction_id):
         design.timeline.markerPosition = transaction["start_marker"]
     except:
         pass
+    invalidate_timeline_index()
+    invalidate_entity_index()
 
     duration_ms = int((time.time() - transaction["start_time"]) * 1000)
 
@@ -3944,27 +5336,30 @@ def rollback_transaction(design, ui, transaction_id):
     return result
 
 
+@command('get_operation_log', path='/get_operation_log', result_key='get_operation_log', query=True, lane='interactive',
+         message="Operation log requested", args=[
+    arg('last_n_operations', int, 20), arg('body_id'), arg('operation_type'), arg('status_filter')])
 def get_operation_log(design, ui, last_n_operations=20, body_id=None, operation_type=None, status_filter=None):
     """
     Access detailed operation history for debugging.
+    Walks the ring buffer from the newest entry and stops after last_n_operations matches.
     """
-    global operation_log
-
     try:
-        filtered_log = operation_log.copy()
-
-        # Apply filters
-        if body_id:
-            filtered_log = [op for op in filtered_log if op.get("parameters", {}).get("body_id") == body_id]
-
-        if operation_type:
-            filtered_log = [op for op in filtered_log if operation_type in op["operation"]]
-
-        if status_filter and status_filter != "all":
-            filtered_log = [op for op in filtered_log if op["status"] == status_filter]
-
-        # Get last N
-        filtered_log = filtered_log[-last_n_operations:]
+        filtered_log = []
+        if last_n_operations > 0:
+            for op in reversed(operation_log):
+                # Apply filters
+                if body_id and body_id not in (op["body_id"], op["body_token"]):
+                    continue
+                if operation_type and operation_type not in op["operation"]:
+                    continue
+                if status_filter and status_filter != "all" and op["status"] != status_filter:
+                    continue
+                filtered_log.append(op)
+                if len(filtered_log) >= last_n_operations:
+                    break
+            # Chronologisch wie bisher
+            filtered_log.reverse()
 
         # Get current state
         current_state = {
@@ -4002,6 +5397,9 @@ def get_operation_log(design, ui, last_n_operations=20, body_id=None, operation_
         return {"success": False, "error": str(e)}
 
 
+@command('create_sketch_on_body_plane', path='/create_sketch_on_body_plane', result_key='create_sketch_on_body_plane', query=True,
+         message="Create sketch on body plane requested", args=[
+    arg('body_id', required=True), arg('plane', None, 'XY'), arg('z_offset', float, 0), arg('name')])
 def create_sketch_on_body_plane(design, ui, body_id, plane, z_offset=0, name=None):
     """
     Create sketch directly on XY/YZ/XZ plane without face dependency.
@@ -4061,6 +5459,8 @@ def create_sketch_on_body_plane(design, ui, body_id, plane, z_offset=0, name=Non
         return {"success": False, "error": str(e)}
 
 
+@command('validate_face_exists', path='/validate_face_exists', result_key='validate_face_exists', query=True, lane='interactive',
+         message="Validate face exists requested", args=[arg('body_id', required=True), arg('face_index', int, 0)])
 def validate_face_exists(design, ui, body_id, face_index):
     """
     Check if face index is still valid after topology changes.
@@ -4070,7 +5470,7 @@ def validate_face_exists(design, ui, body_id, face_index):
 
     try:
         # Get all faces
-        faces_result = list_faces(design, ui, body_id)
+        faces_result = list_faces(design, ui, body_id, include_adjacency=False)
         if not faces_result["success"]:
             return faces_result
 
@@ -4120,6 +5520,9 @@ def validate_face_exists(design, ui, body_id, face_index):
 
 ### PHASE 4: NICE-TO-HAVE TOOLS ###
 
+@command('select_faces_by_semantic', path='/select_faces_by_semantic', result_key='select_faces_by_semantic', query=True, lane='interactive',
+         message="Select faces by semantic requested", args=[
+    arg('body_id', required=True), arg('selectors', list, [], required=True)])
 def select_faces_by_semantic(design, ui, body_id, selectors):
     """
     Batch select multiple faces using semantic names.
@@ -4166,6 +5569,8 @@ def select_faces_by_semantic(design, ui, body_id, selectors):
         return {"success": False, "error": str(e)}
 
 
+@command('clear_sketch', path='/clear_sketch', result_key='clear_sketch', query=True,
+         message="Clear sketch requested", args=[arg('sketch_id')])
 def clear_sketch(design, ui, sketch_id=None):
     """
     Safely clear active sketch without closing it.
@@ -4185,14 +5590,7 @@ def clear_sketch(design, ui, sketch_id=None):
         if sketch_id is None:
             sketch = sketches.item(sketches.count - 1)
         else:
-            if isinstance(sketch_id, int):
-                if 0 <= sketch_id < sketches.count:
-                    sketch = sketches.item(sketch_id)
-            else:
-                for i in range(sketches.count):
-                    if sketches.item(i).entityToken == sketch_id:
-                        sketch = sketches.item(i)
-                        break
+            sketch = find_sketch(design, sketch_id)
 
         if sketch is None:
             return {"success": False, "error": f"Sketch not found: {sketch_id}"}
@@ -4230,6 +5628,10 @@ def clear_sketch(design, ui, sketch_id=None):
         return {"success": False, "error": str(e)}
 
 
+@command('extrude_safe', path='/extrude_safe', result_key='extrude_safe', query=True,
+         message="Extrude safe requested", args=[
+    arg('value', float, 1.0), arg('sketch_id', required=True), arg('body_id', required=True),
+    arg('direction', None, 'normal'), arg('validate_before', None, True), arg('validate_after', None, True)])
 def extrude_safe(design, ui, value, sketch_id, body_id, direction="normal", validate_before=True, validate_after=True):
     """
     Extrude with full pre/post validation.
@@ -4247,15 +5649,7 @@ def extrude_safe(design, ui, value, sketch_id, body_id, direction="normal", vali
             geometry_before = get_body_state(design)
 
         # Find target sketch
-        target_sketch = None
-        if isinstance(sketch_id, int):
-            if 0 <= sketch_id < sketches.count:
-                target_sketch = sketches.item(sketch_id)
-        else:
-            for i in range(sketches.count):
-                if sketches.item(i).entityToken == sketch_id:
-                    target_sketch = sketches.item(i)
-                    break
+        target_sketch = find_sketch(design, sketch_id)
 
         if target_sketch is None:
             return {"success": False, "error": f"Sketch not found: {sketch_id}"}
@@ -4339,1093 +5733,201 @@ def extrude_safe(design, ui, value, sketch_id, body_id, direction="normal", vali
 
 # HTTP Server######
 class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 hält die Verbindung offen (Keep-Alive); jede Antwort braucht Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    # Header und Body sind getrennte Writes: ohne TCP_NODELAY warten sie auf das verzögerte ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def enqueue_task(self, task):
+        """
+        Queues a task under this request's ID (header X-Request-Id, otherwise generated).
+        With an Idempotency-Key header a repeated request is answered from the
+        stored entry and the task is not queued again. Raises queue.Full if the
+        task's lane is full.
+        """
+        request_id = self.headers.get('X-Request-Id') or uuid.uuid4().hex
+        idempotency_key = self.headers.get('Idempotency-Key')
+        if idempotency_key:
+            self.task_entry, created = claim_idempotency_key(idempotency_key, request_id, task[0])
+            if not created:
+                self.replayed = True
+                return
+        else:
+            self.task_entry = register_request(request_id, task[0])
+        try:
+            enqueue_task(task, request_id)
+        except queue.Full:
+            # Lane voll: Handle wieder freigeben, damit ein Retry normal eingereiht wird
+            release_request(request_id, idempotency_key, task[0])
+            self.task_entry = None
+            raise
+
+    def wait_timeout(self):
+        """Seconds to block for the result (header X-Wait), 0 = fire-and-forget"""
+        try:
+            return max(0.0, min(float(self.headers.get('X-Wait', 0)), REQUEST_WAIT_MAX))
+        except ValueError:
+            return 0.0
+
+    def send_json(self, payload, status=200, headers=None):
+        """
+        Sends a JSON response. If this request queued a task, the request handle
+        (request_id, status, and the result once finished) is merged in.
+        """
+        entry = getattr(self, 'task_entry', None)
+        if entry is not None:
+            handle = describe_request(entry, self.wait_timeout())
+            payload = dict(payload)
+            if handle["status"] != "pending":
+                payload.pop("note", None)
+            payload.update(handle)
+            if getattr(self, 'replayed', False):
+                payload["replayed"] = True
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-type','application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_error(self, status, message):
+        """Error as JSON ({"success": False, "error": ...}) so clients can show the message"""
+        self.task_entry = None
+        self.send_json({"success": False, "error": message}, status=status)
+
     def do_GET(self):
-        global ModelParameterSnapshot, query_results
+        global ModelParameterSnapshot, parameter_index, query_results
+        self.task_entry = None
+        self.replayed = False
         try:
-            if self.path == '/count_parameters':
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"user_parameter_count": len(ModelParameterSnapshot)}).encode('utf-8'))
-            elif self.path == '/list_parameters':
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"ModelParameter": ModelParameterSnapshot}).encode('utf-8'))
-            elif self.path == '/list_bodies':
-                # Return cached result from last list_bodies operation
-                result = query_results.get('list_bodies', {"success": False, "error": "No data available. Call POST /list_bodies first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/get_active_body':
-                result = query_results.get('get_active_body', {"success": False, "error": "No data available. Call POST /get_active_body first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/list_sketches':
-                result = query_results.get('list_sketches', {"success": False, "error": "No data available. Call POST /list_sketches first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/get_active_sketch':
-                result = query_results.get('get_active_sketch', {"success": False, "error": "No data available. Call POST /get_active_sketch first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/select_body':
-                result = query_results.get('select_body', {"success": False, "error": "No data available. Call POST /select_body first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/select_sketch':
-                result = query_results.get('select_sketch', {"success": False, "error": "No data available. Call POST /select_sketch first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            # CRITICAL 5 TOOLS GET ENDPOINTS
-            elif self.path == '/select_body_by_id':
-                result = query_results.get('select_body_by_id', {"success": False, "error": "No data available. Call POST /select_body_by_id first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/select_face':
-                result = query_results.get('select_face', {"success": False, "error": "No data available. Call POST /select_face first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/list_features':
-                result = query_results.get('list_features', {"success": False, "error": "No data available. Call POST /list_features first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/boolean_preview':
-                result = query_results.get('boolean_preview', {"success": False, "error": "No data available. Call POST /boolean_preview first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            # NEW ENHANCED TOOLS GET ENDPOINTS
-            elif self.path == '/get_sketch_status':
-                result = query_results.get('get_sketch_status', {"success": False, "error": "No data available. Call POST /get_sketch_status first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/list_faces':
-                result = query_results.get('list_faces', {"success": False, "error": "No data available. Call POST /list_faces first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/pocket_recess_safe':
-                result = query_results.get('pocket_recess_safe', {"success": False, "error": "No data available. Call POST /pocket_recess_safe first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/get_feature_history':
-                result = query_results.get('get_feature_history', {"success": False, "error": "No data available. Call POST /get_feature_history first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/find_face_by_property':
-                result = query_results.get('find_face_by_property', {"success": False, "error": "No data available. Call POST /find_face_by_property first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/draw_rectangles_batch':
-                result = query_results.get('draw_rectangles_batch', {"success": False, "error": "No data available. Call POST /draw_rectangles_batch first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/pocket_smart':
-                result = query_results.get('pocket_smart', {"success": False, "error": "No data available. Call POST /pocket_smart first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/begin_transaction':
-                result = query_results.get('begin_transaction', {"success": False, "error": "No data available. Call POST /begin_transaction first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/commit_transaction':
-                result = query_results.get('commit_transaction', {"success": False, "error": "No data available. Call POST /commit_transaction first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/rollback_transaction':
-                result = query_results.get('rollback_transaction', {"success": False, "error": "No data available. Call POST /rollback_transaction first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/get_operation_log':
-                result = query_results.get('get_operation_log', {"success": False, "error": "No data available. Call POST /get_operation_log first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/create_sketch_on_body_plane':
-                result = query_results.get('create_sketch_on_body_plane', {"success": False, "error": "No data available. Call POST /create_sketch_on_body_plane first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/validate_face_exists':
-                result = query_results.get('validate_face_exists', {"success": False, "error": "No data available. Call POST /validate_face_exists first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/select_faces_by_semantic':
-                result = query_results.get('select_faces_by_semantic', {"success": False, "error": "No data available. Call POST /select_faces_by_semantic first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/clear_sketch':
-                result = query_results.get('clear_sketch', {"success": False, "error": "No data available. Call POST /clear_sketch first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/extrude_safe':
-                result = query_results.get('extrude_safe', {"success": False, "error": "No data available. Call POST /extrude_safe first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            # PROP PERFECTION TOOLS GET ENDPOINTS
-            elif self.path == '/chamfer_edges':
-                result = query_results.get('chamfer_edges', {"success": False, "error": "No data available. Call POST /chamfer_edges first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/split_body':
-                result = query_results.get('split_body', {"success": False, "error": "No data available. Call POST /split_body first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-            elif self.path == '/scale_body':
-                result = query_results.get('scale_body', {"success": False, "error": "No data available. Call POST /scale_body first."})
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode('utf-8'))
+            path = self.path.split('?', 1)[0]
+            if path.startswith('/result/'):
+                # Handle eines früheren POST abfragen, optional blockierend (X-Wait)
+                result = get_request_result(path[len('/result/'):], self.wait_timeout())
+                if result is None:
+                    self.send_json_error(404, "Unknown or expired request_id")
+                else:
+                    self.send_json(result)
+            elif path == '/count_parameters':
+                # Aus dem Parameter-Index, kein Zugriff auf die Fusion API im HTTP-Thread
+                self.send_json({"user_parameter_count": len(parameter_index)})
+            elif path == '/list_parameters':
+                self.send_json({"ModelParameter": ModelParameterSnapshot})
+            elif path == '/commands':
+                self.send_json({"commands": export_commands()})
+            elif path == '/task_metrics':
+                self.send_json(get_task_metrics())
+            elif path in GET_ROUTES:
+                # Letztes Ergebnis der zugehörigen POST-Operation
+                result = query_results.get(GET_ROUTES[path])
+                if result is None:
+                    result = {"success": False, "error": f"No data available. Call POST {path} first."}
+                self.send_json(result)
             else:
-                self.send_error(404,'Not Found')
+                self.send_json_error(404, 'Not Found')
         except Exception as e:
-            self.send_error(500,str(e))
+            self.send_json_error(500, str(e))
 
     def do_POST(self):
+        self.task_entry = None
+        self.replayed = False
         try:
             content_length = int(self.headers.get('Content-Length',0))
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data) if post_data else {}
-            path = self.path
-
-            # Alle Aktionen in die Queue legen
-            if path.startswith('/set_parameter'):
-                name = data.get('name')
-                value = data.get('value')
-                if name and value:
-                    task_queue.put(('set_parameter', name, value))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"message": f"Parameter {name} wird gesetzt"}).encode('utf-8'))
-
-            elif path == '/undo':
-                task_queue.put(('undo',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Undo wird ausgeführt"}).encode('utf-8'))
-
-            elif path == '/Box':
-                height = float(data.get('height',5))
-                width = float(data.get('width',5))
-                depth = float(data.get('depth',5))
-                x = float(data.get('x',0))
-                y = float(data.get('y',0))
-                z = float(data.get('z',0))
-                Plane = data.get('plane',None)  # 'XY', 'XZ', 'YZ' or None
-
-                task_queue.put(('draw_box', height, width, depth,x,y,z, Plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Box wird erstellt"}).encode('utf-8'))
-
-            elif path == '/Witzenmann':
-                scale = data.get('scale',1.0)
-                z = float(data.get('z',0))
-                task_queue.put(('draw_witzenmann', scale,z))
-
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Witzenmann-Logo wird erstellt"}).encode('utf-8'))
-
-            elif path == '/Export_STL':
-                name = str(data.get('Name','Test.stl'))
-                task_queue.put(('export_stl', name))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "STL Export gestartet"}).encode('utf-8'))
-
-
-            elif path == '/Export_STEP':
-                name = str(data.get('name','Test.step'))
-                task_queue.put(('export_step',name))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "STEP Export gestartet"}).encode('utf-8'))
-
-
-            elif path == '/fillet_edges':
-                radius = float(data.get('radius',0.3)) #0.3 as default
-                edge_ids = data.get('edges', None)  # List of edge IDs or None
-                if edge_ids is not None and not isinstance(edge_ids, list):
-                    edge_ids = None
-                task_queue.put(('fillet_edges',radius, edge_ids))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Fillet edges started"}).encode('utf-8'))
-
-            elif path == '/chamfer_edges':
-                distance = float(data.get('distance', 0.5))
-                edge_ids = data.get('edges', None)
-                angle = float(data.get('angle', 45.0))
-                if edge_ids is not None and not isinstance(edge_ids, list):
-                    edge_ids = None
-                task_queue.put(('chamfer_edges', distance, edge_ids, angle))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Chamfer edges started"}).encode('utf-8'))
-
-            elif path == '/split_body':
-                body_id = data.get('body_id', None)
-                split_tool = data.get('split_tool', 'XY')
-                keep_both = bool(data.get('keep_both', True))
-                task_queue.put(('split_body', body_id, split_tool, keep_both))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Split body started"}).encode('utf-8'))
-
-            elif path == '/scale_body':
-                body_id = data.get('body_id', None)
-                scale_factor = float(data.get('scale_factor', 1.0))
-                uniform = bool(data.get('uniform', True))
-                scale_x = float(data.get('scale_x', 1.0))
-                scale_y = float(data.get('scale_y', 1.0))
-                scale_z = float(data.get('scale_z', 1.0))
-                task_queue.put(('scale_body', body_id, scale_factor, uniform, scale_x, scale_y, scale_z))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Scale body started"}).encode('utf-8'))
-
-            elif path == '/draw_cylinder':
-                radius = float(data.get('radius', 1.0))
-                height = float(data.get('height', 1.0))
-                x = float(data.get('x',0))
-                y = float(data.get('y',0))
-                z = float(data.get('z',0))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('draw_cylinder', radius, height, x, y,z, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Cylinder wird erstellt"}).encode('utf-8'))
-
-
-            elif path == '/shell_body':
-                thickness = float(data.get('thickness',0.5)) #0.5 as default
-                faceindex = int(data.get('faceindex',0))
-                task_queue.put(('shell_body', thickness, faceindex))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Shell body wird erstellt"}).encode('utf-8'))
-
-            elif path == '/draw_lines':
-                points = data.get('points', [])
-                Plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('draw_lines', points, Plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Lines werden erstellt"}).encode('utf-8'))
-
-            elif path == '/extrude_last_sketch':
-                value = float(data.get('value',1.0)) #1.0 as default
-                taperangle = float(data.get('taperangle', 0.0)) #0.0 as default
-                task_queue.put(('extrude_last_sketch', value,taperangle))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Letzter Sketch wird extrudiert"}).encode('utf-8'))
-
-            elif path == '/revolve':
-                angle = float(data.get('angle',360)) #360 as default
-                #axis = data.get('axis','X')  # 'X', 'Y', 'Z'
-                task_queue.put(('revolve_profile', angle))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Profil wird revolviert"}).encode('utf-8'))
-            elif path == '/arc':
-                point1 = data.get('point1', [0,0])
-                point2 = data.get('point2', [1,1])
-                point3 = data.get('point3', [2,0])
-                connect = bool(data.get('connect', False))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('arc', point1, point2, point3, connect, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Arc wird erstellt"}).encode('utf-8'))
-
-            elif path == '/draw_one_line':
-                x1 = float(data.get('x1',0))
-                y1 = float(data.get('y1',0))
-                z1 = float(data.get('z1',0))
-                x2 = float(data.get('x2',1))
-                y2 = float(data.get('y2',1))
-                z2 = float(data.get('z2',0))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('draw_one_line', x1, y1, z1, x2, y2, z2, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Line wird erstellt"}).encode('utf-8'))
-
-            elif path == '/holes':
-                points = data.get('points', [[0,0]])
-                width = float(data.get('width', 1.0))
-                faceindex = int(data.get('faceindex', 0))
-                distance = data.get('depth', None)
-                if distance is not None:
-                    distance = float(distance)
-                through = bool(data.get('through', False))
-                task_queue.put(('holes', points, width, distance,  faceindex))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-
-                self.wfile.write(json.dumps({"message": "Loch wird erstellt"}).encode('utf-8'))
-
-            elif path == '/create_circle':
-                radius = float(data.get('radius',1.0))
-                x = float(data.get('x',0))
-                y = float(data.get('y',0))
-                z = float(data.get('z',0))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('circle', radius, x, y,z, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Circle wird erstellt"}).encode('utf-8'))
-
-            elif path == '/extrude_thin':
-                thickness = float(data.get('thickness',0.5)) #0.5 as default
-                distance = float(data.get('distance',1.0)) #1.0 as default
-                task_queue.put(('extrude_thin', thickness,distance))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Thin Extrude wird erstellt"}).encode('utf-8'))
-
-            elif path == '/select_body':
-                name = str(data.get('name', ''))
-                task_queue.put(('select_body', name))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Body selection requested",
-                    "note": "Results will be available via GET /select_body after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            elif path == '/select_sketch':
-                name = str(data.get('name', ''))
-                task_queue.put(('select_sketch', name))
-
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Sketch selection requested",
-                    "note": "Results will be available via GET /select_sketch after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            # CRITICAL 5 TOOLS POST HANDLERS
-            elif path == '/select_body_by_id':
-                body_id = str(data.get('body_id', ''))
-                task_queue.put(('select_body_by_id', body_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Body selection by ID requested",
-                    "note": "Results will be available via GET /select_body_by_id after processing"
-                }).encode('utf-8'))
-
-            elif path == '/list_faces':
-                body_id = str(data.get('body_id', ''))
-                task_queue.put(('list_faces_with_metadata', body_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Face list requested",
-                    "note": "Results will be available via GET /list_faces after processing"
-                }).encode('utf-8'))
-
-            elif path == '/select_face':
-                body_id = str(data.get('body_id', ''))
-                face_id = str(data.get('face_id', ''))
-                task_queue.put(('select_face_by_id', body_id, face_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Face selection requested",
-                    "note": "Results will be available via GET /select_face after processing"
-                }).encode('utf-8'))
-
-            elif path == '/list_features':
-                body_id = str(data.get('body_id', '')) if data.get('body_id') else None
-                task_queue.put(('list_features_in_design', body_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Feature list requested",
-                    "note": "Results will be available via GET /list_features after processing"
-                }).encode('utf-8'))
-
-            elif path == '/boolean_preview':
-                target_id = str(data.get('target_body_id', ''))
-                tool_id = str(data.get('tool_body_id', ''))
-                task_queue.put(('boolean_preview_operation', target_id, tool_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Boolean preview requested",
-                    "note": "Results will be available via GET /boolean_preview after processing"
-                }).encode('utf-8'))
-
-            elif path == '/sweep':
-                # enqueue a tuple so process_task recognizes the command
-                task_queue.put(('sweep',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Sweep wird erstellt"}).encode('utf-8'))
-
-            elif path == '/spline':
-                points = data.get('points', [])
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('spline', points, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Spline wird erstellt"}).encode('utf-8'))
-
-            elif path == '/cut_extrude':
-                depth = float(data.get('depth',1.0)) #1.0 as default
-                task_queue.put(('cut_extrude', depth))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Cut Extrude wird erstellt"}).encode('utf-8'))
-
-            elif path == '/circular_pattern':
-                quantity = float(data.get('quantity', 6.0))
-                axis = str(data.get('axis',"X"))
-                plane = str(data.get('plane', 'XY'))  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('circular_pattern',quantity,axis,plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Cirular Pattern wird erstellt"}).encode('utf-8'))
-
-            elif path == '/offsetplane':
-                offset = float(data.get('offset',0.0))
-                plane = str(data.get('plane', 'XY'))  # 'XY', 'XZ', 'YZ'
-
-                task_queue.put(('offsetplane', offset, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Offset Plane wird erstellt"}).encode('utf-8'))
-
-            elif path == '/loft':
-                sketchcount = int(data.get('sketchcount',2))
-                task_queue.put(('loft', sketchcount))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Loft wird erstellt"}).encode('utf-8'))
-
-            elif path == '/ellipsis':
-                 x_center = float(data.get('x_center',0))
-                 y_center = float(data.get('y_center',0))
-                 z_center = float(data.get('z_center',0))
-                 x_major = float(data.get('x_major',10))
-                 y_major = float(data.get('y_major',0))
-                 z_major = float(data.get('z_major',0))
-                 x_through = float(data.get('x_through',5))
-                 y_through = float(data.get('y_through',4))
-                 z_through = float(data.get('z_through',0))
-                 plane = str(data.get('plane', 'XY'))  # 'XY', 'XZ', 'YZ'
-                 task_queue.put(('ellipsis', x_center, y_center, z_center,
-                                  x_major, y_major, z_major, x_through, y_through, z_through, plane))
-                 self.send_response(200)
-                 self.send_header('Content-type','application/json')
-                 self.end_headers()
-                 self.wfile.write(json.dumps({"message": "Ellipsis wird erstellt"}).encode('utf-8'))
-
-            elif path == '/sphere':
-                radius = float(data.get('radius',5.0))
-                x = float(data.get('x',0))
-                y = float(data.get('y',0))
-                z = float(data.get('z',0))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('draw_sphere', radius, x, y,z, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Sphere wird erstellt"}).encode('utf-8'))
-
-            elif path == '/threaded':
-                inside = bool(data.get('inside', True))
-                allsizes = int(data.get('allsizes', 30))
-                task_queue.put(('threaded', inside, allsizes))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Threaded Feature wird erstellt"}).encode('utf-8'))
-
-            elif path == '/delete_everything':
-                task_queue.put(('delete_everything',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Alle Bodies werden gelöscht"}).encode('utf-8'))
-
-            elif path == '/boolean_operation':
-                operation = data.get('operation', 'join')  # 'join', 'cut', 'intersect'
-                task_queue.put(('boolean_operation', operation))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Boolean Operation wird ausgeführt"}).encode('utf-8'))
-
-            elif path == '/test_connection':
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Verbindung erfolgreich"}).encode('utf-8'))
-
-            elif path == '/draw_2d_rectangle':
-                x_1 = float(data.get('x_1',0))
-                y_1 = float(data.get('y_1',0))
-                z_1 = float(data.get('z_1',0))
-                x_2 = float(data.get('x_2',1))
-                y_2 = float(data.get('y_2',1))
-                z_2 = float(data.get('z_2',0))
-                plane = data.get('plane', 'XY')  # 'XY', 'XZ', 'YZ'
-                task_queue.put(('draw_2d_rectangle', x_1, y_1, z_1, x_2, y_2, z_2, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "2D Rechteck wird erstellt"}).encode('utf-8'))
-
-
-            elif path == '/rectangular_pattern':
-                 quantity_one = float(data.get('quantity_one',2))
-                 distance_one = float(data.get('distance_one',5))
-                 axis_one = str(data.get('axis_one',"X"))
-                 quantity_two = float(data.get('quantity_two',2))
-                 distance_two = float(data.get('distance_two',5))
-                 axis_two = str(data.get('axis_two',"Y"))
-                 plane = str(data.get('plane', 'XY'))  # 'XY', 'XZ', 'YZ'
-                 # Parameter-Reihenfolge: axis_one, axis_two, quantity_one, quantity_two, distance_one, distance_two, plane
-                 task_queue.put(('rectangular_pattern', axis_one, axis_two, quantity_one, quantity_two, distance_one, distance_two, plane))
-                 self.send_response(200)
-                 self.send_header('Content-type','application/json')
-                 self.end_headers()
-                 self.wfile.write(json.dumps({"message": "Rectangular Pattern wird erstellt"}).encode('utf-8'))
-
-            elif path == '/draw_text':
-                 text = str(data.get('text',"Hello"))
-                 x_1 = float(data.get('x_1',0))
-                 y_1 = float(data.get('y_1',0))
-                 z_1 = float(data.get('z_1',0))
-                 x_2 = float(data.get('x_2',10))
-                 y_2 = float(data.get('y_2',4))
-                 z_2 = float(data.get('z_2',0))
-                 extrusion_value = float(data.get('extrusion_value',1.0))
-                 plane = str(data.get('plane', 'XY'))  # 'XY', 'XZ', 'YZ'
-                 thickness = float(data.get('thickness',0.5))
-                 task_queue.put(('draw_text', text,thickness, x_1, y_1, z_1, x_2, y_2, z_2, extrusion_value, plane))
-                 self.send_response(200)
-                 self.send_header('Content-type','application/json')
-                 self.end_headers()
-                 self.wfile.write(json.dumps({"message": "Text wird erstellt"}).encode('utf-8'))
-
-            elif path == '/move_body':
-                x = float(data.get('x',0))
-                y = float(data.get('y',0))
-                z = float(data.get('z',0))
-                task_queue.put(('move_body', x, y, z))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Body wird verschoben"}).encode('utf-8'))
-
-            elif path == '/pocket_recess':
-                depth = float(data.get('depth', 1.0))
-                face_index = data.get('face_index', None)
-                body_id = data.get('body_id', None)
-                sketch_id = data.get('sketch_id', None)
-                if face_index is not None:
-                    face_index = int(face_index)
-                task_queue.put(('pocket_recess', depth, face_index, body_id, sketch_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Pocket/Recess wird erstellt"}).encode('utf-8'))
-
-            elif path == '/sketch_on_face':
-                body_index = int(data.get('body_index', -1))
-                face_index = int(data.get('face_index', 0))
-                task_queue.put(('sketch_on_face', body_index, face_index))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Sketch auf Face wird erstellt"}).encode('utf-8'))
-
-            elif path == '/create_work_plane':
-                plane_type = str(data.get('plane_type', 'offset_xy'))
-                offset_distance = float(data.get('offset_distance', 0.0))
-                reference_index = int(data.get('reference_index', 0))
-                task_queue.put(('create_work_plane', plane_type, offset_distance, reference_index))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Work Plane wird erstellt"}).encode('utf-8'))
-
-            elif path == '/project_edges':
-                body_index = data.get('body_index', None)
-                if body_index is not None:
-                    body_index = int(body_index)
-                task_queue.put(('project_edges', body_index))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Edges werden projiziert"}).encode('utf-8'))
-
-            elif path == '/draw_polygon':
-                sides = int(data.get('sides', 6))
-                radius = float(data.get('radius', 5.0))
-                x = float(data.get('x', 0))
-                y = float(data.get('y', 0))
-                z = float(data.get('z', 0))
-                plane = str(data.get('plane', 'XY'))
-                task_queue.put(('draw_polygon', sides, radius, x, y, z, plane))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Polygon wird erstellt"}).encode('utf-8'))
-
-            elif path == '/offset_surface':
-                distance = float(data.get('distance', 1.0))
-                face_index = int(data.get('face_index', 0))
-                task_queue.put(('offset_surface', distance, face_index))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Surface Offset wird erstellt"}).encode('utf-8'))
-
-            elif path == '/mirror_feature':
-                mirror_plane = str(data.get('mirror_plane', 'XY'))
-                body_index = data.get('body_index', None)
-                if body_index is not None:
-                    body_index = int(body_index)
-                task_queue.put(('mirror_feature', mirror_plane, body_index))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Mirror Feature wird erstellt"}).encode('utf-8'))
-
-            elif path == '/list_bodies':
-                task_queue.put(('list_bodies',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Body list requested",
-                    "note": "Results will be available via GET /list_bodies after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            elif path == '/get_active_body':
-                task_queue.put(('get_active_body',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Active body requested",
-                    "note": "Results will be available via GET /get_active_body after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            elif path == '/rename_body':
-                body_id = data.get('body_id', None)
-                new_name = str(data.get('new_name', ''))
-                if body_id is not None and new_name:
-                    task_queue.put(('rename_body', body_id, new_name))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"message": "Renaming body"}).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id or new_name")
-
-            elif path == '/list_sketches':
-                task_queue.put(('list_sketches',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Sketch list requested",
-                    "note": "Results will be available via GET /list_sketches after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            elif path == '/get_active_sketch':
-                task_queue.put(('get_active_sketch',))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Active sketch requested",
-                    "note": "Results will be available via GET /get_active_sketch after processing (typically < 1 second)"
-                }).encode('utf-8'))
-
-            elif path == '/activate_sketch':
-                sketch_id = data.get('sketch_id', None)
-                if sketch_id is not None:
-                    task_queue.put(('activate_sketch', sketch_id))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"message": "Activating sketch"}).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing sketch_id")
-
-            elif path == '/close_sketch':
-                sketch_id = data.get('sketch_id', None)
-                task_queue.put(('close_sketch', sketch_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({"message": "Closing sketch"}).encode('utf-8'))
-
-            # NEW ENHANCED TOOLS ENDPOINTS
-            elif path == '/get_sketch_status':
-                sketch_id = data.get('sketch_id', None)
-                include_geometry = data.get('include_geometry', True)
-                task_queue.put(('get_sketch_status', sketch_id, include_geometry))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Sketch status requested",
-                    "note": "Results will be available via GET /get_sketch_status after processing"
-                }).encode('utf-8'))
-
-            elif path == '/list_faces':
-                body_id = data.get('body_id')
-                if body_id is not None:
-                    task_queue.put(('list_faces', body_id))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Face list requested",
-                        "note": "Results will be available via GET /list_faces after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id")
-
-            elif path == '/pocket_recess_safe':
-                body_id = data.get('body_id')
-                sketch_id = data.get('sketch_id')
-                depth = float(data.get('depth', 0.5))
-                operation = data.get('operation', 'cut')
-                validate_before = data.get('validate_before', True)
-                validate_after = data.get('validate_after', True)
-                if body_id is not None and sketch_id is not None and depth is not None:
-                    task_queue.put(('pocket_recess_safe', body_id, sketch_id, depth,
-                                   operation, validate_before, validate_after))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Pocket recess safe requested",
-                        "note": "Results will be available via GET /pocket_recess_safe after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id, sketch_id, or depth")
-
-            elif path == '/get_feature_history':
-                body_id = data.get('body_id')
-                include_parameters = data.get('include_parameters', True)
-                include_errors = data.get('include_errors', True)
-                if body_id is not None:
-                    task_queue.put(('get_feature_history', body_id, include_parameters, include_errors))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Feature history requested",
-                        "note": "Results will be available via GET /get_feature_history after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id")
-
-            elif path == '/find_face_by_property':
-                body_id = data.get('body_id')
-                selector = data.get('selector', None)
-                normal = data.get('normal', None)
-                area_range = data.get('area_range', None)
-                position = data.get('position', None)
-                return_all_matches = data.get('return_all_matches', False)
-                if body_id is not None:
-                    task_queue.put(('find_face_by_property', body_id, selector, normal,
-                                   area_range, position, return_all_matches))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Find face by property requested",
-                        "note": "Results will be available via GET /find_face_by_property after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id")
-
-            elif path == '/draw_rectangles_batch':
-                plane = data.get('plane', 'XY')
-                rectangles = data.get('rectangles', [])
-                if rectangles:
-                    task_queue.put(('draw_rectangles_batch', plane, rectangles))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Draw rectangles batch requested",
-                        "note": "Results will be available via GET /draw_rectangles_batch after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing rectangles")
-
-            elif path == '/pocket_smart':
-                body_id = data.get('body_id')
-                sketch_id = data.get('sketch_id')
-                depth_mode = data.get('depth_mode', 'absolute')
-                depth_value = float(data.get('depth_value', 0.5))
-                from_face = data.get('from_face', 'sketch_plane')
-                snap_to_geometry = data.get('snap_to_geometry', False)
-                validate_after = data.get('validate_after', True)
-                if body_id is not None and sketch_id is not None and depth_value is not None:
-                    task_queue.put(('pocket_smart', body_id, sketch_id, depth_mode, depth_value,
-                                   from_face, snap_to_geometry, validate_after))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Pocket smart requested",
-                        "note": "Results will be available via GET /pocket_smart after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id, sketch_id, or depth_value")
-
-            elif path == '/begin_transaction':
-                transaction_id = data.get('transaction_id')
-                description = data.get('description', '')
-                auto_validate = data.get('auto_validate', True)
-                auto_rollback_on_error = data.get('auto_rollback_on_error', False)
-                if transaction_id:
-                    task_queue.put(('begin_transaction', transaction_id, description,
-                                   auto_validate, auto_rollback_on_error))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Begin transaction requested",
-                        "note": "Results will be available via GET /begin_transaction after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing transaction_id")
-
-            elif path == '/commit_transaction':
-                transaction_id = data.get('transaction_id')
-                force = data.get('force', False)
-                if transaction_id:
-                    task_queue.put(('commit_transaction', transaction_id, force))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Commit transaction requested",
-                        "note": "Results will be available via GET /commit_transaction after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing transaction_id")
-
-            elif path == '/rollback_transaction':
-                transaction_id = data.get('transaction_id')
-                if transaction_id:
-                    task_queue.put(('rollback_transaction', transaction_id))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Rollback transaction requested",
-                        "note": "Results will be available via GET /rollback_transaction after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing transaction_id")
-
-            elif path == '/get_operation_log':
-                last_n_operations = int(data.get('last_n_operations', 20))
-                body_id = data.get('body_id', None)
-                operation_type = data.get('operation_type', None)
-                status_filter = data.get('status_filter', None)
-                task_queue.put(('get_operation_log', last_n_operations, body_id,
-                               operation_type, status_filter))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Operation log requested",
-                    "note": "Results will be available via GET /get_operation_log after processing"
-                }).encode('utf-8'))
-
-            elif path == '/create_sketch_on_body_plane':
-                body_id = data.get('body_id')
-                plane = data.get('plane', 'XY')
-                z_offset = float(data.get('z_offset', 0))
-                name = data.get('name', None)
-                if body_id is not None:
-                    task_queue.put(('create_sketch_on_body_plane', body_id, plane, z_offset, name))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Create sketch on body plane requested",
-                        "note": "Results will be available via GET /create_sketch_on_body_plane after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id")
-
-            elif path == '/validate_face_exists':
-                body_id = data.get('body_id')
-                face_index = int(data.get('face_index', 0))
-                if body_id is not None and face_index is not None:
-                    task_queue.put(('validate_face_exists', body_id, face_index))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Validate face exists requested",
-                        "note": "Results will be available via GET /validate_face_exists after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id or face_index")
-
-            elif path == '/select_faces_by_semantic':
-                body_id = data.get('body_id')
-                selectors = data.get('selectors', [])
-                if body_id is not None and selectors:
-                    task_queue.put(('select_faces_by_semantic', body_id, selectors))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Select faces by semantic requested",
-                        "note": "Results will be available via GET /select_faces_by_semantic after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing body_id or selectors")
-
-            elif path == '/clear_sketch':
-                sketch_id = data.get('sketch_id', None)
-                task_queue.put(('clear_sketch', sketch_id))
-                self.send_response(200)
-                self.send_header('Content-type','application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    "message": "Clear sketch requested",
-                    "note": "Results will be available via GET /clear_sketch after processing"
-                }).encode('utf-8'))
-
-            elif path == '/extrude_safe':
-                value = float(data.get('value', 1.0))
-                sketch_id = data.get('sketch_id')
-                body_id = data.get('body_id')
-                direction = data.get('direction', 'normal')
-                validate_before = data.get('validate_before', True)
-                validate_after = data.get('validate_after', True)
-                if value is not None and sketch_id is not None and body_id is not None:
-                    task_queue.put(('extrude_safe', value, sketch_id, body_id, direction,
-                                   validate_before, validate_after))
-                    self.send_response(200)
-                    self.send_header('Content-type','application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "message": "Extrude safe requested",
-                        "note": "Results will be available via GET /extrude_safe after processing"
-                    }).encode('utf-8'))
-                else:
-                    self.send_error(400, "Missing value, sketch_id, or body_id")
+            path = self.path.split('?', 1)[0]
+
+            if path == '/test_connection':
+                self.send_json({"message": "Verbindung erfolgreich"})
+                return
 
+            # Registrierte Route oder generisch über /command/<name>
+            if path.startswith('/command/'):
+                name = path[len('/command/'):]
             else:
-                self.send_error(404,'Not Found')
+                name = POST_ROUTES.get(path)
+            spec = COMMANDS.get(name)
+            if spec is None:
+                self.send_json_error(404, 'Not Found')
+                return
+
+            try:
+                task = parse_command_args(spec, data)
+            except (ValueError, TypeError) as e:
+                self.send_json_error(400, str(e))
+                return
+
+            # Alle Aktionen in die Queue legen (Lane aus der Registry)
+            try:
+                self.enqueue_task(task)
+            except queue.Full:
+                # Backpressure: sofort 429 statt die Queue unbegrenzt wachsen zu lassen
+                lane = task_lane(task)
+                self.send_json({
+                    "success": False,
+                    "error": f"Task queue lane '{lane}' is full, retry later",
+                    "lane": lane,
+                    "queue_depth": task_queue.qsize(lane)
+                }, status=429, headers={"Retry-After": "1"})
+                return
+            self.send_json(command_ack(spec, task))
 
         except Exception as e:
-            self.send_error(500,str(e))
+            self.send_json_error(500, str(e))
+
+class AddinHTTPServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer with a bounded number of connection threads.
+    A slow client or a large response only occupies its own thread, so cached
+    read-only endpoints never wait behind it. Connections beyond max_workers get
+    an immediate 503 instead of queueing. Fusion API work still goes through task_queue.
+    """
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, max_workers=HTTP_MAX_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.workers = threading.BoundedSemaphore(max_workers)
+
+    def process_request(self, request, client_address):
+        if not self.workers.acquire(blocking=False):
+            self.reject_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except:
+            self.workers.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.workers.release()
+
+    def reject_request(self, request):
+        """Answers 503 on the accept thread without reading the request"""
+        try:
+            request.settimeout(1.0)
+            body = json.dumps({"success": False, "error": "Add-In busy, retry later"}).encode('utf-8')
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                            b"Content-Type: application/json\r\n"
+                            b"Retry-After: 1\r\n"
+                            b"Connection: close\r\n"
+                            b"Content-Length: " + str(len(body)).encode('ascii') + b"\r\n\r\n" + body)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
 
 def run_server():
     global httpd
     server_address = ('localhost',5000)
-    httpd = HTTPServer(server_address, Handler)
+    # Ein Thread pro Verbindung (begrenzt): eine offene Keep-Alive-Verbindung blockiert keine anderen Clients
+    httpd = AddinHTTPServer(server_address, Handler)
     httpd.serve_forever()
 
 
@@ -5437,21 +5939,23 @@ def run(context):
 
         # Check if a document is active before accessing activeProduct
         if not app.activeDocument:
-            ui.messageBox("Kein aktives Dokument geöffnet! Bitte öffnen oder erstellen Sie ein Design.")
+            show_message("Kein aktives Dokument geöffnet! Bitte öffnen oder erstellen Sie ein Design.")
             return
 
         design = adsk.fusion.Design.cast(app.activeProduct)
 
         if design is None:
-            ui.messageBox("Kein aktives Design geöffnet!")
+            show_message("Kein aktives Design geöffnet!")
             return
 
         # Initialer Snapshot
-        global ModelParameterSnapshot
-        ModelParameterSnapshot = get_model_parameters(design)
+        refresh_parameter_index(design, force=True)
+
+        # Operation-Log optional auf Platte (OPERATION_LOG_FILE)
+        start_operation_log_writer()
 
         # Custom Event registrieren
-        customEvent = app.registerCustomEvent(myCustomEvent) #Every 200ms we create a custom event which doesnt interfere with Fusion main thread
+        customEvent = app.registerCustomEvent(myCustomEvent) #Fired on enqueue (coalesced), so the work runs on the Fusion main thread
         onTaskEvent = TaskEventHandler() #If we have tasks in the queue, we process them in the main thread
         customEvent.add(onTaskEvent) # Here we add the event handler
         handlers.append(onTaskEvent)
@@ -5462,14 +5966,18 @@ def run(context):
         taskThread.daemon = True
         taskThread.start()
 
-        ui.messageBox(f"Fusion HTTP Add-In gestartet! Port 5000.\nParameter geladen: {len(ModelParameterSnapshot)} Modellparameter")
+        startup_message = f"Fusion HTTP Add-In gestartet! Port 5000.\nParameter geladen: {len(ModelParameterSnapshot)} Modellparameter"
+        if SHOW_LIFECYCLE_MESSAGES:
+            ui.messageBox(startup_message)
+        else:
+            notify_non_modal(startup_message)
 
         # HTTP-Server starten
         threading.Thread(target=run_server, daemon=True).start()
 
     except:
         try:
-            ui.messageBox('Fehler im Add-In:\n{}'.format(traceback.format_exc()))
+            show_message('Fehler im Add-In:\n{}'.format(traceback.format_exc()))
         except:
             pass
 
@@ -5482,6 +5990,7 @@ def stop(context):
     # Stop the task thread
     if stopFlag:
         stopFlag.set()
+    task_wakeup_pending.clear()
 
     # Clean up event handlers
     for handler in handlers:
@@ -5492,11 +6001,13 @@ def stop(context):
             pass
 
     handlers.clear()
+    stop_operation_log_writer()
 
     # Clear the queue without processing (avoid freezing)
     while not task_queue.empty():
         try:
-            task_queue.get_nowait()
+            request_id, _ = task_queue.get_nowait()
+            complete_request(request_id, error="Add-In gestoppt, Task nicht ausgeführt")
             if task_queue.empty():
                 break
         except:
@@ -5521,7 +6032,7 @@ def stop(context):
         app = adsk.core.Application.get()
         if app:
             ui = app.userInterface
-            if ui:
+            if ui and SHOW_LIFECYCLE_MESSAGES:
                 ui.messageBox("Fusion HTTP Add-In gestoppt")
     except:
         pass
@@ -1,11 +1,32 @@
 import argparse
+import asyncio
 import json
 import logging
-import requests
+import math
+import httpx
+import random
 import time
+import uuid
 from mcp.server.fastmcp import FastMCP
 import config
 
+# Gemeinsamer async HTTP-Client: Keep-Alive-Verbindungen zum Add-In, begrenzte Anzahl paralleler Requests
+http_client = None
+
+# Beobachtete Latenz pro Endpoint (gleitender Mittelwert in Sekunden)
+endpoint_latency = {}
+
+# Circuit Breaker: "open" = Add-In nicht erreichbar, Requests schlagen sofort fehl
+circuit = {"state": "closed", "failures": 0, "opened_at": None, "probe_task": None}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while the add-in is known to be unreachable."""
+
+
+class AddinRequestError(Exception):
+    """The add-in rejected the request (4xx other than 429); retrying would not help."""
+
 
 
 
@@ -187,46 +208,212 @@ mcp = FastMCP("Fusion",
                 )
 
 
-def send_request(endpoint, data, headers):
+def get_http_client():
+    """
+    Returns the shared httpx.AsyncClient, created on first use inside the running event loop.
+    Many tool calls can be in flight; the add-in still runs Fusion work one task at a time.
+    """
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.REQUEST_TIMEOUT, pool=config.RESULT_MAX_WAIT),
+            limits=httpx.Limits(max_connections=config.HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=config.HTTP_POOL_SIZE)
+        )
+    return http_client
+
+def request_timeout(read):
+    """
+    Per-request timeout that only shortens the read phase. Connect/write keep
+    REQUEST_TIMEOUT and waiting for a pooled connection keeps RESULT_MAX_WAIT,
+    so a busy pool is not mistaken for an unreachable add-in.
+    """
+    return httpx.Timeout(config.REQUEST_TIMEOUT, read=read, pool=config.RESULT_MAX_WAIT)
+
+def backoff_delay(attempt):
+    """Capped exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(config.RETRY_MAX_DELAY, config.RETRY_DELAY * (2 ** attempt)))
+
+def learned_wait(endpoint):
+    """
+    X-Wait for an endpoint, learned from observed latency. Tasks slower than this
+    come back as a pending handle and are polled, so they are never retried.
+    """
+    latency = endpoint_latency.get(endpoint)
+    if latency is None:
+        return config.RESULT_WAIT
+    return min(config.RESULT_WAIT, max(config.MIN_RESULT_WAIT, latency * config.TIMEOUT_LATENCY_FACTOR))
+
+def record_latency(endpoint, seconds):
+    previous = endpoint_latency.get(endpoint)
+    if previous is None:
+        endpoint_latency[endpoint] = seconds
+    else:
+        endpoint_latency[endpoint] = previous + config.LATENCY_EWMA_ALPHA * (seconds - previous)
+
+def record_success():
+    if circuit["state"] != "closed":
+        logging.info("Fusion add-in reachable again, closing circuit")
+    circuit["state"] = "closed"
+    circuit["failures"] = 0
+    circuit["opened_at"] = None
+
+def record_failure():
+    circuit["failures"] += 1
+    if circuit["state"] == "closed" and circuit["failures"] >= config.CIRCUIT_FAILURE_THRESHOLD:
+        logging.error("Fusion add-in unreachable after %d attempts, opening circuit", circuit["failures"])
+        circuit["state"] = "open"
+        circuit["opened_at"] = time.time()
+        ensure_probe()
+
+def ensure_probe():
+    """Starts the background test_connection probe if the circuit is open and none is running."""
+    task = circuit["probe_task"]
+    if circuit["state"] == "open" and (task is None or task.done()):
+        circuit["probe_task"] = asyncio.get_running_loop().create_task(probe_until_reachable())
+
+async def probe_connection():
+    """
+    Calls test_connection once, bypassing the circuit. Closes the circuit on success.
+    Returns the add-in's response or None if it is not reachable.
+    """
+    try:
+        response = await get_http_client().post(config.ENDPOINTS["test_connection"], content="{}",
+                                                headers=config.HEADERS, timeout=config.CIRCUIT_PROBE_TIMEOUT)
+        response.raise_for_status()
+        result = response.json()
+    except (httpx.HTTPError, json.JSONDecodeError):
+        return None
+    record_success()
+    return result
+
+async def probe_until_reachable():
+    while circuit["state"] == "open":
+        await asyncio.sleep(config.CIRCUIT_PROBE_INTERVAL)
+        await probe_connection()
+
+async def send_request(endpoint, data, headers):
     """
     Avoid repetitive code for sending requests to the Fusion 360 server.
+    Every request carries a request ID and asks the add-in to wait for the
+    task result, so the tool returns the real result instead of an acknowledgement.
+    Transport errors are retried with capped exponential backoff; while the
+    add-in is unreachable the circuit breaker fails calls immediately.
     :param endpoint: The API endpoint URL.
     :param data: The payload data to send in the request.
     :param headers: The headers to include in the request.
     """
+    if circuit["state"] == "open":
+        ensure_probe()
+        raise CircuitOpenError("Fusion add-in not reachable (circuit open), waiting for test_connection to succeed")
+
     max_retries = 3  # Retry up to 3 times for transient errors
+    payload = json.dumps(data)
+    wait = learned_wait(endpoint)
+    request_headers = dict(config.HEADERS)
+    request_headers.update(headers or {})
+    # Same ID across retries: the handle stays addressable and the add-in
+    # answers a retried POST from its idempotency cache instead of running it twice
+    request_id = uuid.uuid4().hex
+    request_headers["X-Request-Id"] = request_id
+    request_headers["Idempotency-Key"] = request_id
+    request_headers["X-Wait"] = str(wait)
+    timeout = request_timeout(min(config.REQUEST_TIMEOUT, wait + config.TIMEOUT_MARGIN))
+    client = get_http_client()
     for attempt in range(max_retries):
         try:
-            data = json.dumps(data)
-            response = requests.post(endpoint, data, headers, timeout=config.REQUEST_TIMEOUT)
+            start_time = time.time()
+            response = await client.post(endpoint, content=payload, headers=request_headers, timeout=timeout)
+            record_success()
+            if response.status_code == 503:
+                # Add-In hat keinen freien Worker: wie einen transienten Fehler behandeln
+                raise httpx.HTTPStatusError("Fusion add-in busy (503)", request=response.request, response=response)
+            if response.status_code == 429:
+                # Lane der Task-Queue voll: Backpressure, nach Retry-After erneut versuchen
+                raise httpx.HTTPStatusError("Fusion add-in queue full (429)", request=response.request, response=response)
+            if 400 <= response.status_code < 500:
+                # Ungültige Argumente (400) / unbekannter Befehl (404): nicht wiederholen, Meldung weitergeben
+                raise AddinRequestError(f"Fusion add-in rejected the request ({response.status_code}): "
+                                        f"{addin_error_text(response)}")
 
             # Check if the response is valid JSON
             try:
-                return response.json()
+                result = await wait_for_result(response.json())
+                record_latency(endpoint, time.time() - start_time)
+                return result
             except json.JSONDecodeError as e:
                 logging.error("Failed to decode JSON response: %s", e)
                 # If max retries reached, raise the exception
                 if attempt == max_retries - 1:
                     raise
-                # Add delay before retry to give Fusion time to process
-                time.sleep(config.RETRY_DELAY)
+                await asyncio.sleep(backoff_delay(attempt))
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logging.error("Request failed on attempt %d: %s", attempt + 1, e)
+            # Nur "nicht erreichbar" zählt für den Circuit Breaker; Read-/Pool-Timeouts
+            # bedeuten ein beschäftigtes, aber gesundes Add-In
+            if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                record_failure()
 
-            # If max retries reached, raise the exception
-            if attempt == max_retries - 1:
+            # If max retries reached or the circuit just opened, raise the exception
+            if attempt == max_retries - 1 or circuit["state"] == "open":
                 raise
 
-            # Add delay before retry to give Fusion time to process
-            time.sleep(config.RETRY_DELAY)
+            await asyncio.sleep(max(backoff_delay(attempt), retry_after(e)))
 
         except Exception as e:
             logging.error("Unexpected error: %s", e)
             raise
 
+def addin_error_text(response):
+    """The "error" field of an add-in JSON error answer, or the raw body."""
+    try:
+        payload = response.json()
+    except json.JSONDecodeError:
+        return response.text
+    return payload.get("error", response.text) if isinstance(payload, dict) else response.text
+
+def retry_after(error):
+    """Seconds from the Retry-After header of a 429/503 answer, 0 if there is none."""
+    response = getattr(error, "response", None) if isinstance(error, httpx.HTTPStatusError) else None
+    try:
+        return min(config.RETRY_MAX_DELAY, float(response.headers.get("Retry-After", 0))) if response is not None else 0.0
+    except ValueError:
+        return 0.0
+
+async def wait_for_result(handle):
+    """
+    Resolves a request handle from the add-in. Pending handles are polled via
+    GET /result/<request_id> until the task finished or RESULT_MAX_WAIT expires.
+    Returns the task result when there is one, otherwise the handle itself.
+    :param handle: JSON response of the add-in.
+    """
+    if not isinstance(handle, dict) or "request_id" not in handle:
+        return handle
+    deadline = time.time() + config.RESULT_MAX_WAIT
+    client = get_http_client()
+    while handle.get("status") == "pending" and time.time() < deadline:
+        url = f"{config.ENDPOINTS['result']}/{handle['request_id']}"
+        response = await client.get(url, headers={"X-Wait": str(config.RESULT_WAIT)},
+                                    timeout=request_timeout(config.RESULT_WAIT + config.TIMEOUT_MARGIN))
+        if response.status_code == 404:
+            break  # Ergebnis verworfen (TTL)
+        handle = {**handle, **response.json()}
+    if handle.get("status") == "done" and handle.get("result") is not None:
+        return handle["result"]
+    return handle
+
+async def send_get_request(endpoint):
+    """
+    Reads a cached result from the Fusion 360 add-in (GET, no task is queued).
+    :param endpoint: The API endpoint URL.
+    """
+    response = await get_http_client().get(endpoint)
+    response.raise_for_status()
+    return response.json()
+
 @mcp.tool()
-def move_latest_body(x : float,y:float,z:float):
+async def move_latest_body(x : float,y:float,z:float):
     """
     Du kannst den letzten Körper in Fusion 360 verschieben in x,y und z Richtung
 
@@ -238,10 +425,10 @@ def move_latest_body(x : float,y:float,z:float):
         "z": z
     }
     headers = config.HEADERS
-    return send_request(endpoint, payload, headers)
+    return await send_request(endpoint, payload, headers)
 
 @mcp.tool()
-def create_thread(inside: bool, allsizes: int):
+async def create_thread(inside: bool, allsizes: int):
     """Erstellt ein Gewinde in Fusion 360
     Im Moment wählt der User selber in Fusioibn 360 das Profil aus
     Du musst nur angeben ob es innen oder außen sein soll
@@ -261,34 +448,61 @@ def create_thread(inside: bool, allsizes: int):
 
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Create thread failed: %s", e)
         raise
 
 @mcp.tool()
-def test_connection():
+async def test_connection():
     """Testes die Verbindung zum Fusion 360 Server."""
     try:
-        endpoint = config.ENDPOINTS["test_connection"]
-        return send_request(endpoint, {}, {})
+        # Direkt prüfen, auch wenn der Circuit Breaker offen ist (schließt ihn bei Erfolg)
+        result = await probe_connection()
+        if result is None:
+            return {"success": False, "error": "Fusion add-in not reachable on " + config.BASE_URL}
+        return result
     except Exception as e:
         logging.error("Test connection failed: %s", e)
         raise
 
 @mcp.tool()
-def delete_all():
+async def delete_all():
     """Löscht alle Objekte in der aktuellen Fusion 360-Sitzung."""
     try:
         endpoint = config.ENDPOINTS["delete_everything"]
         headers = config.HEADERS
-        send_request(endpoint, {}, headers)
+        await send_request(endpoint, {}, headers)
     except Exception as e:
         logging.error("Delete failed: %s", e)
         raise
 
+def grid_hole_points(grid):
+    """Punkte eines Rasters: {"rows", "columns", "spacing_x", "spacing_y", "origin": [x, y]}"""
+    rows = int(grid.get("rows", 1))
+    columns = int(grid.get("columns", 1))
+    spacing_x = float(grid.get("spacing_x", grid.get("spacing", 1.0)))
+    spacing_y = float(grid.get("spacing_y", grid.get("spacing", spacing_x)))
+    origin_x, origin_y = grid.get("origin", [0.0, 0.0])[:2]
+    return [[origin_x + column * spacing_x, origin_y + row * spacing_y]
+            for row in range(rows) for column in range(columns)]
+
+
+def bolt_circle_points(bolt_circle):
+    """Punkte auf einem Lochkreis: {"count", "radius", "center": [x, y], "start_angle" (deg)}"""
+    count = int(bolt_circle.get("count", 1))
+    radius = float(bolt_circle.get("radius", 1.0))
+    center_x, center_y = bolt_circle.get("center", [0.0, 0.0])[:2]
+    start = math.radians(float(bolt_circle.get("start_angle", 0.0)))
+    step = 2 * math.pi / count if count > 0 else 0.0
+    return [[round(center_x + radius * math.cos(start + i * step), 9),
+             round(center_y + radius * math.sin(start + i * step), 9)]
+            for i in range(count)]
+
+
 @mcp.tool()
-def draw_holes(points: list, depth: float, width: float, faceindex: int = 0):
+async def draw_holes(points: list = None, depth: float = 1.0, width: float = 1.0, faceindex: int = 0,
+                     grid: dict = None, bolt_circle: dict = None):
     """
     Zeichne Löcher in Fusion 360
     Übergebe die Json in richter Form
@@ -309,8 +523,19 @@ def draw_holes(points: list, depth: float, width: float, faceindex: int = 0):
     depth : 0.21,
     faceindex : 0
     }
-    """
-    try:
+    Alle Punkte landen in einer Skizze und werden mit einem einzigen Bohrungs-Feature gebohrt.
+    Für große Lochbilder statt einzelner Punkte die Generatoren verwenden (werden an points angehängt):
+    grid : {"rows": 8, "columns": 8, "spacing_x": 2.0, "spacing_y": 2.0, "origin": [-7, -7]}
+    bolt_circle : {"count": 6, "radius": 4.0, "center": [0, 0], "start_angle": 0}
+    """
+    try:
+        points = list(points or [])
+        if grid:
+            points.extend(grid_hole_points(grid))
+        if bolt_circle:
+            points.extend(bolt_circle_points(bolt_circle))
+        if not points:
+            return {"success": False, "error": "No hole points: pass points, grid or bolt_circle"}
         endpoint = config.ENDPOINTS["holes"]
         payload = {
             "points": points,
@@ -319,13 +544,13 @@ def draw_holes(points: list, depth: float, width: float, faceindex: int = 0):
             "faceindex": faceindex
         }
         headers = config.HEADERS
-        send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Draw holes failed: %s", e)
         raise
 
 @mcp.tool()
-def draw_witzenmannlogo(scale: float = 1.0, z: float = 1.0):
+async def draw_witzenmannlogo(scale: float = 1.0, z: float = 1.0):
     """
     Du baust das witzenmann logo
     Du kannst es skalieren
@@ -343,13 +568,13 @@ def draw_witzenmannlogo(scale: float = 1.0, z: float = 1.0):
             "z": z
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Witzenmannlogo failed: %s", e)
         raise
 
 @mcp.tool()
-def spline(points: list, plane: str):
+async def spline(points: list, plane: str):
     """
     Zeichne eine Spline Kurve in Fusion 360
     Du kannst die Punkte als Liste von Listen übergeben
@@ -366,86 +591,90 @@ def spline(points: list, plane: str):
             "plane": plane
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Spline failed: %s", e)
         raise
 
 @mcp.tool()
-def sweep():
+async def sweep():
     """
     Benutzt den vorhrig erstellten spline und den davor erstellten krei,
     um eine sweep funktion auszuführen
     """
     try:
         endpoint = config.ENDPOINTS["sweep"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("Sweep failed: %s", e)
         raise
 
 @mcp.tool()
-def undo():
+async def undo():
     """Macht die letzte Aktion rückgängig."""
     try:
         endpoint = config.ENDPOINTS["undo"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("Undo failed: %s", e)
         raise
 
 @mcp.tool()
-def count():
+async def count():
     """Zählt die Parameter im aktuellen Modell."""
     try:
         endpoint = config.ENDPOINTS["count_parameters"]
-        return send_request(endpoint, {}, {})
+        return await send_get_request(endpoint)
     except Exception as e:
         logging.error("Count failed: %s", e)
         raise
 
 @mcp.tool()
-def list_parameters():
+async def list_parameters():
     """Listet alle Parameter im aktuellen Modell auf."""
     try:
         endpoint = config.ENDPOINTS["list_parameters"]
-        return send_request(endpoint, {}, {})
+        return await send_get_request(endpoint)
     except Exception as e:
         logging.error("List parameters failed: %s", e)
         raise
 
 @mcp.tool()
-def export_step(name : str):
+async def export_step(name : str):
     """Exportiert das Modell als STEP-Datei."""
     try:
         endpoint = config.ENDPOINTS["export_step"]
         data = {
             "name": name
         }
-        return send_request(endpoint, data, {})
+        return await send_request(endpoint, data, {})
     except Exception as e:
         logging.error("Export STEP failed: %s", e)
         raise
 
 @mcp.tool()
-def export_stl(name : str):
+async def export_stl(name : str):
     """Exportiert das Modell als STL-Datei."""
     try:
         endpoint = config.ENDPOINTS["export_stl"]
         data = {
             "name": name
         }
-        return send_request(endpoint, data, {})
+        return await send_request(endpoint, data, {})
     except Exception as e:
         logging.error("Export STL failed: %s", e)
         raise
 
 @mcp.tool()
-def fillet_edges(radius: float, edges: list = None):
+async def fillet_edges(radius: float, edges: list = None, batch: bool = True):
     """Erstellt eine Abrundung an den angegebenen Kanten.
 
     :param radius: Fillet radius in cm
     :param edges: Optional list of edge indices to fillet. If None, attempts all edges.
+    :param batch: Without edges, fillet everything as one feature; failing edges are
+                  isolated by bisection and reported in "skipped_edges" ({"body", "edge",
+                  "token", "reason"}; indices are from before the fillet).
+                  False creates one feature per edge (old behaviour).
 
     For edge-selective filleting (recommended for props):
     - Specify edge indices as a list, e.g., edges=[0, 1, 5, 8]
@@ -456,16 +685,17 @@ def fillet_edges(radius: float, edges: list = None):
         endpoint = config.ENDPOINTS["fillet_edges"]
         payload = {
             "radius": radius,
-            "edges": edges
+            "edges": edges,
+            "batch": batch
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Fillet edges failed: %s", e)
         raise
 
 @mcp.tool()
-def change_parameter(name: str, value: str):
+async def change_parameter(name: str, value: str):
     """Ändert den Wert eines Parameters."""
     try:
         endpoint = config.ENDPOINTS["change_parameter"]
@@ -474,13 +704,38 @@ def change_parameter(name: str, value: str):
             "value": value
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Change parameter failed: %s", e)
         raise
 
 @mcp.tool()
-def draw_cylinder(radius: float , height: float , x: float, y: float, z: float , plane: str="XY"):
+async def set_parameters(parameters: dict):
+    """
+    Ändert mehrere Parameter auf einmal mit nur einer Neuberechnung.
+
+    :param parameters: Map name -> expression, e.g. {"width": "40 mm", "height": "width / 2"}
+    :return: {"success", "healthy", "updated": {name: {"expression", "value", "unit"}},
+              "failed": [{"name", "error"}], "health_regressions": [{"feature_id", "name",
+              "type", "before", "after", "error_message"}], "model_parameters": [...]}
+
+    Prefer this over repeated change_parameter calls when sweeping or tuning several
+    dimensions: one round trip and one recompute instead of one per parameter.
+    Check "health_regressions" - features that turned into warning/error state.
+    """
+    try:
+        endpoint = config.ENDPOINTS["set_parameters"]
+        payload = {
+            "parameters": parameters
+        }
+        headers = config.HEADERS
+        return await send_request(endpoint, payload, headers)
+    except Exception as e:
+        logging.error("set_parameters failed: %s", e)
+        raise
+
+@mcp.tool()
+async def draw_cylinder(radius: float , height: float , x: float, y: float, z: float , plane: str="XY"):
     """
     Zeichne einen Zylinder, du kannst du in der XY Ebende arbeiten
     Es gibt Standartwerte
@@ -497,12 +752,12 @@ def draw_cylinder(radius: float , height: float , x: float, y: float, z: float ,
             "z": z,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Draw cylinder failed: %s", e)
         return None
 @mcp.tool()
-def draw_box(height_value:str, width_value:str, depth_value:str, x_value:float, y_value:float,z_value:float, plane:str="XY"):
+async def draw_box(height_value:str, width_value:str, depth_value:str, x_value:float, y_value:float,z_value:float, plane:str="XY"):
     """
     Du kannst die Höhe, Breite und Tiefe der Box als Strings übergeben.
     Depth ist die Tiefe in z Richtung also wenn gesagt wird die Box soll flach sein,
@@ -543,13 +798,13 @@ def draw_box(height_value:str, width_value:str, depth_value:str, x_value:float,
 
         }
 
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Draw box failed: %s", e)
         return None
 
 @mcp.tool()
-def shell_body(thickness: float, faceindex: int):
+async def shell_body(thickness: float, faceindex: int):
     """
     Hollows out a body, leaving a uniform wall thickness.
 
@@ -619,20 +874,20 @@ def shell_body(thickness: float, faceindex: int):
             "thickness": thickness,
             "faceindex": faceindex
         }
-        result = send_request(endpoint, data, headers)
+        result = await send_request(endpoint, data, headers)
 
         # Check if result indicates failure
         if isinstance(result, dict) and not result.get("success", True):
             logging.warning("Shell body operation failed or was skipped: %s", result.get("message"))
 
         return result
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Shell body failed: %s", e)
         return {"success": False, "error": str(e)}
 
 
 @mcp.tool()
-def draw_sphere(x: float, y: float, z: float, radius: float):
+async def draw_sphere(x: float, y: float, z: float, radius: float):
     """
     Zeichne eine Kugel in Fusion 360
     Du kannst die Koordinaten als Float übergeben
@@ -655,15 +910,15 @@ def draw_sphere(x: float, y: float, z: float, radius: float):
             "z": z,
             "radius": radius
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw sphere failed: %s", e)
         raise
 
 
 @mcp.tool()
-def draw_2d_rectangle(x_1: float, y_1: float, z_1: float, x_2: float, y_2: float, z_2: float, plane: str):
+async def draw_2d_rectangle(x_1: float, y_1: float, z_1: float, x_2: float, y_2: float, z_2: float, plane: str):
     """
     Zeichne ein 2D-Rechteck in Fusion 360 für loft /Sweep etc.
     """
@@ -679,14 +934,14 @@ def draw_2d_rectangle(x_1: float, y_1: float, z_1: float, x_2: float, y_2: float
             "z_2": z_2,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw 2D rectangle failed: %s", e)
         raise
 
 @mcp.tool()
-def boolean_operation(operation: str):
+async def boolean_operation(operation: str):
     """
     Führe eine boolesche Operation auf dem letzten Körper aus.
     Du kannst die Operation als String übergeben.
@@ -706,15 +961,15 @@ def boolean_operation(operation: str):
         data = {
             "operation": operation
         }
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Boolean operation failed: %s", e)
         raise
 
 
 
 @mcp.tool()
-def draw_lines(points : list, plane : str):
+async def draw_lines(points : list, plane : str):
     """
     Zeichne Linien in Fusion 360
     Du kannst die Punkte als Liste von Listen übergeben
@@ -731,12 +986,12 @@ def draw_lines(points : list, plane : str):
             "points": points,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Draw lines failed: %s", e)
 
 @mcp.tool()
-def extrude(value: float, angle: float = 0.0):
+async def extrude(value: float, angle: float = 0.0):
     """Extrudiert die letzte Skizze um einen angegebenen Wert.
     Du kannst auch einen Winkel angeben
     Returns body_id for tracking the created body.
@@ -748,16 +1003,14 @@ def extrude(value: float, angle: float = 0.0):
             "value": value,
             "taperangle": angle
         }
-        data = json.dumps(data)
-        response = requests.post(url, data, headers=config.HEADERS)
-        return response.json()
-    except requests.RequestException as e:
+        return await send_request(url, data, config.HEADERS)
+    except httpx.HTTPError as e:
         logging.error("Extrude failed: %s", e)
         raise
 
 
 @mcp.tool()
-def draw_text(text: str, plane: str, x_1: float, y_1: float, z_1: float, x_2: float, y_2: float, z_2: float, thickness: float,value: float):
+async def draw_text(text: str, plane: str, x_1: float, y_1: float, z_1: float, x_2: float, y_2: float, z_2: float, thickness: float,value: float):
     """
     Zeichne einen Text in Fusion 360 der ist ein Sketch also kannst dz  ann extruden
     Mit value kannst du angeben wie weit du den text extrudieren willst
@@ -777,13 +1030,13 @@ def draw_text(text: str, plane: str, x_1: float, y_1: float, z_1: float, x_2: fl
             "thickness": thickness,
             "extrusion_value": value
         }
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Draw text failed: %s", e)
         raise
 
 @mcp.tool()
-def extrude_thin(thickness :float, distance : float):
+async def extrude_thin(thickness :float, distance : float):
     """
     Du kannst die Dicke der Wand als Float übergeben
     Du kannst schöne Hohlkörper damit erstellen
@@ -796,13 +1049,13 @@ def extrude_thin(thickness :float, distance : float):
             "thickness": thickness,
             "distance": distance
         }
-        return send_request(endpoint, data, headers)
-    except requests.RequestException as e:
+        return await send_request(endpoint, data, headers)
+    except httpx.HTTPError as e:
         logging.error("Extrude thin failed: %s", e)
         raise
 
 @mcp.tool()
-def cut_extrude(depth :float):
+async def cut_extrude(depth :float):
     """
     Du kannst die Tiefe des Schnitts als Float übergeben
     :param depth: Die Tiefe des Schnitts in mm
@@ -814,14 +1067,14 @@ def cut_extrude(depth :float):
         data = {
             "depth": depth
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Cut extrude failed: %s", e)
         raise
 
 @mcp.tool()
-def revolve(angle : float):
+async def revolve(angle : float):
     """
     Sobald du dieses tool aufrufst wird der nutzer gebeten in Fusion ein profil
     auszuwählen und dann eine Achse.
@@ -834,13 +1087,13 @@ def revolve(angle : float):
             "angle": angle
 
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Revolve failed: %s", e)
         raise
 @mcp.tool()
-def draw_arc(point1 : list, point2 : list, point3 : list, plane : str):
+async def draw_arc(point1 : list, point2 : list, point3 : list, plane : str):
     """
     Zeichne einen Bogen in Fusion 360
     Du kannst die Punkte als Liste von Listen übergeben
@@ -858,14 +1111,14 @@ def draw_arc(point1 : list, point2 : list, point3 : list, plane : str):
             "point3": point3,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw arc failed: %s", e)
         raise
 
 @mcp.tool()
-def draw_one_line(x1: float, y1: float, z1: float, x2: float, y2: float, z2: float, plane: str="XY"):
+async def draw_one_line(x1: float, y1: float, z1: float, x2: float, y2: float, z2: float, plane: str="XY"):
     """
     Zeichne eine Linie in Fusion 360
     Du kannst die Koordinaten als Float übergeben
@@ -885,14 +1138,14 @@ def draw_one_line(x1: float, y1: float, z1: float, x2: float, y2: float, z2: flo
             "z2": z2,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw one line failed: %s", e)
         raise
 
 @mcp.tool()
-def rectangular_pattern(plane: str, quantity_one: float, quantity_two: float, distance_one: float, distance_two: float, axis_one: str, axis_two: str):
+async def rectangular_pattern(plane: str, quantity_one: float, quantity_two: float, distance_one: float, distance_two: float, axis_one: str, axis_two: str):
     """
     Du kannst ein Rectangular Pattern (Rechteckmuster) erstellen um Objekte in einer rechteckigen Anordnung zu verteilen.
     Du musst zwei Mengen (quantity_one, quantity_two) als Float übergeben,
@@ -913,15 +1166,15 @@ def rectangular_pattern(plane: str, quantity_one: float, quantity_two: float, di
             "axis_one": axis_one,
             "axis_two": axis_two
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Rectangular pattern failed: %s", e)
         raise
 
 
 @mcp.tool()
-def circular_pattern(plane: str, quantity: float, axis: str):
+async def circular_pattern(plane: str, quantity: float, axis: str):
     """
     Du kannst ein Circular Pattern (Kreismuster) erstellen um Objekte kreisförmig um eine Achse zu verteilen.
     Du übergibst die Anzahl der Kopien als Float, die Achse als String ("X", "Y" oder "Z") und die Ebene als String ("XY", "YZ" oder "XZ").
@@ -954,14 +1207,14 @@ def circular_pattern(plane: str, quantity: float, axis: str):
             "quantity": quantity,
             "axis": axis
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Circular pattern failed: %s", e)
         raise
 
 @mcp.tool()
-def ellipsie(x_center: float, y_center: float, z_center: float,
+async def ellipsie(x_center: float, y_center: float, z_center: float,
               x_major: float, y_major: float, z_major: float, x_through: float, y_through: float, z_through: float, plane: str):
     """Zeichne eine Ellipse in Fusion 360."""
     try:
@@ -979,14 +1232,14 @@ def ellipsie(x_center: float, y_center: float, z_center: float,
             "z_through": z_through,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw ellipse failed: %s", e)
         raise
 
 @mcp.tool()
-def draw2Dcircle(radius: float, x: float, y: float, z: float, plane: str = "XY"):
+async def draw2Dcircle(radius: float, x: float, y: float, z: float, plane: str = "XY"):
     """
     Zeichne einen Kreis in Fusion 360
     Du kannst den Radius als Float übergeben
@@ -1018,14 +1271,14 @@ def draw2Dcircle(radius: float, x: float, y: float, z: float, plane: str = "XY")
             "z": z,
             "plane": plane
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Draw 2D circle failed: %s", e)
         raise
 
 @mcp.tool()
-def loft(sketchcount: int):
+async def loft(sketchcount: int):
     """
     Du kannst eine Loft Funktion in Fusion 360 erstellen
     Du übergibst die Anzahl der Sketches die du für die Loft benutzt hast als Integer
@@ -1038,15 +1291,15 @@ def loft(sketchcount: int):
         data = {
             "sketchcount": sketchcount
         }
-        return send_request(endpoint, data, headers)
+        return await send_request(endpoint, data, headers)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error("Loft failed: %s", e)
         raise
 
 
 @mcp.tool()
-def pocket_recess(depth: float, face_index: int = None, body_id = None, sketch_id = None):
+async def pocket_recess(depth: float, face_index: int = None, body_id = None, sketch_id = None):
     """
     Creates a pocket/recess in an existing body by cutting a sketch.
     Now supports explicit body_id and sketch_id for precise targeting.
@@ -1071,14 +1324,14 @@ def pocket_recess(depth: float, face_index: int = None, body_id = None, sketch_i
             "sketch_id": sketch_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Pocket recess failed: %s", e)
         raise
 
 
 @mcp.tool()
-def sketch_on_face(body_index: int = -1, face_index: int = 0):
+async def sketch_on_face(body_index: int = -1, face_index: int = 0):
     """
     Creates a new sketch directly on a face of an existing body.
     This is critical for sketching on angled or curved surfaces.
@@ -1098,14 +1351,14 @@ def sketch_on_face(body_index: int = -1, face_index: int = 0):
             "face_index": face_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Sketch on face failed: %s", e)
         raise
 
 
 @mcp.tool()
-def create_work_plane(plane_type: str, offset_distance: float, reference_index: int = 0):
+async def create_work_plane(plane_type: str, offset_distance: float, reference_index: int = 0):
     """
     Creates a construction/work plane for advanced sketching.
     This allows you to create reference planes offset from existing geometry.
@@ -1126,14 +1379,14 @@ def create_work_plane(plane_type: str, offset_distance: float, reference_index:
             "reference_index": reference_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Create work plane failed: %s", e)
         raise
 
 
 @mcp.tool()
-def project_edges(body_index: int = None):
+async def project_edges(body_index: int = None):
     """
     Projects edges from a body onto the current sketch plane.
     This allows you to reference existing geometry in your sketch.
@@ -1149,14 +1402,14 @@ def project_edges(body_index: int = None):
             "body_index": body_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Project edges failed: %s", e)
         raise
 
 
 @mcp.tool()
-def draw_polygon(sides: int, radius: float, x: float, y: float, z: float, plane: str = "XY"):
+async def draw_polygon(sides: int, radius: float, x: float, y: float, z: float, plane: str = "XY"):
     """
     Draws a regular polygon with the specified number of sides.
     Perfect for creating hexagons (6 sides), pentagons (5 sides), octagons (8 sides), etc.
@@ -1182,14 +1435,14 @@ def draw_polygon(sides: int, radius: float, x: float, y: float, z: float, plane:
             "plane": plane
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Draw polygon failed: %s", e)
         raise
 
 
 @mcp.tool()
-def offset_surface(distance: float, face_index: int = 0):
+async def offset_surface(distance: float, face_index: int = 0):
     """
     Creates an offset surface by offsetting faces of a body.
     Useful for creating parallel surfaces and wall thicknesses.
@@ -1206,14 +1459,14 @@ def offset_surface(distance: float, face_index: int = 0):
             "face_index": face_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Offset surface failed: %s", e)
         raise
 
 
 @mcp.tool()
-def mirror_feature(mirror_plane: str, body_index: int = None):
+async def mirror_feature(mirror_plane: str, body_index: int = None):
     """
     Mirrors a body across a plane for creating symmetric features.
 
@@ -1230,14 +1483,14 @@ def mirror_feature(mirror_plane: str, body_index: int = None):
             "body_index": body_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Mirror feature failed: %s", e)
         raise
 
 
 @mcp.tool()
-def list_bodies():
+async def list_bodies():
     """
     Lists all bodies in the current design with their IDs, names, and properties.
     Essential for tracking multiple bodies in segmented prop modeling.
@@ -1254,28 +1507,28 @@ def list_bodies():
     """
     try:
         endpoint = config.ENDPOINTS["list_bodies"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("List bodies failed: %s", e)
         raise
 
 
 @mcp.tool()
-def get_active_body():
+async def get_active_body():
     """
     Gets the currently active or last created body.
     Returns body_id, body_name, and index.
     """
     try:
         endpoint = config.ENDPOINTS["get_active_body"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("Get active body failed: %s", e)
         raise
 
 
 @mcp.tool()
-def rename_body(body_id, new_name: str):
+async def rename_body(body_id, new_name: str):
     """
     Renames a body for better organization in complex models.
 
@@ -1295,14 +1548,14 @@ def rename_body(body_id, new_name: str):
             "new_name": new_name
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Rename body failed: %s", e)
         raise
 
 
 @mcp.tool()
-def list_sketches():
+async def list_sketches():
     """
     Lists all sketches in the current design with their IDs, names, and properties.
     Useful for managing multiple sketches in complex modeling workflows.
@@ -1319,28 +1572,28 @@ def list_sketches():
     """
     try:
         endpoint = config.ENDPOINTS["list_sketches"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("List sketches failed: %s", e)
         raise
 
 
 @mcp.tool()
-def get_active_sketch():
+async def get_active_sketch():
     """
     Gets the currently active or last created sketch.
     Returns sketch_id, sketch_name, index, and profile_count.
     """
     try:
         endpoint = config.ENDPOINTS["get_active_sketch"]
-        return send_request(endpoint, {}, {})
+        return await send_request(endpoint, {}, {})
     except Exception as e:
         logging.error("Get active sketch failed: %s", e)
         raise
 
 
 @mcp.tool()
-def activate_sketch(sketch_id):
+async def activate_sketch(sketch_id):
     """
     Activates a sketch for editing by its ID or index.
     Validates the sketch exists and makes it visible if needed.
@@ -1353,14 +1606,14 @@ def activate_sketch(sketch_id):
             "sketch_id": sketch_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Activate sketch failed: %s", e)
         raise
 
 
 @mcp.tool()
-def close_sketch(sketch_id = None):
+async def close_sketch(sketch_id = None):
     """
     Closes/deactivates a sketch.
     If sketch_id is None, closes the currently active sketch.
@@ -1375,14 +1628,14 @@ def close_sketch(sketch_id = None):
             "sketch_id": sketch_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Close sketch failed: %s", e)
         raise
 
 
 @mcp.tool()
-def select_body(body_name: str):
+async def select_body(body_name: str):
     """
     Selects a body by its name and returns the body object for further operations.
 
@@ -1418,14 +1671,14 @@ def select_body(body_name: str):
             "name": body_name
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Select body failed: %s", e)
         raise
 
 
 @mcp.tool()
-def select_sketch(sketch_name: str):
+async def select_sketch(sketch_name: str):
     """
     Selects a sketch by its name and returns the sketch object for further operations.
 
@@ -1458,7 +1711,7 @@ def select_sketch(sketch_name: str):
             "name": sketch_name
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Select sketch failed: %s", e)
         raise
@@ -1469,7 +1722,7 @@ def select_sketch(sketch_name: str):
 #########################################################################################
 
 @mcp.tool()
-def select_body(body_id: str):
+async def select_body(body_id: str):
     """
     🧩 CRITICAL TOOL #1: Select a body by ID and set it as active.
 
@@ -1506,14 +1759,14 @@ def select_body(body_id: str):
             "body_id": body_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Select body by ID failed: %s", e)
         raise
 
 
 @mcp.tool()
-def list_faces(body_id: str):
+async def list_faces(body_id: str):
     """
     🧩 CRITICAL TOOL #2: Get all faces with semantic properties (normal, area).
 
@@ -1552,14 +1805,14 @@ def list_faces(body_id: str):
             "body_id": body_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("List faces failed: %s", e)
         raise
 
 
 @mcp.tool()
-def select_face(body_id: str, face_id: str):
+async def select_face(body_id: str, face_id: str):
     """
     🧩 CRITICAL TOOL #3: Select a specific face for sketch placement.
 
@@ -1599,14 +1852,14 @@ def select_face(body_id: str, face_id: str):
             "face_id": face_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Select face failed: %s", e)
         raise
 
 
 @mcp.tool()
-def list_features(body_id: str = None):
+async def list_features(body_id: str = None):
     """
     🧩 CRITICAL TOOL #4: List all features in design with types and body references.
 
@@ -1647,14 +1900,14 @@ def list_features(body_id: str = None):
             "body_id": body_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("List features failed: %s", e)
         raise
 
 
 @mcp.tool()
-def boolean_preview(target_body_id: str, tool_body_id: str):
+async def boolean_preview(target_body_id: str, tool_body_id: str):
     """
     🧩 CRITICAL TOOL #5: Preview a boolean operation before committing.
 
@@ -1701,14 +1954,14 @@ def boolean_preview(target_body_id: str, tool_body_id: str):
             "tool_body_id": tool_body_id
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("Boolean preview failed: %s", e)
         raise
 
 
 @mcp.tool()
-def check_shell_status(body_id = 0):
+async def check_shell_status(body_id = 0):
     """
     Checks if a body has already been shelled to prevent duplicate shell operations.
 
@@ -1737,27 +1990,20 @@ def check_shell_status(body_id = 0):
     ```
     """
     try:
-        # Use get_feature_history to check for shell features
-        history = get_feature_history(body_id=body_id, include_parameters=False, include_errors=False)
+        # Shell-Anzahl direkt aus dem Timeline-Index des Add-ins statt der ganzen Historie
+        endpoint = config.ENDPOINTS["feature_counts"]
+        payload = {"body_id": body_id, "feature_type": "Shell"}
+        counts = await send_request(endpoint, payload, config.HEADERS)
 
-        if not history.get("success"):
+        if not counts.get("success"):
             return {
                 "success": False,
-                "error": "Could not retrieve feature history",
-                "message": history.get("error", "Unknown error")
+                "error": "Could not retrieve feature counts",
+                "message": counts.get("error", "Unknown error")
             }
 
-        # Count shell features
-        shell_count = 0
-        shell_features = []
-        for feature in history.get("features", []):
-            if feature.get("type") == "Shell":
-                shell_count += 1
-                shell_features.append({
-                    "name": feature.get("name"),
-                    "status": feature.get("status"),
-                    "index": feature.get("index")
-                })
+        shell_count = counts.get("counts", {}).get("Shell", 0)
+        shell_features = counts.get("features", [])
 
         has_shell = shell_count > 0
 
@@ -1782,6 +2028,27 @@ def check_shell_status(body_id = 0):
         }
 
 
+@mcp.tool()
+async def get_feature_counts(body_id = None, feature_type: str = None):
+    """
+    Feature counts by type for a body, e.g. {"Extrude": 3, "Fillet": 1, "Shell": 1}.
+
+    Answered from the add-in's incremental timeline index, so it stays cheap on long timelines.
+
+    :param body_id: Body ID, index, or name (None = whole design)
+    :param feature_type: Optionally list the features of this type ("Shell", "Extrude", ...)
+    :return: {"success", "body_id", "counts", "total", "timeline_count", ["features"]}
+    """
+    try:
+        endpoint = config.ENDPOINTS["feature_counts"]
+        payload = {"body_id": body_id, "feature_type": feature_type}
+        headers = config.HEADERS
+        return await send_request(endpoint, payload, headers)
+    except Exception as e:
+        logging.error("get_feature_counts failed: %s", e)
+        raise
+
+
 
 
 @mcp.prompt()
@@ -2005,7 +2272,7 @@ def kompensator():
 #########################################################################################
 
 @mcp.tool()
-def get_sketch_status(sketch_id: str = None, include_geometry: bool = True):
+async def get_sketch_status(sketch_id: str = None, include_geometry: bool = True):
     """
     Validate sketch state and content before closing it.
 
@@ -2041,14 +2308,14 @@ def get_sketch_status(sketch_id: str = None, include_geometry: bool = True):
             "include_geometry": include_geometry
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("get_sketch_status failed: %s", e)
         raise
 
 
 @mcp.tool()
-def list_faces(body_id):
+async def list_faces(body_id, include_adjacency: bool = True):
     """
     Query all faces of a body with geometric properties (not just indices).
 
@@ -2057,6 +2324,7 @@ def list_faces(body_id):
     Returns face type, area, normal vector, position, orientation (front/back/top/bottom), and adjacent faces.
 
     :param body_id: Body ID, index, or name
+    :param include_adjacency: Include adjacent_face_indices per face (set False if only normals/areas are needed)
     :return: List of all faces with properties
 
     **Usage Example:**
@@ -2070,18 +2338,19 @@ def list_faces(body_id):
     ```
     """
     try:
-        endpoint = config.ENDPOINTS["list_faces"]
-        payload = {"body_id": body_id}
+        # POST /list_faces ist die Metadaten-Variante; diese Abfrage läuft über die Registry
+        endpoint = f"{config.ENDPOINTS['command']}/list_faces"
+        payload = {"body_id": body_id, "include_adjacency": include_adjacency}
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("list_faces failed: %s", e)
         raise
 
 
 @mcp.tool()
-def pocket_recess_safe(body_id, sketch_id, depth: float, operation: str = "cut",
-                       validate_before: bool = True, validate_after: bool = True):
+async def pocket_recess_safe(body_id, sketch_id=None, depth: float = 0.5, operation: str = "cut",
+                       validate_before: bool = True, validate_after: bool = True, sketch_ids: list = None):
     """
     Create pocket with complete validation and result confirmation.
 
@@ -2093,6 +2362,8 @@ def pocket_recess_safe(body_id, sketch_id, depth: float, operation: str = "cut",
     :param operation: "cut", "join", or "intersect"
     :param validate_before: Validate sketch has profiles before cutting
     :param validate_after: Verify volume actually changed
+    :param sketch_ids: Instead of sketch_id: several sketches (e.g. draw_rectangles_batch
+                       result["sketch_ids"]); all their profiles are pocketed in this one call
     :return: Detailed result with volume changes and validation status
 
     **Usage Example:**
@@ -2122,17 +2393,18 @@ def pocket_recess_safe(body_id, sketch_id, depth: float, operation: str = "cut",
             "depth": depth,
             "operation": operation,
             "validate_before": validate_before,
-            "validate_after": validate_after
+            "validate_after": validate_after,
+            "sketch_ids": sketch_ids
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("pocket_recess_safe failed: %s", e)
         raise
 
 
 @mcp.tool()
-def get_feature_history(body_id, include_parameters: bool = True, include_errors: bool = True):
+async def get_feature_history(body_id, include_parameters: bool = True, include_errors: bool = True):
     """
     List all features (extrudes, pockets, fillets, etc.) applied to a body.
 
@@ -2168,14 +2440,14 @@ def get_feature_history(body_id, include_parameters: bool = True, include_errors
             "include_errors": include_errors
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("get_feature_history failed: %s", e)
         raise
 
 
 @mcp.tool()
-def find_face_by_property(body_id, selector: str = None, normal: list = None,
+async def find_face_by_property(body_id, selector: str = None, normal: list = None,
                          area_range: dict = None, position: dict = None,
                          return_all_matches: bool = False):
     """
@@ -2212,22 +2484,66 @@ def find_face_by_property(body_id, selector: str = None, normal: list = None,
             "return_all_matches": return_all_matches
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("find_face_by_property failed: %s", e)
         raise
 
 
 @mcp.tool()
-def draw_rectangles_batch(plane: str, rectangles: list):
+async def query_faces_spatial(body_id, queries: list):
+    """
+    Re-find faces by position using the body's spatial index; many queries in one call.
+
+    **WHY NEEDED**: After pockets and cuts, face indices shift. Looking faces up by where they
+    are (nearest to a point, within a radius, hit by a ray, inside a box) is stable.
+
+    :param body_id: Body ID, index, or name
+    :param queries: List of queries, each one of
+        {"type": "nearest", "point": [x, y, z], "k": 1}
+        {"type": "radius", "point": [x, y, z], "radius": r}
+        {"type": "ray", "origin": [x, y, z], "direction": [dx, dy, dz]}
+        {"type": "box", "min": [x, y, z], "max": [x, y, z]}
+    :return: {"results": [{"query", "success", "faces": [{"face_index", "distance"}]}]}
+             Ray and box queries test face bounding boxes; ray hits are sorted by distance.
+
+    **Usage Example:**
+    ```python
+    hits = query_faces_spatial(body_id=1, queries=[
+        {"type": "nearest", "point": [0, 0, 2]},
+        {"type": "ray", "origin": [0, -20, 1], "direction": [0, 1, 0]},
+    ])
+    top_face_index = hits["results"][0]["faces"][0]["face_index"]
+    ```
+    """
+    try:
+        endpoint = config.ENDPOINTS["query_faces_spatial"]
+        payload = {
+            "body_id": body_id,
+            "queries": queries
+        }
+        headers = config.HEADERS
+        return await send_request(endpoint, payload, headers)
+    except Exception as e:
+        logging.error("query_faces_spatial failed: %s", e)
+        raise
+
+
+@mcp.tool()
+async def draw_rectangles_batch(plane: str, rectangles: list):
     """
-    Draw multiple rectangles in a single sketch in one operation.
+    Draw multiple rectangles in one operation.
 
     **WHY NEEDED**: Sequential rectangle draws accumulate errors. Batch reduces failure points.
 
+    Rectangles are grouped by z_center: every distinct offset gets one construction
+    plane and one sketch holding all of its rectangles. "groups" / "sketch_ids" in the
+    result list one sketch per offset (z_center, sketch_id, rectangle_count); pass
+    sketch_ids to pocket_recess_safe/pocket_smart to pocket them all in one call. "sketch_id" is the last group's sketch.
+
     :param plane: "XY", "YZ", or "XZ"
     :param rectangles: List of rectangle dicts with x_min, x_max, y_min, y_max, z_center
-    :return: Sketch ID and success count
+    :return: Sketch IDs per offset group and success count
 
     **Usage Example:**
     ```python
@@ -2244,7 +2560,7 @@ def draw_rectangles_batch(plane: str, rectangles: list):
     result = draw_rectangles_batch(plane="XY", rectangles=vent_bands)
     assert result["rectangles_failed"] == 0, "Some rectangles failed"
     close_sketch()
-    pocket_recess_safe(body_id=1, depth=0.5)  # Creates 5 pockets at once
+    pocket_recess_safe(body_id=1, sketch_ids=result["sketch_ids"], depth=0.5)  # one call for all groups
     ```
     """
     try:
@@ -2254,16 +2570,65 @@ def draw_rectangles_batch(plane: str, rectangles: list):
             "rectangles": rectangles
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("draw_rectangles_batch failed: %s", e)
         raise
 
 
 @mcp.tool()
-def pocket_smart(body_id, sketch_id, depth_mode: str, depth_value: float,
+async def build_sketch(entities: list, plane: str = "XY", offset: float = 0.0, name: str = None):
+    """
+    Build one sketch from many entities in a single call, solved once at the end.
+
+    **WHY NEEDED**: draw_lines, spline, draw_polygon etc. create one sketch per call and
+    Fusion re-solves after every curve. build_sketch defers compute while inserting, so
+    outlines with 1000+ segments stay fast and need one round trip.
+
+    :param entities: List of entity dicts, each with a "type":
+        - {"type": "line", "start": [x, y], "end": [x, y]}
+        - {"type": "polyline", "points": [[x, y], ...], "closed": true}
+        - {"type": "rectangle", "corner1": [x, y], "corner2": [x, y]}
+        - {"type": "arc", "points": [[x, y], [x, y], [x, y]]}  (start, along, end)
+        - {"type": "circle", "center": [x, y], "radius": r}
+        - {"type": "ellipse", "center": [x, y], "major": [x, y], "through": [x, y]}
+        - {"type": "polygon", "center": [x, y], "radius": r, "sides": 6, "start_angle": 0}
+        - {"type": "spline", "points": [[x, y], ...], "closed": false}
+        Points may carry a third (z) coordinate; polyline segments share endpoints.
+    :param plane: "XY", "YZ", or "XZ"
+    :param offset: Offset of the sketch plane from the base plane in cm
+    :param name: Optional sketch name
+    :return: sketch_id, entities_drawn, failed_entities, curve_count, profile_count
+
+    **Usage Example:**
+    ```python
+    result = build_sketch(plane="XY", entities=[
+        {"type": "rectangle", "corner1": [-5, -3], "corner2": [5, 3]},
+        {"type": "circle", "center": [0, 0], "radius": 1},
+        {"type": "polygon", "center": [3, 0], "radius": 0.5, "sides": 6},
+    ])
+    pocket_recess_safe(body_id=1, sketch_id=result["sketch_id"], depth=0.5)
+    ```
+    """
+    try:
+        endpoint = config.ENDPOINTS["build_sketch"]
+        payload = {
+            "plane": plane,
+            "entities": entities,
+            "offset": offset,
+            "name": name
+        }
+        headers = config.HEADERS
+        return await send_request(endpoint, payload, headers)
+    except Exception as e:
+        logging.error("build_sketch failed: %s", e)
+        raise
+
+
+@mcp.tool()
+async def pocket_smart(body_id, sketch_id=None, depth_mode: str = "absolute", depth_value: float = 0.5,
                 from_face: str = "sketch_plane", snap_to_geometry: bool = False,
-                validate_after: bool = True):
+                validate_after: bool = True, sketch_ids: list = None):
     """
     Create pocket with intelligent depth calculation.
 
@@ -2280,6 +2645,7 @@ def pocket_smart(body_id, sketch_id, depth_mode: str, depth_value: float,
     :param from_face: "top", "bottom", or "sketch_plane"
     :param snap_to_geometry: Snap to internal geometry
     :param validate_after: Validate result
+    :param sketch_ids: Instead of sketch_id: pocket several sketches with the same depth in one call
     :return: Result with calculated depth
 
     **Usage Example:**
@@ -2305,17 +2671,18 @@ def pocket_smart(body_id, sketch_id, depth_mode: str, depth_value: float,
             "depth_value": depth_value,
             "from_face": from_face,
             "snap_to_geometry": snap_to_geometry,
-            "validate_after": validate_after
+            "validate_after": validate_after,
+            "sketch_ids": sketch_ids
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("pocket_smart failed: %s", e)
         raise
 
 
 @mcp.tool()
-def begin_transaction(transaction_id: str, description: str = "",
+async def begin_transaction(transaction_id: str, description: str = "",
                      auto_validate: bool = True, auto_rollback_on_error: bool = False):
     """
     Begin a transaction to group multiple operations with atomic commit/rollback.
@@ -2355,14 +2722,14 @@ def begin_transaction(transaction_id: str, description: str = "",
             "auto_rollback_on_error": auto_rollback_on_error
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("begin_transaction failed: %s", e)
         raise
 
 
 @mcp.tool()
-def commit_transaction(transaction_id: str, force: bool = False):
+async def commit_transaction(transaction_id: str, force: bool = False):
     """
     Commit a transaction atomically.
 
@@ -2377,14 +2744,14 @@ def commit_transaction(transaction_id: str, force: bool = False):
             "force": force
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("commit_transaction failed: %s", e)
         raise
 
 
 @mcp.tool()
-def rollback_transaction(transaction_id: str):
+async def rollback_transaction(transaction_id: str):
     """
     Rollback a transaction (undo all operations).
 
@@ -2395,14 +2762,14 @@ def rollback_transaction(transaction_id: str):
         endpoint = config.ENDPOINTS["rollback_transaction"]
         payload = {"transaction_id": transaction_id}
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("rollback_transaction failed: %s", e)
         raise
 
 
 @mcp.tool()
-def get_operation_log(last_n_operations: int = 20, body_id = None,
+async def get_operation_log(last_n_operations: int = 20, body_id = None,
                      operation_type: str = None, status_filter: str = None):
     """
     Access detailed operation history for debugging.
@@ -2435,14 +2802,14 @@ def get_operation_log(last_n_operations: int = 20, body_id = None,
             "status_filter": status_filter
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("get_operation_log failed: %s", e)
         raise
 
 
 @mcp.tool()
-def create_sketch_on_body_plane(body_id, plane: str, z_offset: float = 0, name: str = None):
+async def create_sketch_on_body_plane(body_id, plane: str, z_offset: float = 0, name: str = None):
     """
     Create sketch directly on XY/YZ/XZ plane without face dependency.
 
@@ -2461,14 +2828,14 @@ def create_sketch_on_body_plane(body_id, plane: str, z_offset: float = 0, name:
             "name": name
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("create_sketch_on_body_plane failed: %s", e)
         raise
 
 
 @mcp.tool()
-def validate_face_exists(body_id, face_index: int):
+async def validate_face_exists(body_id, face_index: int):
     """
     Check if face index is still valid after topology changes.
 
@@ -2485,14 +2852,14 @@ def validate_face_exists(body_id, face_index: int):
             "face_index": face_index
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("validate_face_exists failed: %s", e)
         raise
 
 
 @mcp.tool()
-def select_faces_by_semantic(body_id, selectors: list):
+async def select_faces_by_semantic(body_id, selectors: list):
     """
     Batch select multiple faces using semantic names.
 
@@ -2507,14 +2874,14 @@ def select_faces_by_semantic(body_id, selectors: list):
             "selectors": selectors
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("select_faces_by_semantic failed: %s", e)
         raise
 
 
 @mcp.tool()
-def clear_sketch(sketch_id = None):
+async def clear_sketch(sketch_id = None):
     """
     Safely clear active sketch without closing it.
 
@@ -2527,14 +2894,14 @@ def clear_sketch(sketch_id = None):
         endpoint = config.ENDPOINTS["clear_sketch"]
         payload = {"sketch_id": sketch_id}
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("clear_sketch failed: %s", e)
         raise
 
 
 @mcp.tool()
-def extrude_safe(value: float, sketch_id, body_id, direction: str = "normal",
+async def extrude_safe(value: float, sketch_id, body_id, direction: str = "normal",
                 validate_before: bool = True, validate_after: bool = True):
     """
     Extrude with full pre/post validation.
@@ -2560,7 +2927,7 @@ def extrude_safe(value: float, sketch_id, body_id, direction: str = "normal",
             "validate_after": validate_after
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("extrude_safe failed: %s", e)
         raise
@@ -2571,7 +2938,7 @@ def extrude_safe(value: float, sketch_id, body_id, direction: str = "normal",
 #########################################################################################
 
 @mcp.tool()
-def chamfer_edges(distance: float, edges: list = None, angle: float = 45.0):
+async def chamfer_edges(distance: float, edges: list = None, angle: float = 45.0, batch: bool = True):
     """
     Create angled beveled edges (chamfers) on specified edges.
     Unlike fillets (rounded), chamfers create flat angled surfaces.
@@ -2582,6 +2949,8 @@ def chamfer_edges(distance: float, edges: list = None, angle: float = 45.0):
     :param distance: Chamfer distance in cm (how far from edge the bevel extends)
     :param edges: List of edge indices to chamfer, or None for all edges
     :param angle: Chamfer angle in degrees (default 45°)
+    :param batch: Without edges, chamfer everything as one feature and bisect on
+                  failure; skipped edges are listed in "skipped_edges"
     :return: Chamfer result with success status
 
     **Usage Example:**
@@ -2617,17 +2986,18 @@ def chamfer_edges(distance: float, edges: list = None, angle: float = 45.0):
         payload = {
             "distance": distance,
             "edges": edges,
-            "angle": angle
+            "angle": angle,
+            "batch": batch
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("chamfer_edges failed: %s", e)
         raise
 
 
 @mcp.tool()
-def split_body(body_id = None, split_tool: str = "XY", keep_both: bool = True):
+async def split_body(body_id = None, split_tool: str = "XY", keep_both: bool = True):
     """
     Split a body using a construction plane.
     Useful for multi-material props, assembly separation, or splitting large models for 3D printing.
@@ -2680,14 +3050,14 @@ def split_body(body_id = None, split_tool: str = "XY", keep_both: bool = True):
             "keep_both": keep_both
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("split_body failed: %s", e)
         raise
 
 
 @mcp.tool()
-def scale_body(body_id = None, scale_factor: float = 1.0, uniform: bool = True,
+async def scale_body(body_id = None, scale_factor: float = 1.0, uniform: bool = True,
               scale_x: float = 1.0, scale_y: float = 1.0, scale_z: float = 1.0):
     """
     Scale a body by specified factors.
@@ -2754,12 +3124,107 @@ def scale_body(body_id = None, scale_factor: float = 1.0, uniform: bool = True,
             "scale_z": scale_z
         }
         headers = config.HEADERS
-        return send_request(endpoint, payload, headers)
+        return await send_request(endpoint, payload, headers)
     except Exception as e:
         logging.error("scale_body failed: %s", e)
         raise
 
 
+@mcp.tool()
+async def run_batch(operations: list, stop_on_error: bool = True):
+    """
+    Run many add-in operations in ONE round trip and ONE Fusion main-thread tick.
+
+    **WHY NEEDED**: Dozens of single tool calls each pay HTTP, JSON and queue latency.
+    A batch runs them back to back and returns every result in one response.
+
+    :param operations: Ordered list of {"op": <command name>, "args": [...] or {...}}.
+                       List args are positional, dict args use the JSON keys of the
+                       command's route. Names and argument schemas come from
+                       list_commands() (e.g. "draw_box", "draw_cylinder",
+                       "fillet_edges", "list_bodies", "rename_body").
+    :param stop_on_error: Stop at the first operation that raises or returns success=False
+    :return: {"success", "total", "executed", "failed", "stopped_early", "results": [...]}
+
+    **Usage Example:**
+    ```python
+    result = run_batch([
+        {"op": "draw_box", "args": [2.0, 40.0, 40.0, 0, 0, 0, "XY"]},   # height, width, depth, x, y, z, plane
+        {"op": "draw_cylinder", "args": [5.0, 10.0, 0, 0, 2.0, "XY"]},  # radius, height, x, y, z, plane
+        {"op": "list_bodies", "args": []},
+    ])
+    bodies = result["results"][-1]["result"]["bodies"]
+    ```
+    """
+    try:
+        endpoint = config.ENDPOINTS["batch"]
+        payload = {
+            "operations": operations,
+            "stop_on_error": stop_on_error
+        }
+        headers = config.HEADERS
+        return await send_request(endpoint, payload, headers)
+    except Exception as e:
+        logging.error("run_batch failed: %s", e)
+        raise
+
+
+@mcp.tool()
+async def list_commands():
+    """
+    List every operation the add-in has registered, with its route and typed arguments.
+
+    :return: {"commands": [{"name", "path", "result_path", "description",
+              "args": [{"key", "type", "default", "required"}]}]}
+
+    Use the names with run_command() or run_batch().
+    """
+    try:
+        endpoint = config.ENDPOINTS["commands"]
+        return await send_get_request(endpoint)
+    except Exception as e:
+        logging.error("list_commands failed: %s", e)
+        raise
+
+
+@mcp.tool()
+async def get_task_metrics():
+    """
+    Queue metrics of the add-in's main-thread task loop.
+
+    Each Fusion event tick runs queued operations for at most tick_budget_ms and
+    reschedules itself for the rest, so long bursts don't freeze the Fusion UI.
+
+    :return: {"tick_budget_ms", "queue_depth", "totals": {"ticks", "tasks", "budget_exhausted",
+              "max_duration_ms"}, "last_tick", "avg_duration_ms",
+              "recent_ticks": [{"timestamp", "duration_ms", "tasks", "remaining", "budget_exhausted"}]}
+    """
+    try:
+        endpoint = config.ENDPOINTS["task_metrics"]
+        return await send_get_request(endpoint)
+    except Exception as e:
+        logging.error("get_task_metrics failed: %s", e)
+        raise
+
+
+@mcp.tool()
+async def run_command(name: str, args: dict = None):
+    """
+    Run any registered add-in operation by name (see list_commands()).
+
+    :param name: Command name, e.g. "draw_box"
+    :param args: Arguments by key, e.g. {"height": 2, "width": 40}; missing keys use the defaults
+    :return: Acknowledgement with request handle, or the result once it finished
+    """
+    try:
+        endpoint = f"{config.ENDPOINTS['command']}/{name}"
+        headers = config.HEADERS
+        return await send_request(endpoint, args or {}, headers)
+    except Exception as e:
+        logging.error("run_command failed: %s", e)
+        raise
+
+
 #########################################################################################
 ### END OF NEW ENHANCED TOOLS ###
 #########################################################################################
@@ -17,6 +17,7 @@ ENDPOINTS = {
     "export_stl": f"{BASE_URL}/Export_STL",
     "fillet_edges": f"{BASE_URL}/fillet_edges",
     "change_parameter": f"{BASE_URL}/set_parameter",
+    "set_parameters": f"{BASE_URL}/set_parameters",
     "draw_cylinder": f"{BASE_URL}/draw_cylinder",
     "draw_box": f"{BASE_URL}/Box",
     "shell_body": f"{BASE_URL}/shell_body",
@@ -69,8 +70,11 @@ ENDPOINTS = {
     "list_faces": f"{BASE_URL}/list_faces",
     "pocket_recess_safe": f"{BASE_URL}/pocket_recess_safe",
     "get_feature_history": f"{BASE_URL}/get_feature_history",
+    "feature_counts": f"{BASE_URL}/feature_counts",
     "find_face_by_property": f"{BASE_URL}/find_face_by_property",
+    "query_faces_spatial": f"{BASE_URL}/query_faces_spatial",
     "draw_rectangles_batch": f"{BASE_URL}/draw_rectangles_batch",
+    "build_sketch": f"{BASE_URL}/build_sketch",
     "pocket_smart": f"{BASE_URL}/pocket_smart",
     "begin_transaction": f"{BASE_URL}/begin_transaction",
     "commit_transaction": f"{BASE_URL}/commit_transaction",
@@ -87,6 +91,18 @@ ENDPOINTS = {
     "split_body": f"{BASE_URL}/split_body",
     "scale_body": f"{BASE_URL}/scale_body",
 
+    # Batch-Ausführung
+    "batch": f"{BASE_URL}/batch",
+
+    # Request-Handles: GET /result/<request_id>
+    "result": f"{BASE_URL}/result",
+
+    # Command-Registry: GET /commands, POST /command/<name>
+    "commands": f"{BASE_URL}/commands",
+    # Queue-Metriken pro notify-Tick: GET /task_metrics
+    "task_metrics": f"{BASE_URL}/task_metrics",
+    "command": f"{BASE_URL}/command",
+
 }
 
 # Request Headers
@@ -95,5 +111,23 @@ HEADERS = {
 }
 
 # Timeouts (in Sekunden)
-REQUEST_TIMEOUT = 30
-RETRY_DELAY = 2  # Seconds to wait between retry attempts
+REQUEST_TIMEOUT = 30  # Upper bound for any single request
+RETRY_DELAY = 0.5  # Base delay of the exponential backoff between retry attempts
+RETRY_MAX_DELAY = 8  # Cap of the backoff delay (full jitter: sleep is uniform in [0, delay])
+RESULT_WAIT = 20  # Max seconds the add-in blocks per request for a task result (X-Wait), must stay below REQUEST_TIMEOUT
+RESULT_MAX_WAIT = 120  # Total seconds to keep polling /result/<request_id> for a long-running task
+
+# Gelernte Timeouts pro Endpoint (aus beobachteter Latenz)
+MIN_RESULT_WAIT = 2  # X-Wait never goes below this
+TIMEOUT_LATENCY_FACTOR = 4  # X-Wait = factor * latency average, slower tasks are polled instead of retried
+TIMEOUT_MARGIN = 5  # Read timeout = X-Wait + margin for transport
+LATENCY_EWMA_ALPHA = 0.2  # Weight of the newest latency sample
+
+# Circuit Breaker
+CIRCUIT_FAILURE_THRESHOLD = 3  # Consecutive connection failures before failing fast
+CIRCUIT_PROBE_INTERVAL = 2  # Seconds between background test_connection probes while open
+CIRCUIT_PROBE_TIMEOUT = 2
+
+# Verbindungen
+HTTP_POOL_SIZE = 4  # Keep-Alive-Verbindungen im Client-Pool
+HTTP_MAX_CONNECTIONS = 8  # Gleichzeitige Requests zum Add-In (unter dessen HTTP_MAX_WORKERS halten)
@@ -0,0 +1,121 @@
+"""
+Minimal stand-in for the Fusion 360 `adsk` package so MCP/MCP.py can be
+imported and driven outside of Fusion for benchmarking.
+
+Only the pieces the add-in touches at import time and in the task/event
+plumbing are provided. Custom events are delivered on a simulated main
+thread (MainLoop), the same way Fusion marshals fireCustomEvent calls.
+"""
+import importlib.util
+import queue
+import sys
+import threading
+import types
+from pathlib import Path
+
+ADDIN_PATH = Path(__file__).resolve().parent.parent / "MCP" / "MCP.py"
+
+
+class MainLoop:
+    """Simulated Fusion main thread: runs custom event handlers in order."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.fired = 0
+        self._thread = None
+
+    def post(self, handlers, args):
+        self.fired += 1
+        self.events.put((handlers, args))
+
+    def _run(self):
+        while True:
+            item = self.events.get()
+            if item is None:
+                break
+            handlers, args = item
+            for handler in list(handlers):
+                handler.notify(args)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.events.put(None)
+        if self._thread:
+            self._thread.join()
+
+
+class _CustomEvent:
+    def __init__(self):
+        self.handlers = []
+
+    def add(self, handler):
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+        return True
+
+
+class _Application:
+    def __init__(self, loop):
+        self.loop = loop
+        self.events = {}
+        self.userInterface = types.SimpleNamespace(messageBox=lambda *a, **k: None)
+        self.activeDocument = None
+        self.activeProduct = None
+
+    def registerCustomEvent(self, event_id):
+        self.events[event_id] = _CustomEvent()
+        return self.events[event_id]
+
+    def unregisterCustomEvent(self, event_id):
+        self.events.pop(event_id, None)
+        return True
+
+    def fireCustomEvent(self, event_id, additional_info=""):
+        event = self.events.get(event_id)
+        if event is None:
+            return False
+        self.loop.post(event.handlers, additional_info)
+        return True
+
+
+def install(loop):
+    """Registers the stand-in `adsk`, `adsk.core` and `adsk.fusion` modules."""
+    application = _Application(loop)
+
+    class CustomEventHandler:
+        def __init__(self):
+            pass
+
+    class Application:
+        @staticmethod
+        def get():
+            return application
+
+    adsk = types.ModuleType("adsk")
+    core = types.ModuleType("adsk.core")
+    fusion = types.ModuleType("adsk.fusion")
+    core.CustomEventHandler = CustomEventHandler
+    core.Application = Application
+    fusion.Design = types.SimpleNamespace(cast=lambda product: product)
+    adsk.core = core
+    adsk.fusion = fusion
+    sys.modules["adsk"] = adsk
+    sys.modules["adsk.core"] = core
+    sys.modules["adsk.fusion"] = fusion
+    return application
+
+
+def load_addin(loop):
+    """Imports MCP/MCP.py against the stand-in and returns (module, app)."""
+    application = install(loop)
+    spec = importlib.util.spec_from_file_location("MCP_addin", ADDIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, application
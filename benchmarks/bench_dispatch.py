@@ -0,0 +1,58 @@
+"""
+Routing cost per request: the old if/elif chains (POST path -> handler,
+task name -> function) vs. the dict lookups of the command registry.
+
+The chains are generated from the registry itself so both sides cover the
+same routes; the first, middle and last entry show best, typical and worst
+case of the linear scan.
+
+    python benchmarks/bench_dispatch.py [--calls 200000]
+"""
+import argparse
+import time
+
+from adsk_standin import MainLoop, load_addin
+
+
+def build_chain(keys):
+    """Compiles `def route(key): if key == k0: return 0 elif ...` like the old handlers"""
+    lines = ["def route(key):"]
+    for index, key in enumerate(keys):
+        keyword = "if" if index == 0 else "elif"
+        lines.append(f"    {keyword} key == {key!r}:")
+        lines.append(f"        return {index}")
+    lines.append("    return None")
+    namespace = {}
+    exec(compile("\n".join(lines), "<chain>", "exec"), namespace)
+    return namespace["route"]
+
+
+def time_calls(func, key, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(key)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    addin, _ = load_addin(MainLoop())
+    tables = (
+        ("POST path", list(addin.POST_ROUTES), addin.POST_ROUTES),
+        ("task name", list(addin.COMMANDS), addin.COMMANDS),
+    )
+
+    print(f"{'table':<11}{'entries':>8}{'position':>10}{'chain ns':>10}{'dict ns':>9}")
+    for label, keys, table in tables:
+        chain = build_chain(keys)
+        for position, key in (("first", keys[0]), ("middle", keys[len(keys) // 2]), ("last", keys[-1])):
+            chain_ns = time_calls(chain, key, args.calls)
+            dict_ns = time_calls(table.get, key, args.calls)
+            print(f"{label:<11}{len(keys):>8}{position:>10}{chain_ns:>10.1f}{dict_ns:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-call HTTP overhead between MCP server and add-in: one connection per call
+(HTTP/1.0, the old behaviour) vs. a reused keep-alive connection (HTTP/1.1).
+
+Serves MCP/MCP.py's Handler against a stand-in `adsk` module (see
+adsk_standin.py) and issues sequential POST /test_connection calls, which
+answer without touching the task queue, so only transport cost is measured.
+
+    python benchmarks/bench_keepalive.py [--calls 1000]
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+
+from adsk_standin import MainLoop, load_addin
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_server(handler):
+    server = handler.server_class(("localhost", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_mode(addin, protocol, calls):
+    handler = type("BenchHandler", (addin.Handler,), {
+        "protocol_version": protocol,
+        "server_class": addin.AddinHTTPServer,
+        "log_message": lambda self, *args: None,
+    })
+    server = start_server(handler)
+    port = server.server_address[1]
+    body = json.dumps({})
+    headers = {"Content-Type": "application/json"}
+
+    timings = []
+    connection = None
+    start = time.perf_counter()
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        if connection is None or protocol == "HTTP/1.0":
+            connection = http.client.HTTPConnection("localhost", port)
+        connection.request("POST", "/test_connection", body, headers)
+        response = connection.getresponse()
+        response.read()
+        if response.will_close:
+            connection.close()
+            connection = None
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    total = time.perf_counter() - start
+    if connection is not None:
+        connection.close()
+    server.shutdown()
+    server.server_close()
+    return timings, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    addin, _ = load_addin(MainLoop())
+    print(f"{'mode':<22}{'calls':>7}{'total s':>9}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for label, protocol in (("new conn (HTTP/1.0)", "HTTP/1.0"), ("keep-alive (HTTP/1.1)", "HTTP/1.1")):
+        timings, total = run_mode(addin, protocol, args.calls)
+        print(f"{label:<22}{len(timings):>7}{total:>9.3f}{total / len(timings) * 1000:>9.3f}"
+              f"{percentile(timings, 50):>9.3f}{percentile(timings, 99):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
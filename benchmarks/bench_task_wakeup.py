@@ -0,0 +1,95 @@
+"""
+Queue-to-execution latency of add-in tasks: 200 ms polling vs. event-driven wakeup.
+
+Runs MCP/MCP.py against a stand-in `adsk` module (see adsk_standin.py) and
+measures how long a task sits in task_queue before process_task runs it.
+
+    python benchmarks/bench_task_wakeup.py [--tasks 200]
+"""
+import argparse
+import random
+import threading
+import time
+
+from adsk_standin import MainLoop, load_addin
+
+IDLE_WINDOW = 4.0
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def legacy_poll(stopped, app, event_id, interval=0.2):
+    """The old TaskThread.run loop: fire the event every 200 ms regardless of load."""
+    while not stopped.wait(interval):
+        app.fireCustomEvent(event_id, "{}")
+
+
+def run_mode(mode, tasks, seed):
+    loop = MainLoop()
+    addin, app = load_addin(loop)
+    latencies = []
+    done = threading.Event()
+
+    def fake_set_parameter(design, ui, name, enqueued_at):
+        latencies.append((time.perf_counter() - enqueued_at) * 1000.0)
+        if len(latencies) == tasks:
+            done.set()
+
+    addin.COMMANDS['set_parameter']['handler'] = fake_set_parameter
+    addin.get_model_parameters = lambda design: []
+    addin.app = app
+    addin.design = object()
+
+    event = app.registerCustomEvent(addin.myCustomEvent)
+    event.add(addin.TaskEventHandler())
+    loop.start()
+
+    stopped = threading.Event()
+    if mode == "poll":
+        ticker = threading.Thread(target=legacy_poll, args=(stopped, app, addin.myCustomEvent), daemon=True)
+        enqueue = lambda task: addin.task_queue.put((None, task))
+    else:
+        ticker = addin.TaskThread(stopped)
+        ticker.daemon = True
+        enqueue = addin.enqueue_task
+    ticker.start()
+
+    rng = random.Random(seed)
+    for i in range(tasks):
+        # Bursty arrivals: mostly back-to-back posts with occasional pauses.
+        # One parameter name per task, otherwise consecutive writes would be coalesced.
+        time.sleep(rng.choice((0.0, 0.0, 0.001, 0.005, 0.02)))
+        enqueue(('set_parameter', f'p{i}', time.perf_counter()))
+
+    done.wait(10)
+    fired = loop.fired
+    assert len(latencies) == tasks, f"{mode}: {len(latencies)} of {tasks} tasks ran"
+
+    # Idle wakeups: how often the main thread is woken while nothing is queued
+    time.sleep(IDLE_WINDOW)
+    idle_wakeups = loop.fired - fired
+    stopped.set()
+    loop.stop()
+    return latencies, fired, idle_wakeups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'tasks':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'events':>8}{'idle':>6}")
+    for mode in ("poll", "event"):
+        latencies, fired, idle = run_mode(mode, args.tasks, args.seed)
+        print(f"{mode:<8}{len(latencies):>7}{percentile(latencies, 50):>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}{max(latencies):>10.2f}{fired:>8}{idle:>6}")
+    print(f"(idle = custom events fired during {IDLE_WINDOW:.0f} s with an empty queue)")
+
+
+if __name__ == "__main__":
+    main()